@@ -1,5 +1,9 @@
-from django.contrib import admin
-from .models import Cidade, CRAS, Beneficiario, FichaPAIF, FichaSCFV, AtividadeSCFV, Agendamento
+from django.contrib import admin, messages
+from django.shortcuts import redirect
+from django.urls import path
+
+from . import tarefas
+from .models import Cidade, CRAS, Beneficiario, FichaPAIF, FichaSCFV, AtividadeSCFV, Agendamento, Tarefa
 
 @admin.register(Cidade)
 class CidadeAdmin(admin.ModelAdmin):
@@ -44,6 +48,32 @@ class FichaPAIFAdmin(admin.ModelAdmin):
     date_hierarchy = 'data'
     autocomplete_fields = ['cras']
 
+@admin.register(Tarefa)
+class TarefaAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tipo', 'status', 'progresso', 'tentativas', 'usuario', 'criado_em', 'concluido_em')
+    search_fields = ('tipo', 'mensagem', 'trabalhador')
+    list_filter = ('status', 'tipo')
+    date_hierarchy = 'criado_em'
+    readonly_fields = ('criado_em', 'iniciado_em', 'sinal_em', 'concluido_em', 'trabalhador', 'erro')
+    change_list_template = 'admin/core/tarefa/change_list.html'
+
+    def get_urls(self):
+        urls = [
+            path('snapshot-parquet/', self.admin_site.admin_view(self.enfileirar_snapshot_parquet),
+                 name='core_tarefa_snapshot_parquet'),
+        ]
+        return urls + super().get_urls()
+
+    def enfileirar_snapshot_parquet(self, request):
+        if request.method != 'POST':
+            return redirect('admin:core_tarefa_changelist')
+        if not tarefas.TAREFAS['snapshot_parquet'].permitido(request.user):
+            messages.error(request, 'Você não tem permissão para gerar snapshots.')
+        else:
+            tarefa = tarefas.enfileirar('snapshot_parquet', usuario=request.user)
+            messages.success(request, f'Snapshot Parquet enfileirado (tarefa {tarefa.pk}).')
+        return redirect('admin:core_tarefa_changelist')
+
 # Registre os outros modelos conforme necessário
 admin.site.register(FichaSCFV)
 admin.site.register(AtividadeSCFV)
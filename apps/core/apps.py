@@ -5,3 +5,9 @@ class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.core'
     verbose_name = 'Núcleo do Sistema'
+
+    def ready(self):
+        # Registrar signals que mantêm os resumos diários
+        from apps.core import signals  # noqa: F401
+        # Registrar as tarefas em segundo plano do núcleo
+        from apps.core import tarefas  # noqa: F401
@@ -0,0 +1,306 @@
+"""
+Busca indexada de beneficiários.
+
+Os campos desnormalizados de Beneficiario (nome_busca, cpf_digitos,
+nis_digitos e rg_digitos) são indexados e consultados por prefixo. Para o
+nome há ainda um índice textual específico de cada banco:
+
+    - SQLite: tabela virtual FTS5 `core_beneficiario_busca`, sincronizada por
+      triggers, consultada com prefixos de palavra ("JOSE"* "SILV"*)
+    - PostgreSQL: índice GIN pg_trgm em nome_busca, que acelera o LIKE
+      '%termo%' sobre a coluna já normalizada
+
+Em outros bancos (ou se o índice textual não existir) a busca de nome usa
+o prefixo do nome completo pelo índice B-tree de nome_busca.
+"""
+
+import hashlib
+import re
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from apps.core.models import Beneficiario, normalizar_texto, somente_digitos
+
+TABELA_FTS = 'core_beneficiario_busca'
+
+# Quantidade mínima de dígitos para tratar o termo como documento
+MINIMO_DIGITOS_DOCUMENTO = 3
+
+SQL_INDICE_SQLITE = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA_FTS} USING fts5(
+        nome_busca,
+        content='core_beneficiario',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3 4'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS core_beneficiario_busca_ai AFTER INSERT ON core_beneficiario BEGIN
+        INSERT INTO {TABELA_FTS}(rowid, nome_busca) VALUES (new.id, new.nome_busca);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS core_beneficiario_busca_ad AFTER DELETE ON core_beneficiario BEGIN
+        INSERT INTO {TABELA_FTS}({TABELA_FTS}, rowid, nome_busca) VALUES ('delete', old.id, old.nome_busca);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS core_beneficiario_busca_au AFTER UPDATE OF nome_busca ON core_beneficiario BEGIN
+        INSERT INTO {TABELA_FTS}({TABELA_FTS}, rowid, nome_busca) VALUES ('delete', old.id, old.nome_busca);
+        INSERT INTO {TABELA_FTS}(rowid, nome_busca) VALUES (new.id, new.nome_busca);
+    END""",
+    f"INSERT INTO {TABELA_FTS}({TABELA_FTS}) VALUES ('rebuild')",
+]
+
+SQL_REMOVER_INDICE_SQLITE = [
+    "DROP TRIGGER IF EXISTS core_beneficiario_busca_ai",
+    "DROP TRIGGER IF EXISTS core_beneficiario_busca_ad",
+    "DROP TRIGGER IF EXISTS core_beneficiario_busca_au",
+    f"DROP TABLE IF EXISTS {TABELA_FTS}",
+]
+
+SQL_INDICE_POSTGRESQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS core_benef_nome_busca_trgm ON core_beneficiario "
+    "USING gin (nome_busca gin_trgm_ops)",
+]
+
+SQL_REMOVER_INDICE_POSTGRESQL = [
+    "DROP INDEX IF EXISTS core_benef_nome_busca_trgm",
+]
+
+
+def criar_indice_textual(conexao=None):
+    """
+    Cria (ou recria) o índice textual do nome conforme o banco em uso.
+
+    No SQLite, migrações que reconstroem a tabela core_beneficiario removem
+    os triggers; chame esta função novamente ao final dessas migrações.
+    """
+    conexao = conexao or connection
+    comandos = {
+        'sqlite': SQL_REMOVER_INDICE_SQLITE + SQL_INDICE_SQLITE,
+        'postgresql': SQL_INDICE_POSTGRESQL,
+    }.get(conexao.vendor, [])
+    with conexao.cursor() as cursor:
+        for sql in comandos:
+            cursor.execute(sql)
+
+
+def remover_indice_textual(conexao=None):
+    conexao = conexao or connection
+    comandos = {
+        'sqlite': SQL_REMOVER_INDICE_SQLITE,
+        'postgresql': SQL_REMOVER_INDICE_POSTGRESQL,
+    }.get(conexao.vendor, [])
+    with conexao.cursor() as cursor:
+        for sql in comandos:
+            cursor.execute(sql)
+
+
+def _fts_disponivel():
+    if connection.vendor != 'sqlite':
+        return False
+    if getattr(connection, '_cras360_fts_disponivel', None) is None:
+        connection._cras360_fts_disponivel = TABELA_FTS in connection.introspection.table_names()
+    return connection._cras360_fts_disponivel
+
+
+def _intervalo_prefixo(prefixo):
+    """Retorna (início, fim) tal que início <= valor < fim equivale a startswith(prefixo)."""
+    return prefixo, prefixo[:-1] + chr(ord(prefixo[-1]) + 1)
+
+
+def _filtro_prefixo(queryset, campo, prefixo):
+    # Comparação por intervalo usa o índice B-tree em qualquer banco,
+    # ao contrário de LIKE, que depende de collation/pragmas
+    inicio, fim = _intervalo_prefixo(prefixo)
+    return queryset.filter(**{f'{campo}__gte': inicio, f'{campo}__lt': fim})
+
+
+def eh_termo_documento(termo):
+    """Indica se o termo digitado é um CPF/NIS/RG (somente dígitos e pontuação)."""
+    digitos = somente_digitos(termo)
+    return (
+        len(digitos) >= MINIMO_DIGITOS_DOCUMENTO
+        and re.fullmatch(r'[\d.\-/\s]+', termo.strip()) is not None
+    )
+
+
+def expressao_fts(nome_normalizado):
+    """Monta a consulta FTS5 com prefixo em cada palavra: "JOSE"* "SILVA"*"""
+    palavras = re.findall(r'\w+', nome_normalizado)
+    return ' '.join(f'"{palavra}"*' for palavra in palavras)
+
+
+def buscar_beneficiarios(termo, queryset=None):
+    """
+    Busca beneficiários por nome, CPF, NIS ou RG usando os índices de busca.
+
+    Args:
+        termo: Texto digitado (nome, parte do nome ou documento)
+        queryset: QuerySet base opcional (ex.: restrito ao CRAS do usuário)
+
+    Returns:
+        QuerySet de Beneficiario (sem ordenação definida)
+    """
+    queryset = Beneficiario.objects.all() if queryset is None else queryset
+    termo = (termo or '').strip()
+    if not termo:
+        return queryset.none()
+
+    if eh_termo_documento(termo):
+        digitos = somente_digitos(termo)
+        return (
+            _filtro_prefixo(queryset, 'cpf_digitos', digitos)
+            | _filtro_prefixo(queryset, 'nis_digitos', digitos)
+            | _filtro_prefixo(queryset, 'rg_digitos', digitos)
+        )
+
+    nome = normalizar_texto(termo)
+    if not re.search(r'\w', nome):
+        return queryset.none()
+
+    if _fts_disponivel():
+        ids = RawSQL(
+            f"SELECT rowid FROM {TABELA_FTS} WHERE {TABELA_FTS} MATCH %s",
+            [expressao_fts(nome)],
+        )
+        return queryset.filter(pk__in=ids)
+
+    if connection.vendor == 'postgresql':
+        # LIKE '%termo%' sobre a coluna normalizada, acelerado pelo índice trigram
+        return queryset.filter(nome_busca__contains=nome)
+
+    return _filtro_prefixo(queryset, 'nome_busca', nome)
+
+
+# Sugestões (typeahead)
+
+# Candidatos lidos do índice textual por termo, além dos que começam pelo
+# termo (ver _candidatos); o ranking é feito sobre este conjunto
+MAXIMO_CANDIDATOS_SUGESTAO = 200
+# Quantidade máxima de sugestões ranqueadas mantidas por termo
+MAXIMO_SUGESTOES = 50
+# Validade (segundos) das sugestões em cache; cobre as teclas de uma digitação
+CACHE_SUGESTOES_SEGUNDOS = 30
+
+# Ordem de relevância: nome ou documento exato, início do nome ou do
+# documento, início de palavras, demais
+RANK_EXATO = 0
+RANK_PREFIXO_NOME = 1
+RANK_PREFIXO_DOCUMENTO = 1
+RANK_PREFIXO_PALAVRAS = 2
+RANK_CONTEM = 3
+
+CAMPOS_SUGESTAO = (
+    'id', 'nome_completo', 'cpf', 'nis', 'data_nascimento', 'ficha_paif_id',
+    'nome_busca', 'cpf_digitos', 'nis_digitos', 'rg_digitos',
+)
+
+
+def chave_termo(termo):
+    """Forma normalizada do termo, usada no cache e no cursor de paginação."""
+    termo = (termo or '').strip()
+    if eh_termo_documento(termo):
+        return 'doc:' + somente_digitos(termo)
+    return 'nome:' + ' '.join(re.findall(r'\w+', normalizar_texto(termo)))
+
+
+def _rank_documento(digitos, linha):
+    documentos = (linha['cpf_digitos'], linha['nis_digitos'], linha['rg_digitos'])
+    return RANK_EXATO if digitos in documentos else RANK_PREFIXO_DOCUMENTO
+
+
+def _rank_nome(nome, palavras, linha):
+    nome_busca = linha['nome_busca']
+    if nome_busca == nome:
+        return RANK_EXATO
+    if nome_busca.startswith(nome):
+        return RANK_PREFIXO_NOME
+    palavras_nome = nome_busca.split()
+    if all(any(p.startswith(termo) for p in palavras_nome) for termo in palavras):
+        return RANK_PREFIXO_PALAVRAS
+    return RANK_CONTEM
+
+
+def _candidatos(termo):
+    """
+    Linhas candidatas às sugestões, sem repetição.
+
+    Os candidatos de rank mais alto vêm de consultas próprias pelo índice
+    B-tree, cada uma limitada a MAXIMO_SUGESTOES na ordem final: os
+    documentos exatos e os nomes que começam pelo termo. Assim eles nunca
+    ficam de fora por causa do limite aplicado aos resultados da busca
+    geral (MAXIMO_CANDIDATOS_SUGESTAO, em ordem alfabética), que completam
+    o conjunto.
+    """
+    base = Beneficiario.objects.order_by('nome_busca', 'id').values(*CAMPOS_SUGESTAO)
+    if eh_termo_documento(termo):
+        digitos = somente_digitos(termo)
+        consultas = [
+            base.filter(Q(cpf_digitos=digitos) | Q(nis_digitos=digitos) | Q(rg_digitos=digitos))[:MAXIMO_SUGESTOES],
+        ]
+    else:
+        # O nome exato é o primeiro, em ordem alfabética, dos que começam pelo termo
+        consultas = [_filtro_prefixo(base, 'nome_busca', normalizar_texto(termo))[:MAXIMO_SUGESTOES]]
+    consultas.append(buscar_beneficiarios(termo, base)[:MAXIMO_CANDIDATOS_SUGESTAO])
+
+    candidatos = {}
+    for consulta in consultas:
+        for linha in consulta:
+            candidatos.setdefault(linha['id'], linha)
+    return candidatos.values()
+
+
+def _ranquear(termo):
+    termo = (termo or '').strip()
+    candidatos = _candidatos(termo)
+
+    if eh_termo_documento(termo):
+        digitos = somente_digitos(termo)
+        ranquear = lambda linha: _rank_documento(digitos, linha)  # noqa: E731
+    else:
+        nome = normalizar_texto(termo)
+        palavras = re.findall(r'\w+', nome)
+        ranquear = lambda linha: _rank_nome(nome, palavras, linha)  # noqa: E731
+
+    sugestoes = []
+    for linha in candidatos:
+        data_nascimento = linha['data_nascimento']
+        sugestoes.append({
+            'rank': ranquear(linha),
+            'nome_busca': linha['nome_busca'],
+            'id': linha['id'],
+            'nome_completo': linha['nome_completo'],
+            'cpf': linha['cpf'],
+            'nis': linha['nis'],
+            'data_nascimento': data_nascimento.strftime('%d/%m/%Y') if data_nascimento else None,
+            'paif': linha['ficha_paif_id'] is not None,
+        })
+    sugestoes.sort(key=chave_ordenacao_sugestao)
+    return sugestoes[:MAXIMO_SUGESTOES]
+
+
+def chave_ordenacao_sugestao(sugestao):
+    """Chave (rank, nome_busca, id) da ordenação usada também pelo cursor."""
+    return (sugestao['rank'], sugestao['nome_busca'], sugestao['id'])
+
+
+def sugerir_beneficiarios(termo):
+    """
+    Retorna as sugestões ranqueadas para o termo digitado.
+
+    A lista (no máximo MAXIMO_SUGESTOES itens, ordenada por
+    chave_ordenacao_sugestao) fica em cache por CACHE_SUGESTOES_SEGUNDOS,
+    de modo que teclas repetidas e várias recepções digitando o mesmo termo
+    não consultam a tabela de beneficiários novamente.
+    """
+    chave = chave_termo(termo)
+    if chave in ('doc:', 'nome:'):
+        return []
+
+    chave_cache = 'sugestoes_beneficiarios:' + hashlib.md5(chave.encode('utf-8')).hexdigest()
+    sugestoes = cache.get(chave_cache)
+    if sugestoes is None:
+        sugestoes = _ranquear(termo)
+        cache.set(chave_cache, sugestoes, CACHE_SUGESTOES_SEGUNDOS)
+    return sugestoes
@@ -0,0 +1,100 @@
+"""
+Serviço de estatísticas por unidade CRAS.
+
+Todas as métricas são calculadas com um número constante de consultas
+agrupadas, independentemente da quantidade de unidades na cidade. Famílias
+e atendimentos são lidos dos resumos diários (apps.core.resumos).
+"""
+
+from datetime import date
+
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from apps.core.models import CRAS, Beneficiario, ResumoDiarioAtendimento, ResumoDiarioFicha
+
+# Faixas de atendimentos no período usadas para classificar o status da unidade
+LIMITE_STATUS_NORMAL = 100
+LIMITE_STATUS_ATENCAO = 50
+
+
+def periodo_mes_atual(hoje=None):
+    """Retorna a tupla (primeiro dia do mês, hoje)."""
+    hoje = hoje or date.today()
+    return hoje.replace(day=1), hoje
+
+
+def classificar_status(atendimentos):
+    """Classifica a unidade em 'normal', 'atencao' ou 'critico'."""
+    if atendimentos > LIMITE_STATUS_NORMAL:
+        return 'normal'
+    if atendimentos > LIMITE_STATUS_ATENCAO:
+        return 'atencao'
+    return 'critico'
+
+
+def _agregado_por_cras(queryset, campo_cras, agregacao):
+    """
+    Subconsulta correlacionada que agrega as linhas de `queryset` ligadas ao
+    CRAS da consulta externa (agrupada por `campo_cras`).
+    """
+    subconsulta = (
+        queryset.filter(**{campo_cras: OuterRef('pk')})
+        .order_by()
+        .values(campo_cras)
+        .annotate(total=agregacao)
+        .values('total')
+    )
+    return Coalesce(Subquery(subconsulta, output_field=IntegerField()), Value(0))
+
+
+def estatisticas_por_cras(cidades=None, data_inicio=None, data_fim=None, cras_ids=None):
+    """
+    Retorna as métricas de cada CRAS em uma única consulta anotada.
+
+    Args:
+        cidades: Lista de objetos Cidade ou IDs (None para todas)
+        data_inicio: Data inicial dos atendimentos (padrão: início do mês)
+        data_fim: Data final dos atendimentos (padrão: hoje)
+        cras_ids: Restringe o resultado a essas unidades (opcional)
+
+    Returns:
+        Lista de dicionários com id, nome, endereco, coordenador, cidade_id,
+        familias_cadastradas, beneficiarios, atendimentos_mes e status
+    """
+    if data_inicio is None or data_fim is None:
+        inicio_padrao, fim_padrao = periodo_mes_atual()
+        data_inicio = data_inicio or inicio_padrao
+        data_fim = data_fim or fim_padrao
+
+    lista_cras = CRAS.objects.all()
+    if cidades is not None:
+        lista_cras = lista_cras.filter(cidade__in=list(cidades))
+    if cras_ids is not None:
+        lista_cras = lista_cras.filter(pk__in=list(cras_ids))
+
+    atendimentos_periodo = ResumoDiarioAtendimento.objects.filter(
+        data__range=(data_inicio, data_fim)
+    )
+
+    lista_cras = lista_cras.annotate(
+        total_familias=_agregado_por_cras(ResumoDiarioFicha.objects.all(), 'cras', Sum('total')),
+        total_beneficiarios=_agregado_por_cras(Beneficiario.objects.all(), 'cras', Count('pk')),
+        total_atendimentos=_agregado_por_cras(atendimentos_periodo, 'cras', Sum('total')),
+    ).order_by('nome')
+
+    estatisticas = []
+    for cras in lista_cras:
+        estatisticas.append({
+            'id': cras.id,
+            'nome': cras.nome,
+            'endereco': cras.endereco,
+            'coordenador': cras.coordenador,
+            'cidade_id': cras.cidade_id,
+            'familias_cadastradas': cras.total_familias,
+            'beneficiarios': cras.total_beneficiarios,
+            'atendimentos_mes': cras.total_atendimentos,
+            'status': classificar_status(cras.total_atendimentos),
+        })
+
+    return estatisticas
@@ -0,0 +1,194 @@
+"""
+Registro de logs sem escrita em disco nas threads das requisições.
+
+O FilaLogHandler apenas coloca cada registro em uma fila em memória; uma
+thread em segundo plano (logging.handlers.QueueListener) grava os
+registros em um arquivo com rotação por tamanho, um objeto JSON por linha
+(FormatadorJSON), e opcionalmente no console. Se a fila encher, os
+registros excedentes são descartados e contados, em vez de bloquear a
+requisição.
+
+O FiltroAmostragem mantém só uma fração dos registros de DEBUG dos loggers
+mais verbosos (ex.: 10% de 'auth_app'); a fração aparece no campo
+"amostragem" das linhas gravadas.
+
+A thread é iniciada no primeiro registro de cada processo, o que também
+cobre os processos filhos criados por fork (trabalhadores do servidor,
+pools de processos dos relatórios). Cada processo faz a própria rotação
+do arquivo: com vários processos, use um arquivo por processo ou a
+rotação do sistema (logrotate).
+
+Configurado em settings.LOGGING.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# Atributos de todo LogRecord; os demais vieram de `extra` e vão para o JSON
+_ATRIBUTOS_PADRAO = frozenset(logging.makeLogRecord({}).__dict__) | {'message', 'asctime', 'taskName', 'amostragem'}
+
+FORMATO_CONSOLE = '{levelname} {asctime} {module} {message}'
+
+
+class FormatadorJSON(logging.Formatter):
+    """Uma linha JSON por registro, com os campos passados em `extra`."""
+
+    def format(self, record):
+        dados = {
+            'momento': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'logger': record.name,
+            'mensagem': record.getMessage(),
+            'modulo': record.module,
+            'linha': record.lineno,
+            'processo': record.process,
+            'thread': record.threadName,
+        }
+        amostragem = getattr(record, 'amostragem', None)
+        if amostragem is not None:
+            dados['amostragem'] = amostragem
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            dados['excecao'] = record.exc_text
+        if record.stack_info:
+            dados['pilha'] = self.formatStack(record.stack_info)
+        for chave, valor in record.__dict__.items():
+            if chave not in _ATRIBUTOS_PADRAO and chave not in dados:
+                dados[chave] = valor
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+
+class FiltroAmostragem(logging.Filter):
+    """
+    Deixa passar só uma fração dos registros de nível baixo de cada logger.
+
+    Args:
+        taxas: Dicionário logger -> fração mantida (0 a 1). Vale também para
+            os loggers filhos ('django.db' cobre 'django.db.backends'); o
+            mais específico prevalece.
+        nivel_maximo: Registros acima deste nível sempre passam
+    """
+
+    def __init__(self, taxas=None, nivel_maximo=logging.DEBUG):
+        super().__init__()
+        self.taxas = dict(taxas or {})
+        self.nivel_maximo = logging._checkLevel(nivel_maximo)
+        self._taxas_loggers = {}
+
+    def _taxa(self, nome):
+        taxa = self._taxas_loggers.get(nome)
+        if taxa is None:
+            prefixo = nome
+            while prefixo and prefixo not in self.taxas:
+                prefixo = prefixo.rpartition('.')[0]
+            taxa = self._taxas_loggers[nome] = self.taxas.get(prefixo, 1.0)
+        return taxa
+
+    def filter(self, record):
+        if record.levelno > self.nivel_maximo:
+            return True
+        taxa = self._taxa(record.name)
+        if taxa >= 1:
+            return True
+        if random.random() >= taxa:
+            return False
+        record.amostragem = taxa
+        return True
+
+
+class FilaLogHandler(QueueHandler):
+    """
+    Handler que entrega os registros a uma thread de escrita.
+
+    Args:
+        arquivo: Caminho do arquivo de log (JSON, uma linha por registro)
+        max_bytes: Tamanho em que o arquivo é rotacionado
+        backups: Quantidade de arquivos rotacionados mantidos
+        tamanho_fila: Registros aguardando escrita antes de começar a descartar
+        nivel_console: Nível mínimo também escrito no console (None: não escreve)
+    """
+
+    def __init__(self, arquivo, max_bytes=10 * 1024 * 1024, backups=5, tamanho_fila=10000, nivel_console=None):
+        super().__init__(queue.Queue(tamanho_fila))
+        self.diretorio = os.path.dirname(os.path.abspath(arquivo))
+
+        destino = RotatingFileHandler(arquivo, maxBytes=max_bytes, backupCount=backups, encoding='utf-8', delay=True)
+        destino.setFormatter(FormatadorJSON())
+        self.destinos = [destino]
+        if nivel_console is not None:
+            console = logging.StreamHandler(sys.stderr)
+            console.setLevel(nivel_console)
+            console.setFormatter(logging.Formatter(FORMATO_CONSOLE, style='{'))
+            self.destinos.append(console)
+
+        self.tamanho_fila = tamanho_fila
+        self.descartados = 0
+        self._listener = None
+        self._pid = None
+        self._trava_inicio = threading.Lock()
+        atexit.register(self._parar)
+
+    def _iniciar(self):
+        with self._trava_inicio:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                # Processo filho: a thread do processo pai não existe aqui
+                self.queue = queue.Queue(self.tamanho_fila)
+                self.descartados = 0
+            # Criado só aqui para que carregar a configuração (manage.py check etc.) não crie o diretório
+            os.makedirs(self.diretorio, exist_ok=True)
+            self._listener = QueueListener(self.queue, *self.destinos, respect_handler_level=True)
+            self._listener.start()
+            self._pid = os.getpid()
+
+    def _parar(self):
+        with self._trava_inicio:
+            if self._listener is not None and self._pid == os.getpid():
+                # Grava o que ainda estiver na fila
+                self._listener.stop()
+            self._listener = None
+            self._pid = None
+
+    def prepare(self, record):
+        # A fila fica no mesmo processo: o registro não precisa ser serializado,
+        # só ter a mensagem e a exceção resolvidas antes de sair da thread
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        if self._pid != os.getpid():
+            self._iniciar()
+        try:
+            if self.descartados:
+                aviso = logging.makeLogRecord({
+                    'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                    'msg': f'{self.descartados} registros de log descartados (fila cheia)',
+                })
+                self.queue.put_nowait(aviso)
+                self.descartados = 0
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+    def close(self):
+        self._parar()
+        for destino in self.destinos:
+            destino.close()
+        super().close()
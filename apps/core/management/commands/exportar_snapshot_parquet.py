@@ -0,0 +1,32 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.snapshots import TABELAS, TAMANHO_GRUPO_LINHAS, ErroSnapshot, gerar_snapshot, nome_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Exporta FichaPAIF, Beneficiario, Atendimento e ParticipacaoSCFV em arquivos Parquet para análise'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--destino',
+                            help='Diretório de saída. Padrão: MEDIA_ROOT/snapshots/<data e hora>')
+        parser.add_argument('--tabela', action='append', dest='tabelas', choices=sorted(TABELAS),
+                            help='Tabela a exportar (pode ser repetido). Padrão: todas')
+        parser.add_argument('--tamanho-grupo', type=int, default=TAMANHO_GRUPO_LINHAS,
+                            help=f'Linhas por row group (padrão: {TAMANHO_GRUPO_LINHAS})')
+
+    def handle(self, *args, **options):
+        if options['tamanho_grupo'] < 1:
+            raise CommandError('O tamanho do row group deve ser positivo.')
+        destino = options['destino'] or os.path.join(settings.MEDIA_ROOT, 'snapshots', nome_snapshot())
+
+        def progresso(tabela, linhas):
+            self.stdout.write(f'{tabela}: {linhas} linhas')
+
+        try:
+            gerar_snapshot(destino, options['tabelas'], options['tamanho_grupo'], progresso)
+        except ErroSnapshot as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f'Snapshot gravado em {destino}'))
@@ -0,0 +1,64 @@
+import multiprocessing
+import os
+import socket
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from apps.core.tarefas import TAREFAS, processar_fila, recuperar_abandonadas
+
+
+def _trabalhar(indice, intervalo, continuar, tipos):
+    if not apps.ready:
+        django.setup()
+    # Cada processo abre a própria conexão com o banco na primeira consulta
+    connections.close_all()
+    trabalhador = f'{socket.gethostname()}:{os.getpid()}:{indice}'
+    try:
+        return processar_fila(trabalhador, intervalo, continuar, tipos)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Executa as tarefas em segundo plano enfileiradas (exportações, importações, resumos)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trabalhadores', type=int, default=1,
+                            help='Quantidade de processos trabalhadores (padrão: 1)')
+        parser.add_argument('--uma-vez', action='store_true', dest='uma_vez',
+                            help='Executa as tarefas pendentes e encerra quando a fila esvaziar')
+        parser.add_argument('--intervalo', type=float, default=2.0,
+                            help='Segundos de espera quando a fila está vazia (padrão: 2)')
+        parser.add_argument('--tipo', action='append', dest='tipos',
+                            help='Executa apenas tarefas deste tipo (pode ser repetido)')
+
+    def handle(self, *args, **options):
+        trabalhadores = options['trabalhadores']
+        if trabalhadores < 1:
+            raise CommandError('A quantidade de trabalhadores deve ser maior que zero.')
+        desconhecidos = set(options['tipos'] or []) - set(TAREFAS)
+        if desconhecidos:
+            raise CommandError(f"Tipo de tarefa desconhecido: {', '.join(sorted(desconhecidos))}")
+
+        recuperadas = recuperar_abandonadas()
+        if recuperadas:
+            self.stdout.write(self.style.WARNING(f'Tarefas abandonadas devolvidas à fila: {recuperadas}'))
+
+        continuar = not options['uma_vez']
+        argumentos = (options['intervalo'], continuar, options['tipos'])
+        self.stdout.write(f'Iniciando {trabalhadores} trabalhador(es)...')
+
+        if trabalhadores == 1:
+            executadas = processar_fila(None, *argumentos)
+        else:
+            # Conexões abertas não podem ser herdadas pelos processos filhos
+            connections.close_all()
+            with multiprocessing.Pool(trabalhadores) as pool:
+                executadas = sum(pool.starmap(
+                    _trabalhar, [(indice, *argumentos) for indice in range(trabalhadores)]
+                ))
+
+        self.stdout.write(self.style.SUCCESS(f'Tarefas executadas: {executadas}'))
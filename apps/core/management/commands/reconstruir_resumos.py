@@ -0,0 +1,34 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.resumos import reconstruir_resumos
+
+
+def _data(valor):
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Data inválida: {valor} (use AAAA-MM-DD)')
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói os resumos diários de atendimentos e fichas PAIF para um período'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--inicio', type=_data, help='Data inicial (AAAA-MM-DD). Padrão: primeira data registrada')
+        parser.add_argument('--fim', type=_data, help='Data final (AAAA-MM-DD). Padrão: última data registrada')
+        parser.add_argument('--cras', type=int, action='append', dest='cras_ids',
+                            help='ID do CRAS a reconstruir (pode ser repetido)')
+
+    def handle(self, *args, **options):
+        inicio, fim = options['inicio'], options['fim']
+        if inicio and fim and inicio > fim:
+            raise CommandError('A data inicial não pode ser posterior à data final.')
+
+        self.stdout.write('Reconstruindo resumos diários...')
+        totais = reconstruir_resumos(inicio, fim, options['cras_ids'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Resumos reconstruídos: {totais['atendimentos']} linhas de atendimentos, "
+            f"{totais['fichas']} linhas de fichas PAIF."
+        ))
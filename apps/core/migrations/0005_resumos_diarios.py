@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def popular_resumos(apps, schema_editor):
+    Atendimento = apps.get_model('core', 'Atendimento')
+    FichaPAIF = apps.get_model('core', 'FichaPAIF')
+    ResumoDiarioAtendimento = apps.get_model('core', 'ResumoDiarioAtendimento')
+    ResumoDiarioFicha = apps.get_model('core', 'ResumoDiarioFicha')
+
+    ResumoDiarioAtendimento.objects.bulk_create([
+        ResumoDiarioAtendimento(
+            cras_id=linha['beneficiario__cras_id'],
+            data=linha['data_atendimento'],
+            tipo_atendimento=linha['tipo_atendimento'],
+            total=linha['total'],
+        )
+        for linha in Atendimento.objects.filter(beneficiario__cras__isnull=False).order_by()
+        .values('beneficiario__cras_id', 'data_atendimento', 'tipo_atendimento')
+        .annotate(total=Count('pk'))
+    ], batch_size=1000)
+
+    ResumoDiarioFicha.objects.bulk_create([
+        ResumoDiarioFicha(cras_id=linha['cras_id'], data=linha['data'], tipo=linha['tipo'], total=linha['total'])
+        for linha in FichaPAIF.objects.order_by().values('cras_id', 'data', 'tipo').annotate(total=Count('pk'))
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_remove_cpf_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoDiarioAtendimento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField()),
+                ('tipo_atendimento', models.CharField(max_length=50)),
+                ('total', models.IntegerField(default=0)),
+                ('cras', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumos_atendimento', to='core.cras')),
+            ],
+            options={
+                'verbose_name': 'Resumo Diário de Atendimentos',
+                'verbose_name_plural': 'Resumos Diários de Atendimentos',
+                'indexes': [models.Index(fields=['data', 'cras'], name='resumo_atend_data_cras_idx')],
+                'constraints': [models.UniqueConstraint(fields=('cras', 'data', 'tipo_atendimento'), name='resumo_atendimento_unico')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumoDiarioFicha',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField()),
+                ('tipo', models.CharField(max_length=20)),
+                ('total', models.IntegerField(default=0)),
+                ('cras', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumos_ficha', to='core.cras')),
+            ],
+            options={
+                'verbose_name': 'Resumo Diário de Fichas PAIF',
+                'verbose_name_plural': 'Resumos Diários de Fichas PAIF',
+                'indexes': [models.Index(fields=['data', 'cras'], name='resumo_ficha_data_cras_idx')],
+                'constraints': [models.UniqueConstraint(fields=('cras', 'data', 'tipo'), name='resumo_ficha_unico')],
+            },
+        ),
+        migrations.RunPython(popular_resumos, migrations.RunPython.noop),
+    ]
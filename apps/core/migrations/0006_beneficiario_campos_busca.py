@@ -0,0 +1,127 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:11
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+
+def _normalizar_texto(valor):
+    if not valor:
+        return ''
+    sem_acentos = ''.join(
+        c for c in unicodedata.normalize('NFKD', str(valor)) if not unicodedata.combining(c)
+    )
+    return ' '.join(sem_acentos.upper().split())
+
+
+def _somente_digitos(valor):
+    return re.sub(r'\D', '', str(valor)) if valor else ''
+
+
+def popular_campos_busca(apps, schema_editor):
+    Beneficiario = apps.get_model('core', 'Beneficiario')
+    lote = []
+    for beneficiario in Beneficiario.objects.only('nome_completo', 'cpf', 'nis', 'rg').iterator(chunk_size=2000):
+        beneficiario.nome_busca = _normalizar_texto(beneficiario.nome_completo)
+        beneficiario.cpf_digitos = _somente_digitos(beneficiario.cpf)
+        beneficiario.nis_digitos = _somente_digitos(beneficiario.nis)
+        beneficiario.rg_digitos = _somente_digitos(beneficiario.rg)
+        lote.append(beneficiario)
+        if len(lote) >= 2000:
+            Beneficiario.objects.bulk_update(lote, ['nome_busca', 'cpf_digitos', 'nis_digitos', 'rg_digitos'])
+            lote = []
+    if lote:
+        Beneficiario.objects.bulk_update(lote, ['nome_busca', 'cpf_digitos', 'nis_digitos', 'rg_digitos'])
+
+
+# DDL do índice textual do nome no momento desta migração (ver apps.core.busca),
+# copiado aqui para que alterações futuras daquele módulo não mudem a migração
+SQL_INDICE_SQLITE = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS core_beneficiario_busca USING fts5(
+        nome_busca,
+        content='core_beneficiario',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3 4'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS core_beneficiario_busca_ai AFTER INSERT ON core_beneficiario BEGIN
+        INSERT INTO core_beneficiario_busca(rowid, nome_busca) VALUES (new.id, new.nome_busca);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS core_beneficiario_busca_ad AFTER DELETE ON core_beneficiario BEGIN
+        INSERT INTO core_beneficiario_busca(core_beneficiario_busca, rowid, nome_busca) VALUES ('delete', old.id, old.nome_busca);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS core_beneficiario_busca_au AFTER UPDATE OF nome_busca ON core_beneficiario BEGIN
+        INSERT INTO core_beneficiario_busca(core_beneficiario_busca, rowid, nome_busca) VALUES ('delete', old.id, old.nome_busca);
+        INSERT INTO core_beneficiario_busca(rowid, nome_busca) VALUES (new.id, new.nome_busca);
+    END""",
+    "INSERT INTO core_beneficiario_busca(core_beneficiario_busca) VALUES ('rebuild')",
+]
+
+SQL_REMOVER_INDICE_SQLITE = [
+    "DROP TRIGGER IF EXISTS core_beneficiario_busca_ai",
+    "DROP TRIGGER IF EXISTS core_beneficiario_busca_ad",
+    "DROP TRIGGER IF EXISTS core_beneficiario_busca_au",
+    "DROP TABLE IF EXISTS core_beneficiario_busca",
+]
+
+SQL_INDICE_POSTGRESQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS core_benef_nome_busca_trgm ON core_beneficiario "
+    "USING gin (nome_busca gin_trgm_ops)",
+]
+
+SQL_REMOVER_INDICE_POSTGRESQL = [
+    "DROP INDEX IF EXISTS core_benef_nome_busca_trgm",
+]
+
+
+def _executar(schema_editor, comandos_por_banco):
+    for sql in comandos_por_banco.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def criar_indice_textual(apps, schema_editor):
+    _executar(schema_editor, {
+        'sqlite': SQL_REMOVER_INDICE_SQLITE + SQL_INDICE_SQLITE,
+        'postgresql': SQL_INDICE_POSTGRESQL,
+    })
+
+
+def remover_indice_textual(apps, schema_editor):
+    _executar(schema_editor, {
+        'sqlite': SQL_REMOVER_INDICE_SQLITE,
+        'postgresql': SQL_REMOVER_INDICE_POSTGRESQL,
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_resumos_diarios'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='beneficiario',
+            name='cpf_digitos',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=14),
+        ),
+        migrations.AddField(
+            model_name='beneficiario',
+            name='nis_digitos',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='beneficiario',
+            name='nome_busca',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='beneficiario',
+            name='rg_digitos',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=20),
+        ),
+        migrations.RunPython(popular_campos_busca, migrations.RunPython.noop),
+        migrations.RunPython(criar_indice_textual, remover_indice_textual),
+    ]
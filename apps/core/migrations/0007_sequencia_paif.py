@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:21
+
+import re
+
+from django.db import migrations, models
+
+
+def popular_sequencias(apps, schema_editor):
+    """Cria a sequência de cada ano a partir do maior número PAIF já emitido."""
+    FichaPAIF = apps.get_model('core', 'FichaPAIF')
+    SequenciaPAIF = apps.get_model('core', 'SequenciaPAIF')
+
+    maiores = {}
+    for numero in FichaPAIF.objects.values_list('numero_paif', flat=True).iterator():
+        correspondencia = re.fullmatch(r'(\d{4})-(\d+)', numero or '')
+        if correspondencia:
+            ano, sequencial = int(correspondencia.group(1)), int(correspondencia.group(2))
+            maiores[ano] = max(maiores.get(ano, 0), sequencial)
+
+    SequenciaPAIF.objects.bulk_create([
+        SequenciaPAIF(ano=ano, ultimo=ultimo) for ano, ultimo in maiores.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_beneficiario_campos_busca'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SequenciaPAIF',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ano', models.PositiveIntegerField(unique=True)),
+                ('ultimo', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Sequência PAIF',
+                'verbose_name_plural': 'Sequências PAIF',
+            },
+        ),
+        migrations.RunPython(popular_sequencias, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_tarefa'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tarefa',
+            name='sinal_em',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
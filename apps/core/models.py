@@ -1,6 +1,29 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
 from django.conf import settings
+from django.utils import timezone
 from datetime import datetime
+import re
+import unicodedata
+
+
+def normalizar_texto(valor):
+    """Remove acentos, converte para maiúsculas e compacta os espaços."""
+    if not valor:
+        return ''
+    sem_acentos = ''.join(
+        c for c in unicodedata.normalize('NFKD', str(valor)) if not unicodedata.combining(c)
+    )
+    return ' '.join(sem_acentos.upper().split())
+
+
+def somente_digitos(valor):
+    """Mantém apenas os dígitos de documentos como CPF, NIS e RG."""
+    if not valor:
+        return ''
+    return re.sub(r'\D', '', str(valor))
+
 
 class Cidade(models.Model):
     """Modelo para representar cidades."""
@@ -162,22 +185,26 @@ class FichaPAIF(models.Model):
     data_atualizacao = models.DateTimeField(auto_now=True)
     
     def save(self, *args, **kwargs):
-        if not self.numero_paif:
-            # Gerar número PAIF baseado em ano + sequencial
-            ano_atual = datetime.now().year
-            ultimo = FichaPAIF.objects.filter(
-                numero_paif__startswith=f"{ano_atual}-"
-            ).order_by('-numero_paif').first()
-            
-            if ultimo:
-                ultimo_seq = int(ultimo.numero_paif.split('-')[1])
-                prox_seq = ultimo_seq + 1
-            else:
-                prox_seq = 1
-                
-            self.numero_paif = f"{ano_atual}-{prox_seq:04d}"  # Ex: 2025-0001
-        
-        super().save(*args, **kwargs)
+        if self.numero_paif:
+            if self._state.adding:
+                # Número informado (admin, importação): a sequência do ano não pode ficar para trás
+                avancar_sequencia_paif([self.numero_paif])
+            super().save(*args, **kwargs)
+            return
+
+        # Gerar número PAIF baseado em ano + sequencial (ver SequenciaPAIF)
+        for tentativa in range(TENTATIVAS_NUMERO_PAIF):
+            self.numero_paif = proximo_numero_paif()  # Ex: 2025-0001
+            try:
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+                return
+            except IntegrityError:
+                numero, self.numero_paif = self.numero_paif, ''
+                # Só tenta de novo se o número já existia (gravado sem passar pela sequência)
+                if tentativa == TENTATIVAS_NUMERO_PAIF - 1 or not FichaPAIF.objects.filter(numero_paif=numero).exists():
+                    raise
+                sincronizar_sequencia_paif(sequencial_paif(numero)[0])
     
     def __str__(self):
         return f"PAIF {self.numero_paif} - {self.nome_referencia}"
@@ -200,6 +227,29 @@ class Beneficiario(models.Model):
     ficha_paif = models.ForeignKey(FichaPAIF, on_delete=models.SET_NULL, null=True, blank=True)
     cras = models.ForeignKey(CRAS, on_delete=models.PROTECT, null=True)
     
+    # Campos desnormalizados para busca indexada (ver apps.core.busca)
+    nome_busca = models.CharField(max_length=200, db_index=True, editable=False, default='')
+    cpf_digitos = models.CharField(max_length=14, db_index=True, editable=False, default='')
+    nis_digitos = models.CharField(max_length=20, db_index=True, editable=False, default='')
+    rg_digitos = models.CharField(max_length=20, db_index=True, editable=False, default='')
+    
+    CAMPOS_ORIGEM_BUSCA = ('nome_completo', 'cpf', 'nis', 'rg')
+    CAMPOS_BUSCA = ('nome_busca', 'cpf_digitos', 'nis_digitos', 'rg_digitos')
+    
+    def atualizar_campos_busca(self):
+        """Recalcula os campos de busca (usar antes de bulk_create/bulk_update)."""
+        self.nome_busca = normalizar_texto(self.nome_completo)
+        self.cpf_digitos = somente_digitos(self.cpf)
+        self.nis_digitos = somente_digitos(self.nis)
+        self.rg_digitos = somente_digitos(self.rg)
+    
+    def save(self, *args, **kwargs):
+        self.atualizar_campos_busca()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & set(self.CAMPOS_ORIGEM_BUSCA):
+            kwargs['update_fields'] = set(update_fields) | set(self.CAMPOS_BUSCA)
+        super().save(*args, **kwargs)
+    
     @property
     def numero_paif(self):
         """Retorna o número PAIF da família do beneficiário, se disponível."""
@@ -322,4 +372,207 @@ class Atendimento(models.Model):
         default='aguardando'
     )
     resumo = models.TextField(null=True, blank=True)
-    evolucao = models.TextField(null=True, blank=True)
\ No newline at end of file
+    evolucao = models.TextField(null=True, blank=True)
+
+class ResumoDiarioAtendimento(models.Model):
+    """Total diário de atendimentos por CRAS e tipo de atendimento (pré-agregado)."""
+    cras = models.ForeignKey(CRAS, on_delete=models.CASCADE, related_name='resumos_atendimento')
+    data = models.DateField()
+    tipo_atendimento = models.CharField(max_length=50)
+    total = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.cras} - {self.data:%d/%m/%Y} - {self.tipo_atendimento}: {self.total}"
+
+    class Meta:
+        verbose_name = "Resumo Diário de Atendimentos"
+        verbose_name_plural = "Resumos Diários de Atendimentos"
+        constraints = [
+            models.UniqueConstraint(fields=['cras', 'data', 'tipo_atendimento'], name='resumo_atendimento_unico'),
+        ]
+        indexes = [
+            models.Index(fields=['data', 'cras'], name='resumo_atend_data_cras_idx'),
+        ]
+
+
+class ResumoDiarioFicha(models.Model):
+    """Total diário de fichas PAIF por CRAS e tipo (inclusão/atualização) (pré-agregado)."""
+    cras = models.ForeignKey(CRAS, on_delete=models.CASCADE, related_name='resumos_ficha')
+    data = models.DateField()
+    tipo = models.CharField(max_length=20)
+    total = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.cras} - {self.data:%d/%m/%Y} - {self.tipo}: {self.total}"
+
+    class Meta:
+        verbose_name = "Resumo Diário de Fichas PAIF"
+        verbose_name_plural = "Resumos Diários de Fichas PAIF"
+        constraints = [
+            models.UniqueConstraint(fields=['cras', 'data', 'tipo'], name='resumo_ficha_unico'),
+        ]
+        indexes = [
+            models.Index(fields=['data', 'cras'], name='resumo_ficha_data_cras_idx'),
+        ]
+
+
+def formatar_numero_paif(ano, sequencial):
+    """Formata o número PAIF no padrão ano-sequencial (ex.: 2025-0001)."""
+    return f"{ano}-{sequencial:04d}"
+
+
+_NUMERO_PAIF = re.compile(r'^(\d{4})-(\d+)$')
+
+# Tentativas de gravar uma ficha nova quando o número reservado já existe
+TENTATIVAS_NUMERO_PAIF = 3
+
+
+def sequencial_paif(numero):
+    """(ano, sequencial) de um número no padrão ano-sequencial, ou None."""
+    correspondencia = _NUMERO_PAIF.match(numero or '')
+    if not correspondencia:
+        return None
+    return int(correspondencia[1]), int(correspondencia[2])
+
+
+def maior_sequencial_paif(ano):
+    """Maior sequencial já usado em fichas do ano (varre as fichas; usado na criação e na correção da sequência)."""
+    prefixo = f"{ano}-"
+    maior = 0
+    for numero in FichaPAIF.objects.filter(numero_paif__startswith=prefixo).values_list('numero_paif', flat=True).iterator():
+        sufixo = numero[len(prefixo):]
+        if sufixo.isdigit():
+            maior = max(maior, int(sufixo))
+    return maior
+
+
+class SequenciaPAIF(models.Model):
+    """Último sequencial de número PAIF emitido em cada ano."""
+    ano = models.PositiveIntegerField(unique=True)
+    ultimo = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.ano}: {self.ultimo}"
+
+    @classmethod
+    def reservar(cls, quantidade=1, ano=None):
+        """
+        Reserva `quantidade` sequenciais consecutivos do ano de forma atômica.
+
+        O incremento é um único UPDATE (ultimo = ultimo + quantidade), que
+        bloqueia a linha do ano até o fim da transação; processos concorrentes
+        nunca recebem o mesmo número. Se a transação externa for desfeita, a
+        reserva também é.
+
+        Returns:
+            range com os sequenciais reservados
+        """
+        if quantidade < 1:
+            raise ValueError("A quantidade de números reservados deve ser maior que zero.")
+        ano = ano or datetime.now().year
+
+        with transaction.atomic():
+            if not cls.objects.filter(ano=ano).update(ultimo=F('ultimo') + quantidade):
+                # Primeiro número do ano: continuar a partir das fichas já cadastradas
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(ano=ano, ultimo=maior_sequencial_paif(ano) + quantidade)
+                except IntegrityError:
+                    cls.objects.filter(ano=ano).update(ultimo=F('ultimo') + quantidade)
+            ultimo = cls.objects.filter(ano=ano).values_list('ultimo', flat=True).get()
+
+        return range(ultimo - quantidade + 1, ultimo + 1)
+
+    @classmethod
+    def avancar(cls, ano, sequencial):
+        """
+        Garante que a sequência do ano esteja em pelo menos `sequencial`
+        (UPDATE ... SET ultimo = MAX(ultimo, sequencial)).
+
+        Usado quando fichas são gravadas com número informado, para que os
+        números reservados depois não colidam com eles.
+        """
+        with transaction.atomic():
+            if not cls.objects.filter(ano=ano).update(ultimo=Greatest(F('ultimo'), Value(sequencial))):
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(ano=ano, ultimo=max(maior_sequencial_paif(ano), sequencial))
+                except IntegrityError:
+                    cls.objects.filter(ano=ano).update(ultimo=Greatest(F('ultimo'), Value(sequencial)))
+
+    class Meta:
+        verbose_name = "Sequência PAIF"
+        verbose_name_plural = "Sequências PAIF"
+
+
+def reservar_numeros_paif(quantidade, ano=None):
+    """Reserva `quantidade` números PAIF do ano (padrão: ano atual) em uma única operação."""
+    ano = ano or datetime.now().year
+    return [formatar_numero_paif(ano, sequencial) for sequencial in SequenciaPAIF.reservar(quantidade, ano)]
+
+
+def avancar_sequencia_paif(numeros):
+    """Avança a sequência de cada ano até o maior dos números PAIF informados."""
+    maiores = {}
+    for numero in numeros:
+        partes = sequencial_paif(numero)
+        if partes:
+            ano, sequencial = partes
+            maiores[ano] = max(maiores.get(ano, 0), sequencial)
+    for ano, sequencial in sorted(maiores.items()):
+        SequenciaPAIF.avancar(ano, sequencial)
+
+
+def sincronizar_sequencia_paif(ano):
+    """Avança a sequência do ano até o maior número já gravado nas fichas (varre as fichas do ano)."""
+    SequenciaPAIF.avancar(ano, maior_sequencial_paif(ano))
+
+
+def proximo_numero_paif(ano=None):
+    """Retorna o próximo número PAIF livre do ano (padrão: ano atual)."""
+    return reservar_numeros_paif(1, ano)[0]
+
+
+class Tarefa(models.Model):
+    """Tarefa executada em segundo plano pelos trabalhadores (ver apps.core.tarefas)."""
+    STATUS_PENDENTE = 'pendente'
+    STATUS_EXECUTANDO = 'executando'
+    STATUS_CONCLUIDA = 'concluida'
+    STATUS_ERRO = 'erro'
+    STATUS_CHOICES = [
+        (STATUS_PENDENTE, 'Pendente'),
+        (STATUS_EXECUTANDO, 'Executando'),
+        (STATUS_CONCLUIDA, 'Concluída'),
+        (STATUS_ERRO, 'Erro'),
+    ]
+
+    tipo = models.CharField(max_length=50)
+    parametros = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDENTE)
+    progresso = models.PositiveSmallIntegerField(default=0)
+    mensagem = models.CharField(max_length=255, blank=True, default='')
+    tentativas = models.PositiveSmallIntegerField(default=0)
+    max_tentativas = models.PositiveSmallIntegerField(default=3)
+    executar_apos = models.DateTimeField(default=timezone.now)
+    trabalhador = models.CharField(max_length=100, blank=True, default='')
+    resultado = models.JSONField(null=True, blank=True)
+    erro = models.TextField(blank=True, default='')
+    arquivo = models.FileField(upload_to='tarefas/%Y/%m/', blank=True)
+    nome_arquivo = models.CharField(max_length=255, blank=True, default='')
+    tipo_conteudo = models.CharField(max_length=100, blank=True, default='')
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    criado_em = models.DateTimeField(auto_now_add=True)
+    iniciado_em = models.DateTimeField(null=True, blank=True)
+    # Último sinal do trabalhador (reserva ou progresso) durante a execução
+    sinal_em = models.DateTimeField(null=True, blank=True)
+    concluido_em = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.tipo} #{self.pk} ({self.get_status_display()})"
+
+    class Meta:
+        verbose_name = "Tarefa"
+        verbose_name_plural = "Tarefas"
+        indexes = [
+            models.Index(fields=['status', 'executar_apos'], name='tarefa_fila_idx'),
+        ]
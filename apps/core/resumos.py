@@ -0,0 +1,209 @@
+"""
+Tabelas de resumo diário (rollups) das atividades dos CRAS.
+
+Os resumos são mantidos incrementalmente pelos signals de Atendimento e
+FichaPAIF (ver apps.core.signals) e podem ser reconstruídos para um período
+com o comando `reconstruir_resumos`. Os dashboards leem apenas estas tabelas
+em vez de varrer o histórico completo de atendimentos.
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Min, Max, Sum
+
+from apps.core.models import (
+    Atendimento, FichaPAIF, ResumoDiarioAtendimento, ResumoDiarioFicha,
+)
+
+# Tipos de atendimento contabilizados como visita domiciliar
+TERMO_VISITA = 'visita'
+
+
+def chave_atendimento(atendimento):
+    """Retorna os campos do resumo afetado pelo atendimento (ou None sem CRAS)."""
+    cras_id = atendimento.beneficiario.cras_id if atendimento.beneficiario_id else None
+    if not cras_id or not atendimento.data_atendimento:
+        return None
+    return {
+        'cras_id': cras_id,
+        'data': atendimento.data_atendimento,
+        'tipo_atendimento': atendimento.tipo_atendimento,
+    }
+
+
+def chave_atendimento_salvo(pk):
+    """Lê do banco a chave de resumo de um atendimento já gravado."""
+    valores = Atendimento.objects.filter(pk=pk).values(
+        'beneficiario__cras_id', 'data_atendimento', 'tipo_atendimento'
+    ).first()
+    if not valores or not valores['beneficiario__cras_id']:
+        return None
+    return {
+        'cras_id': valores['beneficiario__cras_id'],
+        'data': valores['data_atendimento'],
+        'tipo_atendimento': valores['tipo_atendimento'],
+    }
+
+
+def chave_ficha(ficha):
+    """Retorna os campos do resumo afetado pela ficha PAIF."""
+    if not ficha.cras_id or not ficha.data:
+        return None
+    return {'cras_id': ficha.cras_id, 'data': ficha.data, 'tipo': ficha.tipo}
+
+
+def chave_ficha_salva(pk):
+    """Lê do banco a chave de resumo de uma ficha já gravada."""
+    valores = FichaPAIF.objects.filter(pk=pk).values('cras_id', 'data', 'tipo').first()
+    if not valores or not valores['cras_id']:
+        return None
+    return valores
+
+
+def ajustar_resumo(modelo, chave, delta):
+    """Soma `delta` ao total da linha de resumo identificada por `chave`."""
+    if chave is None or not delta:
+        return
+
+    atualizados = modelo.objects.filter(**chave).update(total=F('total') + delta)
+    if delta < 0:
+        # Remover linhas zeradas para manter o resumo idêntico a uma reconstrução
+        modelo.objects.filter(total__lte=0, **chave).delete()
+        return
+    if atualizados:
+        return
+
+    # Primeira ocorrência do dia: criar a linha (tolerando criação concorrente)
+    try:
+        with transaction.atomic():
+            modelo.objects.create(total=delta, **chave)
+    except IntegrityError:
+        modelo.objects.filter(**chave).update(total=F('total') + delta)
+
+
+def mover_resumo(modelo, chave_anterior, chave_nova):
+    """Transfere uma ocorrência de um resumo para outro após uma alteração."""
+    if chave_anterior == chave_nova:
+        return
+    ajustar_resumo(modelo, chave_anterior, -1)
+    ajustar_resumo(modelo, chave_nova, 1)
+
+
+def transferir_atendimentos_beneficiario(beneficiario_id, cras_anterior_id, cras_novo_id):
+    """Move os atendimentos de um beneficiário que mudou de CRAS entre os resumos."""
+    if cras_anterior_id == cras_novo_id:
+        return
+    grupos = (
+        Atendimento.objects.filter(beneficiario_id=beneficiario_id).order_by()
+        .values('data_atendimento', 'tipo_atendimento').annotate(total=Count('pk'))
+    )
+    for grupo in grupos:
+        for cras_id, sinal in ((cras_anterior_id, -1), (cras_novo_id, 1)):
+            if cras_id:
+                chave = {'cras_id': cras_id, 'data': grupo['data_atendimento'],
+                         'tipo_atendimento': grupo['tipo_atendimento']}
+                ajustar_resumo(ResumoDiarioAtendimento, chave, sinal * grupo['total'])
+
+
+def reconstruir_resumos(data_inicio=None, data_fim=None, cras_ids=None):
+    """
+    Recalcula os resumos diários a partir dos dados brutos.
+
+    Args:
+        data_inicio: Data inicial (padrão: primeira data registrada)
+        data_fim: Data final (padrão: última data registrada)
+        cras_ids: Restringe a reconstrução a essas unidades (opcional)
+
+    Returns:
+        Dicionário com a quantidade de linhas de resumo gravadas por tabela
+    """
+    if data_inicio is None or data_fim is None:
+        limites_atend = Atendimento.objects.aggregate(inicio=Min('data_atendimento'), fim=Max('data_atendimento'))
+        limites_ficha = FichaPAIF.objects.aggregate(inicio=Min('data'), fim=Max('data'))
+        inicios = [d for d in (limites_atend['inicio'], limites_ficha['inicio']) if d]
+        fins = [d for d in (limites_atend['fim'], limites_ficha['fim']) if d]
+        data_inicio = data_inicio or (min(inicios) if inicios else None)
+        data_fim = data_fim or (max(fins) if fins else None)
+
+    if data_inicio is None or data_fim is None:
+        return {'atendimentos': 0, 'fichas': 0}
+
+    atendimentos = Atendimento.objects.filter(
+        data_atendimento__range=(data_inicio, data_fim),
+        beneficiario__cras__isnull=False,
+    )
+    fichas = FichaPAIF.objects.filter(data__range=(data_inicio, data_fim))
+    resumos_atend = ResumoDiarioAtendimento.objects.filter(data__range=(data_inicio, data_fim))
+    resumos_ficha = ResumoDiarioFicha.objects.filter(data__range=(data_inicio, data_fim))
+
+    if cras_ids is not None:
+        cras_ids = list(cras_ids)
+        atendimentos = atendimentos.filter(beneficiario__cras_id__in=cras_ids)
+        fichas = fichas.filter(cras_id__in=cras_ids)
+        resumos_atend = resumos_atend.filter(cras_id__in=cras_ids)
+        resumos_ficha = resumos_ficha.filter(cras_id__in=cras_ids)
+
+    novos_atend = [
+        ResumoDiarioAtendimento(
+            cras_id=linha['beneficiario__cras_id'],
+            data=linha['data_atendimento'],
+            tipo_atendimento=linha['tipo_atendimento'],
+            total=linha['total'],
+        )
+        for linha in atendimentos.order_by()
+        .values('beneficiario__cras_id', 'data_atendimento', 'tipo_atendimento')
+        .annotate(total=Count('pk'))
+    ]
+    novos_ficha = [
+        ResumoDiarioFicha(cras_id=linha['cras_id'], data=linha['data'], tipo=linha['tipo'], total=linha['total'])
+        for linha in fichas.order_by().values('cras_id', 'data', 'tipo').annotate(total=Count('pk'))
+    ]
+
+    with transaction.atomic():
+        resumos_atend.delete()
+        resumos_ficha.delete()
+        ResumoDiarioAtendimento.objects.bulk_create(novos_atend, batch_size=1000)
+        ResumoDiarioFicha.objects.bulk_create(novos_ficha, batch_size=1000)
+
+    return {'atendimentos': len(novos_atend), 'fichas': len(novos_ficha)}
+
+
+# Consultas de leitura usadas pelos dashboards
+
+def _filtrar(queryset, data_inicio=None, data_fim=None, cras_ids=None):
+    if data_inicio is not None:
+        queryset = queryset.filter(data__gte=data_inicio)
+    if data_fim is not None:
+        queryset = queryset.filter(data__lte=data_fim)
+    if cras_ids is not None:
+        queryset = queryset.filter(cras_id__in=list(cras_ids))
+    return queryset
+
+
+def total_atendimentos(data_inicio=None, data_fim=None, cras_ids=None, tipo_contendo=None):
+    """Soma os atendimentos do período (opcionalmente filtrando o tipo)."""
+    resumos = _filtrar(ResumoDiarioAtendimento.objects.all(), data_inicio, data_fim, cras_ids)
+    if tipo_contendo:
+        resumos = resumos.filter(tipo_atendimento__icontains=tipo_contendo)
+    return resumos.aggregate(total=Sum('total'))['total'] or 0
+
+
+def total_visitas(data_inicio=None, data_fim=None, cras_ids=None):
+    """Soma as visitas domiciliares do período."""
+    return total_atendimentos(data_inicio, data_fim, cras_ids, tipo_contendo=TERMO_VISITA)
+
+
+def atendimentos_por_tipo(data_inicio=None, data_fim=None, cras_ids=None):
+    """Retorna [{'label': tipo, 'valor': total}] ordenado pelo maior total."""
+    resumos = _filtrar(ResumoDiarioAtendimento.objects.all(), data_inicio, data_fim, cras_ids)
+    return [
+        {'label': linha['tipo_atendimento'], 'valor': linha['valor']}
+        for linha in resumos.values('tipo_atendimento').annotate(valor=Sum('total')).order_by('-valor')
+    ]
+
+
+def total_fichas(data_inicio=None, data_fim=None, cras_ids=None, tipo=None):
+    """Soma as fichas PAIF do período (todas, se não houver período)."""
+    resumos = _filtrar(ResumoDiarioFicha.objects.all(), data_inicio, data_fim, cras_ids)
+    if tipo:
+        resumos = resumos.filter(tipo=tipo)
+    return resumos.aggregate(total=Sum('total'))['total'] or 0
@@ -0,0 +1,94 @@
+"""
+Signals que mantêm os resumos diários (apps.core.resumos) sincronizados
+com Atendimento, FichaPAIF e a unidade CRAS dos beneficiários, e que
+descartam os PDFs em cache de fichas alteradas ou removidas.
+"""
+
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from apps.core.models import Atendimento, Beneficiario, FichaPAIF, ResumoDiarioAtendimento, ResumoDiarioFicha
+from apps.core import resumos
+from apps.relatorios.utils.cache_documentos import invalidar_documentos
+
+
+@receiver(pre_save, sender=Atendimento)
+def guardar_chave_atendimento(sender, instance, raw=False, **kwargs):
+    """Guarda a chave de resumo anterior para detectar mudanças de dia/tipo/CRAS."""
+    if raw:
+        return
+    instance._chave_resumo_anterior = resumos.chave_atendimento_salvo(instance.pk) if instance.pk else None
+
+
+@receiver(post_save, sender=Atendimento)
+def atualizar_resumo_atendimento(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    chave_nova = resumos.chave_atendimento(instance)
+    if created:
+        resumos.ajustar_resumo(ResumoDiarioAtendimento, chave_nova, 1)
+    else:
+        chave_anterior = getattr(instance, '_chave_resumo_anterior', None)
+        resumos.mover_resumo(ResumoDiarioAtendimento, chave_anterior, chave_nova)
+
+
+@receiver(pre_delete, sender=Atendimento)
+def guardar_chave_atendimento_removido(sender, instance, **kwargs):
+    # Na exclusão em cascata o beneficiário ainda existe apenas neste momento
+    instance._chave_resumo_anterior = resumos.chave_atendimento_salvo(instance.pk)
+
+
+@receiver(post_delete, sender=Atendimento)
+def remover_resumo_atendimento(sender, instance, **kwargs):
+    resumos.ajustar_resumo(ResumoDiarioAtendimento, getattr(instance, '_chave_resumo_anterior', None), -1)
+
+
+@receiver(pre_save, sender=FichaPAIF)
+def guardar_chave_ficha(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    instance._chave_resumo_anterior = resumos.chave_ficha_salva(instance.pk) if instance.pk else None
+
+
+@receiver(post_save, sender=FichaPAIF)
+def atualizar_resumo_ficha(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    chave_nova = resumos.chave_ficha(instance)
+    if created:
+        resumos.ajustar_resumo(ResumoDiarioFicha, chave_nova, 1)
+    else:
+        chave_anterior = getattr(instance, '_chave_resumo_anterior', None)
+        resumos.mover_resumo(ResumoDiarioFicha, chave_anterior, chave_nova)
+
+
+@receiver(post_delete, sender=FichaPAIF)
+def remover_resumo_ficha(sender, instance, **kwargs):
+    resumos.ajustar_resumo(ResumoDiarioFicha, resumos.chave_ficha(instance), -1)
+
+
+@receiver(pre_save, sender=Beneficiario)
+def guardar_cras_beneficiario(sender, instance, raw=False, **kwargs):
+    if raw or not instance.pk:
+        return
+    instance._cras_anterior_id = Beneficiario.objects.filter(pk=instance.pk).values_list('cras_id', flat=True).first()
+
+
+@receiver(post_save, sender=Beneficiario)
+def transferir_resumos_beneficiario(sender, instance, created, raw=False, **kwargs):
+    """Atendimentos são contabilizados no CRAS do beneficiário; acompanhar a troca de unidade."""
+    if raw or created:
+        return
+    resumos.transferir_atendimentos_beneficiario(
+        instance.pk, getattr(instance, '_cras_anterior_id', None), instance.cras_id
+    )
+
+
+@receiver(post_save, sender=FichaPAIF)
+@receiver(post_delete, sender=FichaPAIF)
+def invalidar_pdf_ficha(sender, instance, created=False, raw=False, **kwargs):
+    # Uma ficha nova ainda não tem PDF; nas demais a data_atualizacao já mudou
+    # o nome do documento, e a versão anterior é apenas removida do disco
+    if raw or created:
+        return
+    invalidar_documentos('ficha_paif', instance.pk)
@@ -0,0 +1,183 @@
+"""
+Snapshots colunares (Parquet) das tabelas principais, para análise em BI.
+
+Cada tabela é gravada em um arquivo .parquet comprimido, com tipos Arrow
+derivados dos campos do modelo: datas como date32/timestamp, campos com
+choices como colunas categóricas (dictionary) e chaves estrangeiras como
+inteiros (<campo>_id). A leitura do banco é feita em lotes pelo cursor e
+cada lote vira um row group, de modo que a memória usada não depende do
+tamanho da tabela e ferramentas como DuckDB/pandas leem apenas as colunas
+e os row groups de que precisam.
+
+Os snapshots cobrem todos os CRAS e não incluem CPF, NIS e RG.
+
+Requer o pacote pyarrow.
+"""
+
+import json
+import os
+import zipfile
+from datetime import datetime
+
+from django.db import models
+
+from apps.core.models import Atendimento, Beneficiario, FichaPAIF, ParticipacaoSCFV
+
+# Linhas por row group (e por lote lido do banco)
+TAMANHO_GRUPO_LINHAS = 50000
+COMPRESSAO = 'zstd'
+
+# Documentos pessoais não entram no extrato de BI
+DOCUMENTOS = ('cpf', 'nis', 'rg')
+
+# Tabelas exportadas: nome do arquivo -> (modelo, campos que não entram no snapshot)
+TABELAS = {
+    'fichas_paif': (FichaPAIF, DOCUMENTOS),
+    'beneficiarios': (Beneficiario, (*DOCUMENTOS, 'nome_busca', 'cpf_digitos', 'nis_digitos', 'rg_digitos')),
+    'atendimentos': (Atendimento, ()),
+    'participacoes_scfv': (ParticipacaoSCFV, ()),
+}
+
+
+class ErroSnapshot(Exception):
+    pass
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ErroSnapshot('O pacote pyarrow é necessário para gerar snapshots Parquet (pip install pyarrow).')
+    return pyarrow, pyarrow.parquet
+
+
+def _tipo_arrow(pa, campo):
+    if campo.choices:
+        return pa.dictionary(pa.int32(), pa.string())
+    if isinstance(campo, models.ForeignKey):
+        return pa.int64()
+    if isinstance(campo, models.BooleanField):
+        return pa.bool_()
+    if isinstance(campo, (models.SmallIntegerField, models.PositiveSmallIntegerField)):
+        return pa.int16() if isinstance(campo, models.SmallIntegerField) else pa.int32()
+    if isinstance(campo, (models.AutoField, models.BigAutoField, models.IntegerField)):
+        return pa.int64()
+    if isinstance(campo, models.DecimalField):
+        return pa.decimal128(campo.max_digits, campo.decimal_places)
+    if isinstance(campo, models.FloatField):
+        return pa.float64()
+    if isinstance(campo, models.DateTimeField):
+        return pa.timestamp('us', tz='UTC')
+    if isinstance(campo, models.DateField):
+        return pa.date32()
+    if isinstance(campo, models.TimeField):
+        return pa.time64('us')
+    return pa.string()
+
+
+def esquema_tabela(modelo, excluidos=()):
+    """Retorna (nomes das colunas no banco, esquema Arrow) do modelo."""
+    pa, _ = _pyarrow()
+    campos = [campo for campo in modelo._meta.concrete_fields if campo.name not in excluidos]
+    colunas = [campo.attname for campo in campos]
+    esquema = pa.schema([
+        pa.field(campo.attname, _tipo_arrow(pa, campo), nullable=True) for campo in campos
+    ])
+    return colunas, esquema
+
+
+def _array(pa, valores, tipo):
+    if pa.types.is_dictionary(tipo):
+        return pa.array(valores, type=pa.string()).dictionary_encode()
+    if pa.types.is_string(tipo):
+        valores = [
+            valor if valor is None or isinstance(valor, str) else json.dumps(valor, ensure_ascii=False, default=str)
+            for valor in valores
+        ]
+    return pa.array(valores, type=tipo)
+
+
+def escrever_tabela(modelo, caminho, excluidos=(), tamanho_grupo=TAMANHO_GRUPO_LINHAS):
+    """
+    Grava a tabela do modelo em `caminho` (.parquet), um row group por lote.
+
+    O arquivo é escrito com outro nome e renomeado ao final, para que um
+    leitor nunca encontre um snapshot incompleto.
+
+    Returns:
+        Quantidade de linhas gravadas
+    """
+    pa, pq = _pyarrow()
+    colunas, esquema = esquema_tabela(modelo, excluidos)
+    tipos = [campo.type for campo in esquema]
+    temporario = caminho + '.tmp'
+    total = 0
+
+    def gravar(escritor, linhas):
+        arrays = [_array(pa, valores, tipo) for valores, tipo in zip(zip(*linhas), tipos)]
+        escritor.write_batch(pa.RecordBatch.from_arrays(arrays, schema=esquema), row_group_size=tamanho_grupo)
+
+    try:
+        with pq.ParquetWriter(temporario, esquema, compression=COMPRESSAO) as escritor:
+            linhas = []
+            consulta = modelo.objects.order_by('pk').values_list(*colunas)
+            for linha in consulta.iterator(chunk_size=min(tamanho_grupo, 10000)):
+                linhas.append(linha)
+                if len(linhas) == tamanho_grupo:
+                    gravar(escritor, linhas)
+                    total += len(linhas)
+                    linhas = []
+            if linhas:
+                gravar(escritor, linhas)
+                total += len(linhas)
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+    return total
+
+
+def gerar_snapshot(destino, tabelas=None, tamanho_grupo=TAMANHO_GRUPO_LINHAS, progresso=None):
+    """
+    Grava um arquivo <tabela>.parquet por tabela em `destino`.
+
+    Args:
+        destino: Diretório de saída (criado se não existir)
+        tabelas: Nomes de TABELAS a exportar (padrão: todas)
+        tamanho_grupo: Linhas por row group
+        progresso: Função opcional chamada com (tabela, linhas gravadas)
+
+    Returns:
+        Dicionário tabela -> quantidade de linhas
+    """
+    _pyarrow()
+    tabelas = list(tabelas or TABELAS)
+    desconhecidas = set(tabelas) - set(TABELAS)
+    if desconhecidas:
+        raise ErroSnapshot(f"Tabela desconhecida: {', '.join(sorted(desconhecidas))}")
+
+    os.makedirs(destino, exist_ok=True)
+    totais = {}
+    for nome in tabelas:
+        modelo, excluidos = TABELAS[nome]
+        totais[nome] = escrever_tabela(modelo, os.path.join(destino, f'{nome}.parquet'), excluidos, tamanho_grupo)
+        if progresso:
+            progresso(nome, totais[nome])
+    return totais
+
+
+def compactar_snapshot(diretorio, arquivo):
+    """
+    Junta os .parquet do diretório em um ZIP (sem recomprimir, pois o
+    Parquet já é comprimido) para download único.
+    """
+    with zipfile.ZipFile(arquivo, 'w', compression=zipfile.ZIP_STORED) as pacote:
+        for nome in sorted(os.listdir(diretorio)):
+            if nome.endswith('.parquet'):
+                pacote.write(os.path.join(diretorio, nome), nome)
+
+
+def nome_snapshot():
+    return f"snapshot_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
@@ -0,0 +1,347 @@
+"""
+Fila de tarefas em segundo plano, mantida no próprio banco de dados.
+
+As operações demoradas (exportações, importações, reconstrução de resumos)
+são enfileiradas como linhas de Tarefa e executadas pelos trabalhadores do
+comando `processar_tarefas`, liberando os processos web.
+
+Cada tipo de tarefa é uma função registrada com @registrar_tarefa. Ela
+recebe um ContextoTarefa (para informar o progresso e gravar o arquivo de
+resultado) e os parâmetros da tarefa como argumentos nomeados; o valor
+retornado (serializável em JSON) é gravado em Tarefa.resultado.
+
+    @registrar_tarefa('reconstruir_resumos')
+    def tarefa_reconstruir_resumos(contexto, inicio=None, fim=None):
+        ...
+
+A reserva usa SELECT ... FOR UPDATE SKIP LOCKED onde houver suporte
+(PostgreSQL) seguido de um UPDATE condicional no status, de forma que dois
+trabalhadores nunca executam a mesma tarefa também em bancos sem SKIP
+LOCKED (SQLite).
+"""
+
+import logging
+import os
+import posixpath
+import socket
+import tempfile
+import time
+import traceback
+from datetime import date, timedelta
+
+from django.core.files import File
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from apps.core.models import Tarefa
+
+logger = logging.getLogger(__name__)
+
+# Espera antes de uma nova tentativa: INTERVALO_RETENTATIVA * 2^(tentativa - 1)
+INTERVALO_RETENTATIVA = timedelta(seconds=30)
+
+# Tarefas em execução sem sinal do trabalhador (reserva ou progresso) há
+# mais tempo que isso são consideradas abandonadas (trabalhador encerrado
+# no meio da execução) e voltam para a fila
+TEMPO_MAXIMO_SEM_SINAL = timedelta(hours=2)
+
+# Intervalo mínimo entre duas gravações de progresso da mesma tarefa
+INTERVALO_PROGRESSO = 1.0
+
+# Resultados em memória até este tamanho; acima disso vão para arquivo temporário
+LIMITE_RESULTADO_EM_MEMORIA = 5 * 1024 * 1024
+
+# Diretório do storage com os arquivos enviados para as tarefas processarem
+DIRETORIO_ENTRADA = 'tarefas/entrada/'
+
+TAREFAS = {}
+
+
+class TipoTarefa:
+    def __init__(self, nome, funcao, permissao=None, max_tentativas=3):
+        self.nome = nome
+        self.funcao = funcao
+        self.permissao = permissao
+        self.max_tentativas = max_tentativas
+
+    def permitido(self, usuario):
+        if usuario.is_superuser or self.permissao is None:
+            return True
+        return self.permissao(usuario)
+
+
+def registrar_tarefa(nome, permissao=None, max_tentativas=3):
+    """
+    Registra a função decorada como tipo de tarefa.
+
+    Args:
+        nome: Identificador usado em Tarefa.tipo
+        permissao: Função opcional (usuario) -> bool que autoriza o enfileiramento
+        max_tentativas: Execuções permitidas antes de marcar a tarefa com erro
+    """
+    def decorador(funcao):
+        TAREFAS[nome] = TipoTarefa(nome, funcao, permissao, max_tentativas)
+        return funcao
+    return decorador
+
+
+class ContextoTarefa:
+    """Acesso da função da tarefa ao progresso e ao arquivo de resultado."""
+
+    def __init__(self, tarefa):
+        self.tarefa = tarefa
+        self._ultima_gravacao = 0.0
+
+    def progresso(self, percentual, mensagem=None):
+        """
+        Atualiza o progresso (0-100). Gravações muito próximas são descartadas.
+
+        Cada gravação também renova o sinal da tarefa: tarefas longas devem
+        informar o progresso para não serem tomadas como abandonadas.
+        """
+        percentual = max(0, min(100, int(percentual)))
+        agora = time.monotonic()
+        if agora - self._ultima_gravacao < INTERVALO_PROGRESSO and percentual < 100:
+            return
+        self._ultima_gravacao = agora
+
+        campos = {'progresso': percentual, 'sinal_em': timezone.now()}
+        if mensagem is not None:
+            campos['mensagem'] = mensagem[:255]
+        Tarefa.objects.filter(pk=self.tarefa.pk).update(**campos)
+        for campo, valor in campos.items():
+            setattr(self.tarefa, campo, valor)
+
+    def salvar_arquivo(self, arquivo, nome, tipo_conteudo):
+        """Grava o arquivo de resultado (objeto de arquivo aberto) no storage."""
+        arquivo.seek(0)
+        self.tarefa.arquivo.save(nome, File(arquivo, name=nome), save=False)
+        self.tarefa.nome_arquivo = nome
+        self.tarefa.tipo_conteudo = tipo_conteudo
+        Tarefa.objects.filter(pk=self.tarefa.pk).update(
+            arquivo=self.tarefa.arquivo.name, nome_arquivo=nome, tipo_conteudo=tipo_conteudo
+        )
+
+    def salvar_resposta(self, resposta, nome=None):
+        """
+        Grava como resultado o conteúdo de uma resposta de download já pronta
+        (ex.: as funções de apps.relatorios.utils.pdf_generator).
+        """
+        nome = nome or getattr(resposta, 'filename', None) or f'tarefa_{self.tarefa.pk}'
+        with tempfile.SpooledTemporaryFile(max_size=LIMITE_RESULTADO_EM_MEMORIA) as saida:
+            if resposta.streaming:
+                for bloco in resposta.streaming_content:
+                    saida.write(bloco)
+            else:
+                saida.write(resposta.content)
+            resposta.close()
+            self.salvar_arquivo(saida, nome, resposta['Content-Type'])
+
+
+def arquivo_entrada(nome):
+    """
+    Valida o nome no storage de um arquivo enviado para a tarefa.
+
+    Só são aceitos arquivos gravados em DIRETORIO_ENTRADA pela view de
+    enfileiramento; qualquer outro caminho levanta ValueError.
+    """
+    normalizado = posixpath.normpath(str(nome or ''))
+    if normalizado != nome or not normalizado.startswith(DIRETORIO_ENTRADA):
+        raise ValueError(f"Arquivo de entrada inválido: {nome}")
+    return normalizado
+
+
+def _valor_json(valor):
+    if isinstance(valor, date):
+        return valor.isoformat()
+    return valor
+
+
+def enfileirar(tipo, parametros=None, usuario=None, executar_apos=None):
+    """
+    Cria uma tarefa pendente.
+
+    Args:
+        tipo: Nome registrado com @registrar_tarefa
+        parametros: Dicionário serializável em JSON passado à função da tarefa
+        usuario: Usuário que solicitou (dono do resultado)
+        executar_apos: Não executar antes deste momento (padrão: imediatamente)
+
+    Returns:
+        Instância de Tarefa criada
+    """
+    if tipo not in TAREFAS:
+        raise ValueError(f"Tipo de tarefa desconhecido: {tipo}")
+    return Tarefa.objects.create(
+        tipo=tipo,
+        parametros={chave: _valor_json(valor) for chave, valor in (parametros or {}).items()},
+        usuario=usuario,
+        max_tentativas=TAREFAS[tipo].max_tentativas,
+        executar_apos=executar_apos or timezone.now(),
+    )
+
+
+def reservar_proxima(trabalhador, tipos=None):
+    """
+    Reserva a tarefa pendente mais antiga para `trabalhador`.
+
+    Returns:
+        Tarefa reservada (status executando) ou None se a fila estiver vazia
+    """
+    while True:
+        agora = timezone.now()
+        pendentes = Tarefa.objects.filter(status=Tarefa.STATUS_PENDENTE, executar_apos__lte=agora)
+        if tipos:
+            pendentes = pendentes.filter(tipo__in=tipos)
+        pendentes = pendentes.order_by('executar_apos', 'pk').values_list('pk', flat=True)
+
+        if connection.features.has_select_for_update_skip_locked:
+            with transaction.atomic():
+                pk = pendentes.select_for_update(skip_locked=True).first()
+                reservada = pk is not None and _reservar(pk, trabalhador, agora)
+        else:
+            # SQLite: sem SKIP LOCKED e sem transação explícita, pois ler e
+            # depois gravar na mesma transação falha com "database is locked"
+            # em vez de aguardar o outro trabalhador
+            pk = pendentes.first()
+            reservada = pk is not None and _reservar(pk, trabalhador, agora)
+
+        if pk is None:
+            return None
+        if reservada:
+            return Tarefa.objects.get(pk=pk)
+
+
+def _reservar(pk, trabalhador, agora):
+    # UPDATE condicional: apenas um trabalhador consegue mudar o status,
+    # mesmo que outro tenha lido a mesma tarefa
+    return Tarefa.objects.filter(pk=pk, status=Tarefa.STATUS_PENDENTE).update(
+        status=Tarefa.STATUS_EXECUTANDO,
+        trabalhador=trabalhador,
+        tentativas=F('tentativas') + 1,
+        iniciado_em=agora,
+        sinal_em=agora,
+        concluido_em=None,
+    )
+
+
+def executar(tarefa):
+    """Executa uma tarefa já reservada e grava o resultado ou o erro."""
+    tipo = TAREFAS.get(tarefa.tipo)
+    contexto = ContextoTarefa(tarefa)
+    try:
+        if tipo is None:
+            raise ValueError(f"Tipo de tarefa desconhecido: {tarefa.tipo}")
+        resultado = tipo.funcao(contexto, **tarefa.parametros)
+    except Exception:
+        detalhes = traceback.format_exc()
+        logger.exception("Erro na tarefa %s #%s", tarefa.tipo, tarefa.pk)
+        _registrar_falha(tarefa, detalhes, definitiva=tipo is None)
+        return False
+
+    try:
+        Tarefa.objects.filter(pk=tarefa.pk).update(
+            status=Tarefa.STATUS_CONCLUIDA,
+            progresso=100,
+            resultado=resultado,
+            erro='',
+            concluido_em=timezone.now(),
+        )
+    except Exception:
+        # Ex.: resultado não serializável em JSON. A função já executou, então
+        # não há nova tentativa
+        detalhes = traceback.format_exc()
+        logger.exception("Erro ao gravar o resultado da tarefa %s #%s", tarefa.tipo, tarefa.pk)
+        _registrar_falha(tarefa, detalhes, definitiva=True)
+        return False
+    return True
+
+
+def _registrar_falha(tarefa, detalhes, definitiva=False):
+    if definitiva or tarefa.tentativas >= tarefa.max_tentativas:
+        campos = {'status': Tarefa.STATUS_ERRO, 'concluido_em': timezone.now()}
+    else:
+        espera = INTERVALO_RETENTATIVA * (2 ** max(tarefa.tentativas - 1, 0))
+        campos = {'status': Tarefa.STATUS_PENDENTE, 'executar_apos': timezone.now() + espera}
+    Tarefa.objects.filter(pk=tarefa.pk).update(erro=detalhes, trabalhador='', **campos)
+
+
+def recuperar_abandonadas(tempo_maximo=TEMPO_MAXIMO_SEM_SINAL):
+    """Devolve à fila (ou marca com erro) tarefas cujo trabalhador parou no meio."""
+    limite = timezone.now() - tempo_maximo
+    abandonadas = Tarefa.objects.filter(status=Tarefa.STATUS_EXECUTANDO).filter(
+        Q(sinal_em__lt=limite) | Q(sinal_em__isnull=True, iniciado_em__lt=limite)
+    )
+    total = 0
+    for tarefa in abandonadas:
+        _registrar_falha(tarefa, f"Execução interrompida (trabalhador: {tarefa.trabalhador or 'desconhecido'}).")
+        total += 1
+    return total
+
+
+def processar_fila(trabalhador=None, intervalo=2.0, continuar=True, tipos=None):
+    """
+    Laço de um trabalhador: reserva e executa tarefas até a fila esvaziar
+    (continuar=False) ou indefinidamente, aguardando `intervalo` segundos
+    quando não houver tarefas.
+
+    Returns:
+        Quantidade de tarefas executadas
+    """
+    trabalhador = trabalhador or f"{socket.gethostname()}:{os.getpid()}"
+    executadas = 0
+    while True:
+        tarefa = reservar_proxima(trabalhador, tipos)
+        if tarefa is None:
+            if not continuar:
+                return executadas
+            recuperar_abandonadas()
+            time.sleep(intervalo)
+            continue
+        executar(tarefa)
+        executadas += 1
+
+
+# Tarefas do módulo core
+
+def _coordenador(usuario):
+    return getattr(usuario, 'perfil', None) == 'Coordenador'
+
+
+@registrar_tarefa('reconstruir_resumos', permissao=_coordenador)
+def tarefa_reconstruir_resumos(contexto, inicio=None, fim=None, cras_ids=None):
+    from apps.core.resumos import reconstruir_resumos
+
+    contexto.progresso(0, 'Reconstruindo resumos diários...')
+    return reconstruir_resumos(
+        date.fromisoformat(inicio) if inicio else None,
+        date.fromisoformat(fim) if fim else None,
+        cras_ids,
+    )
+
+
+def _equipe(usuario):
+    return usuario.is_staff
+
+
+# O snapshot inclui os registros de todos os CRAS
+@registrar_tarefa('snapshot_parquet', permissao=_equipe, max_tentativas=1)
+def tarefa_snapshot_parquet(contexto, tabelas=None):
+    from apps.core.snapshots import TABELAS, compactar_snapshot, gerar_snapshot, nome_snapshot
+
+    tabelas = tabelas or list(TABELAS)
+    concluidas = []
+
+    def progresso(tabela, linhas):
+        concluidas.append(tabela)
+        contexto.progresso(90 * len(concluidas) / len(tabelas), f'{tabela}: {linhas} linhas')
+
+    nome = nome_snapshot()
+    with tempfile.TemporaryDirectory() as diretorio:
+        contexto.progresso(0, 'Gerando snapshot Parquet...')
+        totais = gerar_snapshot(diretorio, tabelas, progresso=progresso)
+        with tempfile.TemporaryFile() as pacote:
+            compactar_snapshot(diretorio, pacote)
+            contexto.salvar_arquivo(pacote, f'{nome}.zip', 'application/zip')
+    return totais
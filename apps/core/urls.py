@@ -9,4 +9,9 @@ urlpatterns = [
     path('recepcao/', views.recepcao_view, name='recepcao'),
     path('recepcao/busca/', views.recepcao_busca, name='recepcao_busca'),
     path('recepcao/agendamento/', views.recepcao_agendamento, name='recepcao_agendamento'),
+    
+    # Tarefas em segundo plano
+    path('tarefas/enfileirar/', views.tarefa_enfileirar, name='tarefa_enfileirar'),
+    path('tarefas/<int:id>/', views.tarefa_status, name='tarefa_status'),
+    path('tarefas/<int:id>/download/', views.tarefa_download, name='tarefa_download'),
 ]
@@ -1,11 +1,17 @@
-from django.shortcuts import render, redirect
+from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, JsonResponse
+from django.urls import reverse
 from django.db.models import Count, Sum, Q
 from django.utils import timezone
 import datetime
 import json
-from apps.core.models import Cidade, CRAS, FichaPAIF, Beneficiario, Atendimento
+import os
+from apps.core.models import Cidade, CRAS, FichaPAIF, Beneficiario, Atendimento, AtividadeSCFV, ParticipacaoSCFV, Tarefa
+from apps.core import resumos, tarefas
+from apps.core.estatisticas import estatisticas_por_cras, periodo_mes_atual
 
 def index(request):
     if request.user.is_authenticated:
@@ -78,18 +84,22 @@ def dashboard(request):
             {'label': 'Idosos', 'valor': 10}
         ]
         
-        atendimentos_por_tipo = [
-            {'label': 'PAIF', 'valor': 45},
-            {'label': 'SCFV', 'valor': 35},
-            {'label': 'Benefícios', 'valor': 15},
-            {'label': 'Outros', 'valor': 5}
-        ]
+        # Indicadores do mês lidos dos resumos diários (unidade do coordenador, se houver)
+        inicio_mes, fim_mes = periodo_mes_atual()
+        ids_cras = [request.user.cras_id] if request.user.cras_id else None
+        atendimentos_por_tipo = resumos.atendimentos_por_tipo(inicio_mes, fim_mes, ids_cras)
+        
+        atividades_ativas = AtividadeSCFV.objects.filter(data_inicio__lte=fim_mes, data_fim__gte=inicio_mes)
+        participacoes_mes = ParticipacaoSCFV.objects.filter(data_participacao__range=(inicio_mes, fim_mes))
+        if ids_cras:
+            atividades_ativas = atividades_ativas.filter(cras_id__in=ids_cras)
+            participacoes_mes = participacoes_mes.filter(atividade__cras_id__in=ids_cras)
         
         estatisticas = {
-            'familias_atendidas': 145,
-            'atendimentos_mes': 130,
-            'participantes_scfv': 78,
-            'oficinas_ativas': 5,
+            'familias_atendidas': resumos.total_fichas(cras_ids=ids_cras),
+            'atendimentos_mes': resumos.total_atendimentos(inicio_mes, fim_mes, ids_cras),
+            'participantes_scfv': participacoes_mes.values('ficha_scfv').distinct().count(),
+            'oficinas_ativas': atividades_ativas.count(),
             'distribuicao_publico': distribuicao_publico,
             'atendimentos_por_tipo': atendimentos_por_tipo
         }
@@ -180,9 +190,7 @@ def gestao_municipal(request):
         return redirect('dashboard')
         
     # Definir período padrão (último mês)
-    hoje = datetime.now().date()
-    inicio_mes = hoje.replace(day=1)
-    fim_mes = hoje
+    inicio_mes, fim_mes = periodo_mes_atual()
     
     # Verificar se há filtro de cidade na requisição
     cidade_id = request.GET.get('cidade')
@@ -196,46 +204,19 @@ def gestao_municipal(request):
         messages.error(request, "Nenhuma cidade encontrada no sistema")
         return redirect('dashboard')
     
-    # Obter todos os CRAS da cidade selecionada
-    lista_cras = CRAS.objects.filter(cidade=cidade)
-    
-    # Calcular métricas para estatísticas
-    total_familias = FichaPAIF.objects.filter(cras__in=lista_cras).count()
-    
-    # Estatísticas por CRAS
-    cras_estatisticas = []
-    for cras in lista_cras:
-        familias = FichaPAIF.objects.filter(cras=cras).count()
-        beneficiarios = Beneficiario.objects.filter(cras=cras).count()
-        
-        # Atendimentos no último mês
-        atendimentos = Atendimento.objects.filter(
-            beneficiario__cras=cras,
-            data_atendimento__range=(inicio_mes, fim_mes)
-        ).count()
-        
-        # Definir status baseado em alguma métrica
-        if atendimentos > 100:
-            status = 'normal'
-        elif atendimentos > 50:
-            status = 'atencao'
-        else:
-            status = 'critico'
-        
-        cras_estatisticas.append({
-            'id': cras.id,
-            'nome': cras.nome,
-            'endereco': cras.endereco,
-            'coordenador': cras.coordenador,
-            'familias_cadastradas': familias,
-            'atendimentos_mes': atendimentos,
-            'status': status
-        })
+    # Estatísticas por CRAS em um número fixo de consultas
+    cras_estatisticas = estatisticas_por_cras(
+        cidades=[cidade], data_inicio=inicio_mes, data_fim=fim_mes
+    )
+    total_familias = sum(cras['familias_cadastradas'] for cras in cras_estatisticas)
     
-    # Exemplos simplificados para outras métricas
-    total_visitas = 489  # Implementar consulta real
-    total_inclusoes = 157  # Implementar consulta real
-    total_oficinas = 25   # Implementar consulta real
+    # Demais métricas do período lidas dos resumos diários
+    ids_cras = [cras['id'] for cras in cras_estatisticas]
+    total_visitas = resumos.total_visitas(inicio_mes, fim_mes, ids_cras)
+    total_inclusoes = resumos.total_fichas(inicio_mes, fim_mes, ids_cras, tipo='inclusao')
+    total_oficinas = AtividadeSCFV.objects.filter(
+        cras_id__in=ids_cras, data_inicio__lte=fim_mes, data_fim__gte=inicio_mes
+    ).count()
     
     # Dados de alertas e eventos (exemplos)
     alertas = [
@@ -261,3 +242,89 @@ def gestao_municipal(request):
     }
     
     return render(request, 'gestao/gestao.html', context)
+
+
+# Tarefas em segundo plano (ver apps.core.tarefas)
+
+def _tarefa_json(tarefa):
+    return {
+        'id': tarefa.id,
+        'tipo': tarefa.tipo,
+        'status': tarefa.status,
+        'progresso': tarefa.progresso,
+        'mensagem': tarefa.mensagem,
+        'tentativas': tarefa.tentativas,
+        'resultado': tarefa.resultado,
+        'erro': tarefa.erro.strip().splitlines()[-1] if tarefa.erro else '',
+        'arquivo': reverse('tarefa_download', args=[tarefa.id]) if tarefa.arquivo else None,
+        'criado_em': tarefa.criado_em.isoformat(),
+        'concluido_em': tarefa.concluido_em.isoformat() if tarefa.concluido_em else None,
+    }
+
+
+def _tarefa_do_usuario(request, id):
+    tarefas_visiveis = Tarefa.objects.all()
+    if not request.user.is_superuser:
+        tarefas_visiveis = tarefas_visiveis.filter(usuario=request.user)
+    return get_object_or_404(tarefas_visiveis, id=id)
+
+
+@login_required
+def tarefa_enfileirar(request):
+    """
+    API para enfileirar uma tarefa em segundo plano.
+
+    Aceita JSON {"tipo": ..., "parametros": {...}} ou um formulário
+    multipart com `tipo` e o `arquivo` a processar (ex.: importar_paif).
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Método não permitido'}, status=405)
+
+    if request.content_type == 'application/json':
+        try:
+            dados = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({'error': 'JSON inválido'}, status=400)
+        tipo = dados.get('tipo')
+        parametros = dados.get('parametros') or {}
+    else:
+        tipo = request.POST.get('tipo')
+        parametros = {chave: valor for chave, valor in request.POST.items() if chave != 'tipo'}
+
+    tipo_tarefa = tarefas.TAREFAS.get(tipo)
+    if tipo_tarefa is None:
+        return JsonResponse({'error': 'Tipo de tarefa desconhecido'}, status=400)
+    if not isinstance(parametros, dict):
+        return JsonResponse({'error': 'Parâmetros inválidos'}, status=400)
+    if not tipo_tarefa.permitido(request.user):
+        return JsonResponse({'error': 'Acesso negado'}, status=403)
+
+    # O arquivo da tarefa só pode ser o enviado nesta requisição; um caminho
+    # informado pelo cliente faria a tarefa ler (e apagar) outro arquivo do storage
+    parametros.pop('arquivo', None)
+    if 'arquivo' in request.FILES:
+        enviado = request.FILES['arquivo']
+        parametros['arquivo'] = default_storage.save(f'{tarefas.DIRETORIO_ENTRADA}{enviado.name}', enviado)
+
+    tarefa = tarefas.enfileirar(tipo, parametros, usuario=request.user)
+    return JsonResponse(_tarefa_json(tarefa), status=202)
+
+
+@login_required
+def tarefa_status(request, id):
+    """API com o andamento de uma tarefa, consultada periodicamente pelas páginas."""
+    return JsonResponse(_tarefa_json(_tarefa_do_usuario(request, id)))
+
+
+@login_required
+def tarefa_download(request, id):
+    """Baixa o arquivo gerado por uma tarefa concluída."""
+    tarefa = _tarefa_do_usuario(request, id)
+    if not tarefa.arquivo:
+        raise Http404('A tarefa não gerou arquivo.')
+    return FileResponse(
+        tarefa.arquivo.open('rb'),
+        as_attachment=True,
+        filename=tarefa.nome_arquivo or os.path.basename(tarefa.arquivo.name),
+        content_type=tarefa.tipo_conteudo or None,
+    )
@@ -2,7 +2,9 @@ from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.db.models import Count, Sum, Q
-from apps.core.models import Cidade, CRAS, FichaPAIF, Beneficiario, Atendimento
+from apps.core.models import Cidade, CRAS, FichaPAIF, Beneficiario, Atendimento, AtividadeSCFV
+from apps.core import resumos
+from apps.core.estatisticas import estatisticas_por_cras, periodo_mes_atual
 from datetime import datetime, timedelta
 
 def user_in_gestores_group(user):
@@ -14,9 +16,7 @@ def user_in_gestores_group(user):
 def gestao_municipal(request):
     """View para a página de gestão municipal de CRAS"""
     # Definir período padrão (último mês)
-    hoje = datetime.now().date()
-    inicio_mes = hoje.replace(day=1)
-    fim_mes = hoje
+    inicio_mes, fim_mes = periodo_mes_atual()
     
     # Verificar se há filtro de cidade na requisição
     cidade_id = request.GET.get('cidade')
@@ -30,47 +30,19 @@ def gestao_municipal(request):
         messages.error(request, "Nenhuma cidade encontrada no sistema")
         return redirect('dashboard')
     
-    # Obter todos os CRAS da cidade selecionada
-    lista_cras = CRAS.objects.filter(cidade=cidade)
-    
-    # Calcular métricas para estatísticas
-    total_familias = FichaPAIF.objects.filter(cras__in=lista_cras).count()
-    
-    # Estatísticas por CRAS
-    cras_estatisticas = []
-    for cras in lista_cras:
-        familias = FichaPAIF.objects.filter(cras=cras).count()
-        beneficiarios = Beneficiario.objects.filter(cras=cras).count()
-        
-        # Atendimentos no último mês
-        atendimentos = Atendimento.objects.filter(
-            beneficiario__cras=cras,
-            data_atendimento__range=(inicio_mes, fim_mes)
-        ).count()
-        
-        # Definir status baseado em alguma métrica
-        if atendimentos > 100:
-            status = 'normal'
-        elif atendimentos > 50:
-            status = 'atencao'
-        else:
-            status = 'critico'
-        
-        cras_estatisticas.append({
-            'id': cras.id,
-            'nome': cras.nome,
-            'endereco': cras.endereco,
-            'coordenador': cras.coordenador,
-            'familias_cadastradas': familias,
-            'atendimentos_mes': atendimentos,
-            'status': status
-        })
-    
-    # Exemplos simplificados para outras métricas
-    # Na implementação real, você obteria esses dados do banco corretamente
-    total_visitas = 489  # Implementar consulta real
-    total_inclusoes = 157  # Implementar consulta real
-    total_oficinas = 25   # Implementar consulta real
+    # Estatísticas por CRAS em um número fixo de consultas
+    cras_estatisticas = estatisticas_por_cras(
+        cidades=[cidade], data_inicio=inicio_mes, data_fim=fim_mes
+    )
+    total_familias = sum(cras['familias_cadastradas'] for cras in cras_estatisticas)
+    
+    # Demais métricas do período lidas dos resumos diários
+    ids_cras = [cras['id'] for cras in cras_estatisticas]
+    total_visitas = resumos.total_visitas(inicio_mes, fim_mes, ids_cras)
+    total_inclusoes = resumos.total_fichas(inicio_mes, fim_mes, ids_cras, tipo='inclusao')
+    total_oficinas = AtividadeSCFV.objects.filter(
+        cras_id__in=ids_cras, data_inicio__lte=fim_mes, data_fim__gte=inicio_mes
+    ).count()
     
     # Dados de alertas e eventos (exemplos)
     alertas = [
@@ -107,20 +79,14 @@ def detalhe_cras(request, cras_id):
         messages.error(request, "CRAS não encontrado")
         return redirect('gestao:gestao_municipal')
     
-    # Obter estatísticas do CRAS
-    hoje = datetime.now().date()
-    inicio_mes = hoje.replace(day=1)
-    fim_mes = hoje
-    
-    # Contagens e estatísticas
-    familias = FichaPAIF.objects.filter(cras=cras).count()
-    beneficiarios = Beneficiario.objects.filter(cras=cras).count()
-    
-    # Atendimentos no último mês
-    atendimentos = Atendimento.objects.filter(
-        beneficiario__cras=cras,
-        data_atendimento__range=(inicio_mes, fim_mes)
-    ).count()
+    # Obter estatísticas do CRAS (mês atual)
+    inicio_mes, fim_mes = periodo_mes_atual()
+    estatisticas = estatisticas_por_cras(
+        cras_ids=[cras.id], data_inicio=inicio_mes, data_fim=fim_mes
+    )[0]
+    familias = estatisticas['familias_cadastradas']
+    beneficiarios = estatisticas['beneficiarios']
+    atendimentos = estatisticas['atendimentos_mes']
     
     # Exemplos de outros dados que podem ser úteis
     ultimos_atendimentos = Atendimento.objects.filter(
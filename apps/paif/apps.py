@@ -5,3 +5,7 @@ class PAIFConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.paif'
     verbose_name = 'PAIF'
+
+    def ready(self):
+        # Registrar as tarefas em segundo plano do PAIF
+        from apps.paif import tarefas  # noqa: F401
@@ -36,6 +36,35 @@ class PesquisaPAIFForm(forms.Form):
     data_final = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}), label="Data Final")
     cras = forms.IntegerField(required=False, widget=forms.HiddenInput())
 
+    # Lookup do ORM aplicado por cada campo do formulário sobre FichaPAIF
+    FILTROS_FICHA_PAIF = {
+        'numero_paif': 'numero_paif__icontains',
+        'nome': 'nome_referencia__icontains',
+        'cpf': 'cpf__icontains',
+        'bairro': 'bairro__icontains',
+        'data_inicial': 'data__gte',
+        'data_final': 'data__lte',
+        'cras': 'cras_id',
+    }
+
+    def filtrar(self, queryset, filtros=None):
+        """
+        Aplica ao queryset os campos preenchidos do formulário.
+
+        Args:
+            queryset: QuerySet a filtrar (padrão dos lookups: FichaPAIF)
+            filtros: Dicionário campo do formulário -> lookup, para aplicar a
+                mesma pesquisa a outros modelos (campos ausentes são ignorados)
+        """
+        if not self.is_valid():
+            return queryset
+        filtros = self.FILTROS_FICHA_PAIF if filtros is None else filtros
+        for campo, lookup in filtros.items():
+            valor = self.cleaned_data.get(campo)
+            if valor:
+                queryset = queryset.filter(**{lookup: valor})
+        return queryset
+
 class EvolucaoAtendimentoForm(forms.Form):
     """Formulário para evolução de atendimento PAIF."""
     data_atendimento = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
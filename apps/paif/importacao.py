@@ -0,0 +1,646 @@
+"""
+Importação em massa de fichas PAIF a partir de planilhas (Excel ou CSV).
+
+A importação é feita em etapas:
+
+    1. Limpeza vetorizada com pandas (datas, num_integrantes, valores padrão
+       de endereço) e validação de cada linha
+    2. Uma única consulta para os CRAS existentes e uma consulta por lote
+       para as fichas já cadastradas (pelo numero_paif)
+    3. Gravação com bulk_create/bulk_update, um lote por transação; fichas
+       sem numero_paif recebem números reservados em bloco (SequenciaPAIF)
+
+Para arquivos grandes há o modo em blocos (importar_em_blocos): o .xlsx é
+lido pelo openpyxl em modo somente leitura e o CSV em pedaços de tamanho
+fixo, de modo que a memória usada não depende do tamanho do arquivo. Após
+cada bloco gravado um checkpoint registra as linhas já processadas, e uma
+importação interrompida pode ser retomada desse ponto.
+
+O modo paralelo (importar_em_paralelo) divide as linhas por cras_id e grava
+cada partição em um processo separado, com a própria conexão ao banco. Como
+cada ficha pertence a um único CRAS, os processos não disputam as mesmas
+linhas de FichaPAIF nem de resumo.
+
+Linhas inválidas não interrompem a importação: cada uma gera uma entrada no
+relatório de erros (linha da planilha, numero_paif e motivo).
+
+Como bulk_create/bulk_update não disparam save() nem signals, os campos de
+busca dos beneficiários são calculados aqui e os resumos diários das fichas
+são incrementados na mesma transação de cada lote (apps.core.resumos).
+"""
+
+import collections
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+
+import django
+import openpyxl
+import pandas as pd
+from django.apps import apps
+from django.db import DatabaseError, connections, transaction
+from django.utils import timezone
+
+from apps.core.models import (
+    CRAS, Beneficiario, FichaPAIF, ResumoDiarioFicha, avancar_sequencia_paif, reservar_numeros_paif,
+    sincronizar_sequencia_paif,
+)
+from apps.core.resumos import ajustar_resumo, chave_ficha
+
+COLUNAS_OBRIGATORIAS = ('numero_paif', 'data', 'responsavel_familiar')
+COLUNAS_OPCIONAIS = ('endereco', 'numero', 'bairro', 'num_integrantes', 'cras_id', 'municipio')
+
+# Valores padrão para campos ausentes na planilha
+ENDERECO_PADRAO = 'Endereço não informado'
+TEXTO_NAO_INFORMADO = 'Não informado'
+CRAS_PADRAO = 1
+INTEGRANTES_PADRAO = 1
+
+# Valores temporários de campos obrigatórios que a planilha não traz;
+# devem ser substituídos pelos valores reais depois da importação
+CPF_TEMPORARIO = '00000000000'
+CEP_TEMPORARIO = '00000000'
+TELEFONE_TEMPORARIO = '0000000000'
+DATA_NASCIMENTO_TEMPORARIA = date(1900, 1, 1)
+SEXO_TEMPORARIO = 'O'
+
+# Campos de uma ficha existente preenchidos pela planilha quando estão vazios
+CAMPOS_COMPLEMENTARES = ('endereco', 'numero', 'bairro', 'municipio')
+
+TAMANHO_LOTE = 1000
+
+# Linhas lidas da planilha por vez no modo em blocos
+TAMANHO_BLOCO = 10000
+
+# Linha da planilha correspondente ao índice 0 do DataFrame (após o cabeçalho)
+PRIMEIRA_LINHA_DADOS = 2
+
+FORMATOS_DATA = ('%d/%m/%Y', '%Y-%m-%d', '%Y-%m-%d %H:%M:%S')
+
+
+class ErroImportacao(Exception):
+    """Erro que impede a importação do arquivo inteiro (ex.: colunas ausentes)."""
+
+
+def novo_resumo():
+    """Contadores e relatório de erros de uma importação."""
+    return {
+        'total_linhas': 0,
+        'fichas_criadas': 0,
+        'fichas_atualizadas': 0,
+        'fichas_sem_alteracao': 0,
+        'beneficiarios_criados': 0,
+        'enderecos_substituidos': 0,
+        'linhas_com_erro': 0,
+        'erros': [],
+    }
+
+
+def mesclar_resumos(destino, origem):
+    """Soma os contadores de `origem` em `destino` e junta os erros."""
+    for chave, valor in origem.items():
+        if chave == 'erros':
+            destino['erros'].extend(valor)
+        else:
+            destino[chave] += valor
+    return destino
+
+
+def _erro(linha, numero_paif, mensagem):
+    return {'linha': int(linha), 'numero_paif': numero_paif or '', 'erro': mensagem}
+
+
+def ler_planilha(caminho_arquivo):
+    """Lê o arquivo inteiro em um DataFrame (.xlsx/.xls ou .csv)."""
+    extensao = os.path.splitext(caminho_arquivo)[1].lower()
+    if extensao == '.csv':
+        return pd.read_csv(caminho_arquivo, dtype=str, keep_default_na=False, na_values=[''])
+    if extensao in ('.xlsx', '.xlsm', '.xls'):
+        return pd.read_excel(caminho_arquivo)
+    raise ErroImportacao(f'Formato de arquivo não suportado: {extensao or caminho_arquivo}')
+
+
+def _texto(serie):
+    """Converte a coluna em texto sem espaços nas pontas (vazio vira NA)."""
+    serie = serie.astype('string').str.strip()
+    return serie.mask(serie == '')
+
+
+def _validar_colunas(df):
+    faltando = [coluna for coluna in COLUNAS_OBRIGATORIAS if coluna not in df.columns]
+    if faltando:
+        raise ErroImportacao(f"Colunas obrigatórias ausentes: {', '.join(faltando)}")
+
+
+def _numero_paif(serie):
+    # Números lidos do Excel chegam como float (123.0); manter apenas a parte inteira
+    numericos = pd.to_numeric(serie, errors='coerce')
+    inteiros = numericos.notna() & (numericos % 1 == 0)
+    texto = _texto(serie)
+    texto[inteiros] = numericos[inteiros].astype('int64').astype('string')
+    return texto
+
+
+def _datas(serie):
+    """Interpreta DD/MM/AAAA, AAAA-MM-DD ou datas já convertidas pelo Excel."""
+    texto = _texto(serie)
+    datas = pd.Series(pd.NaT, index=serie.index, dtype='datetime64[ns]')
+    for formato in FORMATOS_DATA:
+        faltando = datas.isna()
+        datas[faltando] = pd.to_datetime(texto[faltando], format=formato, errors='coerce')
+    nao_texto = datas.isna() & serie.map(lambda valor: not isinstance(valor, str))
+    if nao_texto.any():
+        datas[nao_texto] = pd.to_datetime(serie[nao_texto], errors='coerce')
+    return datas
+
+
+def limpar_dados(df, primeira_linha=PRIMEIRA_LINHA_DADOS, linhas=None):
+    """
+    Normaliza a planilha de forma vetorizada.
+
+    Args:
+        df: DataFrame lido da planilha
+        primeira_linha: Número da linha da planilha correspondente a df.iloc[0]
+        linhas: Números das linhas da planilha de cada registro, quando não
+            forem consecutivos (substitui primeira_linha)
+
+    Returns:
+        Tupla (DataFrame limpo, lista de erros, endereços substituídos). O
+        DataFrame limpo contém apenas as linhas válidas e a coluna `linha`.
+    """
+    _validar_colunas(df)
+    df = df.reset_index(drop=True)
+    for coluna in COLUNAS_OPCIONAIS:
+        if coluna not in df.columns:
+            df[coluna] = pd.NA
+    em_branco = df.isna().all(axis=1)
+
+    limpo = pd.DataFrame({
+        'linha': list(linhas) if linhas is not None else pd.RangeIndex(primeira_linha, primeira_linha + len(df)),
+        'numero_paif': _numero_paif(df['numero_paif']),
+        'data': _datas(df['data']),
+        'responsavel_familiar': _texto(df['responsavel_familiar']),
+        'endereco': _texto(df['endereco']),
+        'numero': _texto(df['numero']),
+        'bairro': _texto(df['bairro']),
+        'municipio': _texto(df['municipio']),
+    })
+
+    integrantes = pd.to_numeric(df['num_integrantes'], errors='coerce')
+    limpo['num_integrantes'] = integrantes.fillna(INTEGRANTES_PADRAO).astype('int64')
+
+    cras = pd.to_numeric(df['cras_id'], errors='coerce')
+    limpo['cras_id'] = cras.fillna(CRAS_PADRAO)
+    cras_invalido = limpo['cras_id'] % 1 != 0
+    limpo['cras_id'] = limpo['cras_id'].where(~cras_invalido, -1).astype('int64')
+
+    sem_endereco = limpo['endereco'].isna()
+    limpo['endereco'] = limpo['endereco'].fillna(ENDERECO_PADRAO)
+
+    # Validações por linha, na ordem de prioridade das mensagens
+    cras_existentes = set(
+        CRAS.objects.filter(pk__in=limpo['cras_id'].unique().tolist()).values_list('pk', flat=True)
+    )
+    validacoes = [
+        (limpo['data'].isna(), 'Data inválida'),
+        (limpo['responsavel_familiar'].isna(), 'Responsável familiar não informado'),
+        (~limpo['cras_id'].isin(cras_existentes), 'CRAS inexistente'),
+        (limpo['numero_paif'].duplicated(keep='first') & limpo['numero_paif'].notna(),
+         'numero_paif repetido na planilha'),
+    ]
+
+    erros = []
+    # Linhas totalmente em branco são ignoradas sem gerar erro
+    invalidas = em_branco.copy()
+    for mascara, mensagem in validacoes:
+        for linha in limpo.loc[mascara & ~invalidas].itertuples():
+            if mensagem == 'CRAS inexistente':
+                detalhe = f'{mensagem} ({linha.cras_id if linha.cras_id > 0 else df.at[linha.Index, "cras_id"]})'
+            else:
+                detalhe = mensagem
+            erros.append(_erro(linha.linha, linha.numero_paif if pd.notna(linha.numero_paif) else '', detalhe))
+        invalidas |= mascara
+
+    validas = limpo.loc[~invalidas].copy()
+    validas['data'] = validas['data'].dt.date
+    validas = validas.astype(object).where(validas.notna(), None)
+    erros.sort(key=lambda erro: erro['linha'])
+    return validas, erros, int((sem_endereco & ~invalidas).sum())
+
+
+def _fichas_existentes(numeros):
+    """Carrega, em uma consulta, as fichas já cadastradas com esses números."""
+    return {
+        ficha.numero_paif: ficha
+        for ficha in FichaPAIF.objects.filter(numero_paif__in=[numero for numero in numeros if numero]).only(
+            'pk', 'numero_paif', *CAMPOS_COMPLEMENTARES
+        )
+    }
+
+
+def _nova_ficha(registro):
+    return FichaPAIF(
+        numero_paif=registro['numero_paif'],
+        tipo='inclusao',
+        data=registro['data'],
+        nome_referencia=registro['responsavel_familiar'],
+        cpf=CPF_TEMPORARIO,
+        endereco=registro['endereco'],
+        numero=registro['numero'] or '',
+        bairro=registro['bairro'] or TEXTO_NAO_INFORMADO,
+        cep=CEP_TEMPORARIO,
+        municipio=registro['municipio'] or TEXTO_NAO_INFORMADO,
+        telefone=TELEFONE_TEMPORARIO,
+        num_integrantes=registro['num_integrantes'],
+        cras_id=registro['cras_id'],
+    )
+
+
+def _novo_beneficiario(ficha, registro):
+    beneficiario = Beneficiario(
+        nome_completo=registro['responsavel_familiar'],
+        data_nascimento=DATA_NASCIMENTO_TEMPORARIA,
+        sexo=SEXO_TEMPORARIO,
+        cpf=CPF_TEMPORARIO,
+        endereco=registro['endereco'],
+        nome_mae=TEXTO_NAO_INFORMADO,
+        ficha_paif=ficha,
+        cras_id=registro['cras_id'],
+    )
+    beneficiario.atualizar_campos_busca()
+    return beneficiario
+
+
+def _complementar_ficha(ficha, registro):
+    """Preenche os campos vazios da ficha existente. Retorna True se mudou algo."""
+    alterada = False
+    for campo in CAMPOS_COMPLEMENTARES:
+        valor = registro[campo]
+        if valor and not getattr(ficha, campo):
+            setattr(ficha, campo, valor)
+            alterada = True
+    return alterada
+
+
+def _gravar(registros, existentes):
+    """Grava um conjunto de registros limpos. Deve rodar dentro de uma transação."""
+    novas, alteradas, inalteradas = [], [], 0
+    for registro in registros:
+        ficha = existentes.get(registro['numero_paif']) if registro['numero_paif'] else None
+        if ficha is None:
+            novas.append((_nova_ficha(registro), registro))
+        elif _complementar_ficha(ficha, registro):
+            alteradas.append(ficha)
+        else:
+            inalteradas += 1
+
+    # bulk_create não chama save(): avançar a sequência até os números informados
+    # na planilha e reservar os números das fichas sem numero_paif de uma vez
+    avancar_sequencia_paif([ficha.numero_paif for ficha, _ in novas if ficha.numero_paif])
+    sem_numero = [ficha for ficha, _ in novas if not ficha.numero_paif]
+    if sem_numero:
+        for ficha, numero in zip(sem_numero, reservar_numeros_paif(len(sem_numero))):
+            ficha.numero_paif = numero
+
+    fichas = FichaPAIF.objects.bulk_create([ficha for ficha, _ in novas])
+    beneficiarios = Beneficiario.objects.bulk_create(
+        [_novo_beneficiario(ficha, registro) for ficha, (_, registro) in zip(fichas, novas)]
+    )
+
+    # bulk_create não dispara os signals que mantêm os resumos diários
+    por_dia = collections.Counter(tuple(sorted(chave_ficha(ficha).items())) for ficha in fichas)
+    for chave, total in por_dia.items():
+        ajustar_resumo(ResumoDiarioFicha, dict(chave), total)
+
+    if alteradas:
+        agora = timezone.now()
+        for ficha in alteradas:
+            ficha.data_atualizacao = agora
+        FichaPAIF.objects.bulk_update(alteradas, [*CAMPOS_COMPLEMENTARES, 'data_atualizacao'])
+
+    return {
+        'fichas_criadas': len(fichas),
+        'fichas_atualizadas': len(alteradas),
+        'fichas_sem_alteracao': inalteradas,
+        'beneficiarios_criados': len(beneficiarios),
+    }
+
+
+def gravar_lote(registros, resumo):
+    """
+    Grava um lote de registros limpos em uma única transação.
+
+    Se o lote falhar (ex.: numero_paif criado por outro processo no meio da
+    importação), a sequência PAIF é corrigida a partir das fichas gravadas e
+    cada registro é regravado isoladamente para identificar as linhas com
+    problema sem perder as demais.
+    """
+    existentes = _fichas_existentes([registro['numero_paif'] for registro in registros])
+    try:
+        with transaction.atomic():
+            contagem = _gravar(registros, existentes)
+    except DatabaseError:
+        contagem = {}
+        if any(not registro['numero_paif'] for registro in registros):
+            # O número reservado pode ter colidido com uma ficha gravada fora da sequência
+            sincronizar_sequencia_paif(date.today().year)
+        existentes = _fichas_existentes([registro['numero_paif'] for registro in registros])
+        for registro in registros:
+            try:
+                with transaction.atomic():
+                    parcial = _gravar([registro], existentes)
+            except DatabaseError as e:
+                resumo['erros'].append(_erro(registro['linha'], registro['numero_paif'], f'Erro ao gravar: {e}'))
+                resumo['linhas_com_erro'] += 1
+                continue
+            for chave, valor in parcial.items():
+                contagem[chave] = contagem.get(chave, 0) + valor
+
+    for chave, valor in contagem.items():
+        resumo[chave] += valor
+
+
+def importar_dataframe(df, tamanho_lote=TAMANHO_LOTE, progresso=None, primeira_linha=PRIMEIRA_LINHA_DADOS,
+                       linhas=None):
+    """
+    Importa um DataFrame já lido da planilha.
+
+    Args:
+        df: DataFrame com as colunas da planilha PAIF
+        tamanho_lote: Quantidade de linhas gravadas por transação
+        progresso: Função opcional chamada com (linhas processadas, total)
+        primeira_linha: Número da linha da planilha correspondente a df.iloc[0]
+        linhas: Números das linhas da planilha, quando não forem consecutivos
+
+    Returns:
+        Dicionário de novo_resumo() preenchido
+    """
+    resumo = novo_resumo()
+    resumo['total_linhas'] = len(df)
+
+    limpo, erros, substituidos = limpar_dados(df, primeira_linha, linhas)
+    resumo['erros'].extend(erros)
+    resumo['linhas_com_erro'] = len(erros)
+    resumo['enderecos_substituidos'] = substituidos
+
+    registros = limpo.to_dict('records')
+    for inicio in range(0, len(registros), tamanho_lote):
+        gravar_lote(registros[inicio:inicio + tamanho_lote], resumo)
+        if progresso:
+            progresso(min(inicio + tamanho_lote, len(registros)), len(registros))
+
+    resumo['erros'].sort(key=lambda erro: erro['linha'])
+    return resumo
+
+
+def importar_planilha(caminho_arquivo, tamanho_lote=TAMANHO_LOTE, progresso=None):
+    """Lê e importa uma planilha PAIF (.xlsx/.xls ou .csv)."""
+    return importar_dataframe(ler_planilha(caminho_arquivo), tamanho_lote, progresso)
+
+
+# Modo em blocos (arquivos grandes)
+
+def _blocos_xlsx(caminho_arquivo, tamanho_bloco, pular):
+    livro = openpyxl.load_workbook(caminho_arquivo, read_only=True, data_only=True)
+    try:
+        linhas = livro.worksheets[0].iter_rows(values_only=True)
+        cabecalho = next(linhas, None)
+        if cabecalho is None:
+            return
+        colunas = [str(coluna).strip() if coluna is not None else '' for coluna in cabecalho]
+        largura = len(colunas)
+
+        # Descartar as linhas já importadas sem montar DataFrames
+        collections.deque(itertools.islice(linhas, pular), maxlen=0)
+
+        primeira_linha = PRIMEIRA_LINHA_DADOS + pular
+        while True:
+            bloco = [
+                (tuple(linha) + (None,) * largura)[:largura]
+                for linha in itertools.islice(linhas, tamanho_bloco)
+            ]
+            if not bloco:
+                return
+            yield primeira_linha, pd.DataFrame(bloco, columns=colunas)
+            primeira_linha += len(bloco)
+    finally:
+        livro.close()
+
+
+def _blocos_csv(caminho_arquivo, tamanho_bloco, pular):
+    leitor = pd.read_csv(
+        caminho_arquivo, dtype=str, keep_default_na=False, na_values=[''],
+        skip_blank_lines=False, skiprows=range(1, pular + 1), chunksize=tamanho_bloco,
+    )
+    primeira_linha = PRIMEIRA_LINHA_DADOS + pular
+    with leitor:
+        for bloco in leitor:
+            yield primeira_linha, bloco
+            primeira_linha += len(bloco)
+
+
+def ler_em_blocos(caminho_arquivo, tamanho_bloco=TAMANHO_BLOCO, pular=0):
+    """
+    Lê a planilha em DataFrames de até `tamanho_bloco` linhas.
+
+    Args:
+        caminho_arquivo: Arquivo .xlsx/.xlsm ou .csv
+        tamanho_bloco: Linhas por bloco
+        pular: Linhas de dados a descartar no início (retomada)
+
+    Yields:
+        Tuplas (linha da planilha do primeiro registro, DataFrame do bloco)
+    """
+    extensao = os.path.splitext(caminho_arquivo)[1].lower()
+    if extensao == '.csv':
+        return _blocos_csv(caminho_arquivo, tamanho_bloco, pular)
+    if extensao in ('.xlsx', '.xlsm'):
+        return _blocos_xlsx(caminho_arquivo, tamanho_bloco, pular)
+    raise ErroImportacao(f'O modo em blocos aceita apenas .xlsx e .csv (recebido: {extensao or caminho_arquivo})')
+
+
+def caminho_checkpoint_padrao(caminho_arquivo):
+    return f'{caminho_arquivo}.checkpoint.json'
+
+
+def _identificar_arquivo(caminho_arquivo):
+    """Identifica a versão do arquivo para não retomar sobre um arquivo alterado."""
+    info = os.stat(caminho_arquivo)
+    return {'caminho': os.path.abspath(caminho_arquivo), 'tamanho': info.st_size, 'modificado': info.st_mtime}
+
+
+def _salvar_checkpoint(caminho_checkpoint, dados):
+    # Grava em arquivo temporário e renomeia, para nunca deixar um checkpoint pela metade
+    temporario = f'{caminho_checkpoint}.tmp'
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(dados, arquivo)
+    os.replace(temporario, caminho_checkpoint)
+
+
+def carregar_checkpoint(caminho_checkpoint):
+    """Retorna o conteúdo do checkpoint ou None se ele não existir."""
+    try:
+        with open(caminho_checkpoint, encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    except FileNotFoundError:
+        return None
+
+
+def importar_em_blocos(caminho_arquivo, tamanho_bloco=TAMANHO_BLOCO, tamanho_lote=TAMANHO_LOTE,
+                       caminho_checkpoint=None, retomar=False, registrar_erros=None, progresso=None):
+    """
+    Importa a planilha bloco a bloco, com memória limitada e checkpoints.
+
+    Cada bloco é limpo e gravado de forma independente; em seguida o
+    checkpoint é atualizado com o total de linhas processadas e os
+    contadores acumulados. Se a importação cair entre a gravação de um bloco
+    e a do checkpoint, o bloco é reprocessado na retomada sem duplicar
+    registros (fichas existentes são apenas complementadas).
+
+    Args:
+        caminho_arquivo: Arquivo .xlsx/.xlsm ou .csv
+        tamanho_bloco: Linhas lidas e processadas por vez
+        tamanho_lote: Linhas gravadas por transação dentro de cada bloco
+        caminho_checkpoint: Arquivo de checkpoint (padrão: <arquivo>.checkpoint.json)
+        retomar: Continua a partir do checkpoint existente
+        registrar_erros: Função chamada com a lista de erros de cada bloco. Se
+            informada, os erros não são acumulados no resumo (memória constante)
+        progresso: Função opcional chamada com (linhas processadas, None)
+
+    Returns:
+        Dicionário de novo_resumo() com os totais (incluindo execuções anteriores retomadas)
+    """
+    caminho_checkpoint = caminho_checkpoint or caminho_checkpoint_padrao(caminho_arquivo)
+    identificacao = _identificar_arquivo(caminho_arquivo)
+    resumo = novo_resumo()
+    processadas = 0
+
+    checkpoint = carregar_checkpoint(caminho_checkpoint)
+    if checkpoint is not None:
+        if not retomar:
+            raise ErroImportacao(
+                f'Existe um checkpoint de importação anterior em {caminho_checkpoint}. '
+                'Retome a importação ou apague o arquivo de checkpoint.'
+            )
+        if checkpoint['arquivo'] != identificacao:
+            raise ErroImportacao('O checkpoint pertence a outro arquivo ou o arquivo foi alterado desde então.')
+        processadas = checkpoint['linhas_processadas']
+        resumo.update(checkpoint['resumo'])
+
+    for primeira_linha, bloco in ler_em_blocos(caminho_arquivo, tamanho_bloco, pular=processadas):
+        parcial = importar_dataframe(bloco, tamanho_lote, primeira_linha=primeira_linha)
+        if registrar_erros:
+            registrar_erros(parcial.pop('erros'))
+        mesclar_resumos(resumo, parcial)
+        processadas += len(bloco)
+
+        _salvar_checkpoint(caminho_checkpoint, {
+            'arquivo': identificacao,
+            'linhas_processadas': processadas,
+            'resumo': {chave: valor for chave, valor in resumo.items() if chave != 'erros'},
+        })
+        if progresso:
+            progresso(processadas, None)
+
+    # Importação concluída: o checkpoint não é mais necessário
+    if os.path.exists(caminho_checkpoint):
+        os.remove(caminho_checkpoint)
+    return resumo
+
+
+# Modo paralelo (partições por CRAS)
+
+def particionar_por_cras(df, primeira_linha=PRIMEIRA_LINHA_DADOS):
+    """
+    Divide a planilha em partições por cras_id.
+
+    Números PAIF repetidos são rejeitados antes da divisão (mantendo a
+    primeira ocorrência), para que duas partições nunca gravem a mesma ficha.
+
+    Returns:
+        Tupla (lista de (cras_id, DataFrame, números das linhas), erros)
+    """
+    _validar_colunas(df)
+    df = df.reset_index(drop=True)
+    linhas = pd.Series(pd.RangeIndex(primeira_linha, primeira_linha + len(df)))
+
+    numeros = _numero_paif(df['numero_paif'])
+    repetidos = numeros.duplicated(keep='first') & numeros.notna()
+    erros = [
+        _erro(linhas[indice], numeros[indice], 'numero_paif repetido na planilha')
+        for indice in repetidos[repetidos].index
+    ]
+
+    if 'cras_id' in df.columns:
+        cras = pd.to_numeric(df['cras_id'], errors='coerce').fillna(CRAS_PADRAO)
+    else:
+        cras = pd.Series(CRAS_PADRAO, index=df.index)
+
+    particoes = [
+        (cras_id, df.loc[indices], linhas[indices].tolist())
+        for cras_id, indices in cras[~repetidos].groupby(cras[~repetidos]).groups.items()
+    ]
+    return particoes, erros
+
+
+def _iniciar_processo():
+    if not apps.ready:
+        django.setup()
+    # Cada processo abre a própria conexão com o banco na primeira consulta
+    connections.close_all()
+
+
+def _importar_particao(df, linhas, tamanho_lote):
+    try:
+        return importar_dataframe(df, tamanho_lote, linhas=linhas)
+    finally:
+        connections.close_all()
+
+
+def importar_em_paralelo(caminho_arquivo, processos=None, tamanho_lote=TAMANHO_LOTE, progresso=None):
+    """
+    Importa a planilha em vários processos, uma partição por CRAS.
+
+    Args:
+        caminho_arquivo: Arquivo .xlsx/.xls ou .csv
+        processos: Quantidade de processos (padrão: número de CPUs)
+        tamanho_lote: Linhas gravadas por transação em cada processo
+        progresso: Função opcional chamada com (partições concluídas, total)
+
+    Returns:
+        Dicionário de novo_resumo() com a soma das partições
+    """
+    df = ler_planilha(caminho_arquivo)
+    particoes, erros = particionar_por_cras(df)
+
+    resumo = novo_resumo()
+    resumo['total_linhas'] = len(erros)
+    resumo['linhas_com_erro'] = len(erros)
+    resumo['erros'].extend(erros)
+
+    # Maiores partições primeiro, para equilibrar a carga entre os processos
+    particoes.sort(key=lambda particao: len(particao[1]), reverse=True)
+    processos = min(processos or os.cpu_count() or 1, len(particoes))
+
+    if processos <= 1:
+        for concluidas, (_, particao, linhas) in enumerate(particoes, 1):
+            mesclar_resumos(resumo, importar_dataframe(particao, tamanho_lote, linhas=linhas))
+            if progresso:
+                progresso(concluidas, len(particoes))
+    else:
+        # Conexões abertas não podem ser herdadas pelos processos filhos
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=processos, initializer=_iniciar_processo) as executor:
+            futuros = [
+                executor.submit(_importar_particao, particao, linhas, tamanho_lote)
+                for _, particao, linhas in particoes
+            ]
+            for concluidas, futuro in enumerate(as_completed(futuros), 1):
+                mesclar_resumos(resumo, futuro.result())
+                if progresso:
+                    progresso(concluidas, len(futuros))
+
+    resumo['erros'].sort(key=lambda erro: erro['linha'])
+    return resumo
@@ -0,0 +1 @@
+# Arquivo vazio para marcar o diretório como pacote Python
@@ -0,0 +1,115 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.paif.importacao import (
+    TAMANHO_BLOCO, TAMANHO_LOTE, ErroImportacao, importar_em_blocos, importar_em_paralelo, importar_planilha,
+)
+
+CAMPOS_RELATORIO_ERROS = ['linha', 'numero_paif', 'erro']
+
+
+class Command(BaseCommand):
+    help = 'Importa fichas PAIF e responsáveis familiares a partir de uma planilha (.xlsx, .xls ou .csv)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help='Caminho da planilha a importar')
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE,
+                            help=f'Linhas gravadas por transação (padrão: {TAMANHO_LOTE})')
+        parser.add_argument('--relatorio-erros', dest='relatorio_erros',
+                            help='Grava as linhas rejeitadas neste arquivo CSV')
+        parser.add_argument('--em-blocos', action='store_true', dest='em_blocos',
+                            help='Lê o arquivo (.xlsx ou .csv) em blocos, com memória limitada e checkpoints')
+        parser.add_argument('--tamanho-bloco', type=int, default=TAMANHO_BLOCO, dest='tamanho_bloco',
+                            help=f'Linhas por bloco no modo em blocos (padrão: {TAMANHO_BLOCO})')
+        parser.add_argument('--checkpoint',
+                            help='Arquivo de checkpoint do modo em blocos (padrão: <arquivo>.checkpoint.json)')
+        parser.add_argument('--retomar', action='store_true',
+                            help='Retoma uma importação em blocos interrompida a partir do checkpoint')
+        parser.add_argument('--processos', type=int,
+                            help='Importa em paralelo, dividindo as linhas por CRAS entre N processos '
+                                 '(0 = número de CPUs)')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1 or options['tamanho_bloco'] < 1:
+            raise CommandError('O tamanho do lote e do bloco deve ser maior que zero.')
+        if options['retomar'] and not options['em_blocos']:
+            raise CommandError('--retomar só pode ser usado com --em-blocos.')
+        if options['processos'] is not None:
+            if options['em_blocos']:
+                raise CommandError('--processos não pode ser combinado com --em-blocos.')
+            if options['processos'] < 0:
+                raise CommandError('A quantidade de processos não pode ser negativa.')
+
+        self.stdout.write(f"Iniciando importação de dados do arquivo: {options['arquivo']}")
+        relatorio = None
+        try:
+            if options['em_blocos']:
+                registrar_erros = None
+                if options['relatorio_erros']:
+                    # Na retomada, os erros dos blocos anteriores já estão no relatório
+                    relatorio = self._abrir_relatorio(options['relatorio_erros'], acrescentar=options['retomar'])
+                    registrar_erros = relatorio.writerows
+                resumo = importar_em_blocos(
+                    options['arquivo'], options['tamanho_bloco'], options['lote'],
+                    caminho_checkpoint=options['checkpoint'], retomar=options['retomar'],
+                    registrar_erros=registrar_erros, progresso=self._progresso,
+                )
+            elif options['processos'] is not None:
+                resumo = importar_em_paralelo(
+                    options['arquivo'], options['processos'] or None, options['lote'],
+                    progresso=self._progresso_particoes,
+                )
+            else:
+                resumo = importar_planilha(options['arquivo'], options['lote'], progresso=self._progresso)
+            if not options['em_blocos'] and options['relatorio_erros'] and resumo['erros']:
+                relatorio = self._abrir_relatorio(options['relatorio_erros'])
+                relatorio.writerows(resumo['erros'])
+        except (ErroImportacao, OSError) as e:
+            raise CommandError(str(e))
+        finally:
+            if relatorio is not None:
+                relatorio.arquivo.close()
+
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS('Importação concluída!'))
+        self.stdout.write(f"Linhas lidas: {resumo['total_linhas']}")
+        self.stdout.write(f"Fichas PAIF criadas: {resumo['fichas_criadas']}")
+        self.stdout.write(f"Fichas PAIF atualizadas: {resumo['fichas_atualizadas']}")
+        self.stdout.write(f"Fichas PAIF sem alteração: {resumo['fichas_sem_alteracao']}")
+        self.stdout.write(f"Beneficiários criados: {resumo['beneficiarios_criados']}")
+        self.stdout.write(f"Endereços vazios substituídos: {resumo['enderecos_substituidos']}")
+
+        if resumo['linhas_com_erro']:
+            self.stdout.write(self.style.WARNING(f"Linhas com erro: {resumo['linhas_com_erro']}"))
+            if options['relatorio_erros']:
+                self.stdout.write(f"Relatório de erros gravado em {options['relatorio_erros']}")
+            else:
+                erros = resumo['erros']
+                for erro in erros[:20]:
+                    self.stdout.write(f"  Linha {erro['linha']} ({erro['numero_paif']}): {erro['erro']}")
+                if len(erros) > 20:
+                    self.stdout.write('  ... use --relatorio-erros para a lista completa')
+
+        if resumo['fichas_criadas']:
+            self.stdout.write(self.style.WARNING(
+                'ATENÇÃO: os registros foram importados com valores padrão para campos obrigatórios '
+                '(CPF, CEP, telefone e dados do responsável). Atualize-os com as informações corretas.'
+            ))
+
+    def _progresso(self, processadas, total):
+        if total is None:
+            self.stdout.write(f'Processadas {processadas} linhas...')
+        else:
+            self.stdout.write(f'Processadas {processadas} de {total} linhas válidas...')
+
+    def _progresso_particoes(self, concluidas, total):
+        self.stdout.write(f'CRAS concluídos: {concluidas} de {total}...')
+
+    def _abrir_relatorio(self, caminho, acrescentar=False):
+        arquivo = open(caminho, 'a' if acrescentar else 'w', newline='', encoding='utf-8')
+        escritor = csv.DictWriter(arquivo, fieldnames=CAMPOS_RELATORIO_ERROS)
+        if arquivo.tell() == 0:
+            escritor.writeheader()
+        escritor.arquivo = arquivo
+        return escritor
@@ -0,0 +1,122 @@
+"""
+Tarefas em segundo plano do PAIF (ver apps.core.tarefas).
+"""
+
+import csv
+import io
+import os
+import tempfile
+from datetime import datetime
+
+from django.core.files.storage import default_storage
+
+from apps.core.models import FichaPAIF
+from apps.core.tarefas import arquivo_entrada, registrar_tarefa
+
+CAMPOS_RELATORIO_ERROS = ['linha', 'numero_paif', 'erro']
+
+PERFIS_IMPORTACAO = ('Coordenador', 'Técnico PAIF', 'Auxiliar Administrativo')
+
+
+def _pode_importar(usuario):
+    return usuario.perfil in PERFIS_IMPORTACAO
+
+
+@registrar_tarefa('importar_paif', permissao=_pode_importar)
+def tarefa_importar_paif(contexto, arquivo, em_blocos=False, tamanho_bloco=None, lote=None):
+    """
+    Importa uma planilha PAIF enviada com a tarefa (`arquivo` é o nome no
+    storage, dentro de tarefas/entrada/; ver tarefa_enfileirar).
+
+    No modo em blocos, uma nova tentativa retoma do checkpoint da execução
+    anterior. As linhas rejeitadas viram o arquivo de resultado (CSV).
+    """
+    # Importado aqui para não carregar o pandas na inicialização dos processos web
+    from apps.paif.importacao import (
+        TAMANHO_BLOCO, TAMANHO_LOTE, caminho_checkpoint_padrao, importar_em_blocos, importar_planilha,
+    )
+
+    arquivo = arquivo_entrada(arquivo)
+    caminho = default_storage.path(arquivo)
+    lote = int(lote or TAMANHO_LOTE)
+    contexto.progresso(0, 'Importando planilha...')
+
+    # Vindo de formulário, em_blocos chega como texto ("1", "true", "on")
+    if em_blocos in (True, '1', 'true', 'on'):
+        def progresso(processadas, total):
+            contexto.progresso(0, f'Processadas {processadas} linhas...')
+
+        resumo = importar_em_blocos(
+            caminho, int(tamanho_bloco or TAMANHO_BLOCO), lote,
+            retomar=os.path.exists(caminho_checkpoint_padrao(caminho)),
+            progresso=progresso,
+        )
+    else:
+        def progresso(processadas, total):
+            contexto.progresso(processadas * 100 / total if total else 100,
+                               f'Processadas {processadas} de {total} linhas válidas...')
+
+        resumo = importar_planilha(caminho, lote, progresso=progresso)
+
+    erros = resumo.pop('erros')
+    if erros:
+        conteudo = io.StringIO()
+        escritor = csv.DictWriter(conteudo, fieldnames=CAMPOS_RELATORIO_ERROS)
+        escritor.writeheader()
+        escritor.writerows(erros)
+        contexto.salvar_arquivo(io.BytesIO(conteudo.getvalue().encode('utf-8')),
+                                'erros_importacao_paif.csv', 'text/csv')
+
+    default_storage.delete(arquivo)
+    return resumo
+
+
+@registrar_tarefa('ficha_paif_pdf')
+def tarefa_ficha_paif_pdf(contexto, ficha_id):
+    from apps.relatorios.utils.pdf_generator import gerar_pdf_ficha_paif
+
+    ficha = FichaPAIF.objects.select_related('cras').get(pk=ficha_id)
+    contexto.progresso(0, f'Gerando PDF da ficha {ficha.numero_paif}...')
+    contexto.salvar_resposta(gerar_pdf_ficha_paif(ficha))
+    return {'numero_paif': ficha.numero_paif}
+
+
+PERFIS_LOTE_FICHAS = ('Coordenador', 'Técnico PAIF', 'Assistente Social')
+
+
+def _pode_imprimir_lote(usuario):
+    return usuario.perfil in PERFIS_LOTE_FICHAS
+
+
+@registrar_tarefa('fichas_paif_lote', permissao=_pode_imprimir_lote, max_tentativas=1)
+def tarefa_fichas_paif_lote(contexto, formato='pdf', processos=None, **filtros):
+    """
+    Imprime em lote as fichas PAIF que atendem aos filtros (campos do
+    PesquisaPAIFForm), em um único PDF ou em um ZIP com um PDF por ficha.
+    """
+    from apps.paif.forms import PesquisaPAIFForm
+    from apps.relatorios.utils.fichas_lote import FORMATOS_LOTE, gerar_lote_fichas_paif
+
+    form = PesquisaPAIFForm(filtros)
+    if not form.is_valid():
+        raise ValueError(f'Filtros inválidos: {form.errors.as_text()}')
+    fichas = form.filtrar(FichaPAIF.objects.order_by('numero_paif', 'pk'))
+
+    # Restringir ao CRAS do solicitante, como na listagem
+    usuario = contexto.tarefa.usuario
+    if usuario and not usuario.is_superuser and usuario.cras_id:
+        fichas = fichas.filter(cras_id=usuario.cras_id)
+
+    def progresso(geradas, total):
+        contexto.progresso(geradas * 90 / total, f'Geradas {geradas} de {total} fichas...')
+
+    contexto.progresso(0, 'Preparando fichas...')
+    tipo_conteudo, extensao = FORMATOS_LOTE.get(formato, (None, None))
+    with tempfile.TemporaryFile() as saida:
+        resumo = gerar_lote_fichas_paif(
+            fichas, saida, formato, int(processos) if processos else None, progresso,
+        )
+        contexto.salvar_arquivo(
+            saida, f"fichas_paif_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extensao}", tipo_conteudo,
+        )
+    return resumo
@@ -0,0 +1,65 @@
+from datetime import date
+
+import pandas as pd
+from django.test import TestCase
+
+from apps.core.models import CRAS, Cidade, FichaPAIF, SequenciaPAIF, formatar_numero_paif
+from apps.paif.importacao import importar_dataframe
+
+
+class NumeroPaifImportacaoTests(TestCase):
+    """Fichas com e sem numero_paif importadas depois de fichas criadas pelo sistema."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cidade = Cidade.objects.create(nome='Cidade', uf='SP')
+        cls.cras = CRAS.objects.create(nome='CRAS', cidade=cidade, endereco='Rua', telefone='0', coordenador='-')
+        cls.ano = date.today().year
+
+    def numero(self, sequencial):
+        return formatar_numero_paif(self.ano, sequencial)
+
+    def nova_ficha(self, numero_paif=''):
+        ficha = FichaPAIF(
+            numero_paif=numero_paif, tipo='inclusao', data=date.today(), nome_referencia='Responsável',
+            cpf='00000000000', endereco='Rua', numero='1', bairro='Centro', cep='00000000',
+            municipio='Cidade', telefone='0000000000', num_integrantes=1, cras=self.cras,
+        )
+        ficha.save()
+        return ficha
+
+    def planilha(self, numeros):
+        return pd.DataFrame({
+            'numero_paif': numeros,
+            'data': ['01/01/2024'] * len(numeros),
+            'responsavel_familiar': [f'Responsável {indice}' for indice in range(len(numeros))],
+            'cras_id': [self.cras.pk] * len(numeros),
+        })
+
+    def test_importacao_mista_avanca_sequencia(self):
+        self.assertEqual(self.nova_ficha().numero_paif, self.numero(1))
+
+        resumo = importar_dataframe(self.planilha([self.numero(2), self.numero(3), None]))
+
+        self.assertEqual(resumo['erros'], [])
+        self.assertEqual(resumo['fichas_criadas'], 3)
+        self.assertTrue(FichaPAIF.objects.filter(numero_paif=self.numero(4)).exists())
+        self.assertEqual(self.nova_ficha().numero_paif, self.numero(5))
+
+    def test_ficha_com_numero_informado_avanca_sequencia(self):
+        self.nova_ficha()
+        self.nova_ficha(self.numero(7))
+
+        self.assertEqual(self.nova_ficha().numero_paif, self.numero(8))
+
+    def test_colisao_com_numero_gravado_fora_da_sequencia(self):
+        self.nova_ficha()
+        # Gravada sem passar por save() nem pela importação
+        FichaPAIF.objects.filter(pk=self.nova_ficha().pk).update(numero_paif=self.numero(9))
+        SequenciaPAIF.objects.filter(ano=self.ano).update(ultimo=8)
+
+        self.assertEqual(self.nova_ficha().numero_paif, self.numero(10))
+
+        SequenciaPAIF.objects.filter(ano=self.ano).update(ultimo=8)
+        self.assertEqual(importar_dataframe(self.planilha([None]))['erros'], [])
+        self.assertTrue(FichaPAIF.objects.filter(numero_paif=self.numero(11)).exists())
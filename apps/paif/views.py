@@ -47,29 +47,7 @@ def paif_listar(request):
         queryset = queryset.filter(cras=request.user.cras)
     
     # Aplicar filtros da pesquisa
-    if form.is_valid():
-        numero_paif = form.cleaned_data.get('numero_paif')
-        nome = form.cleaned_data.get('nome')
-        cpf = form.cleaned_data.get('cpf')
-        bairro = form.cleaned_data.get('bairro')
-        data_inicial = form.cleaned_data.get('data_inicial')
-        data_final = form.cleaned_data.get('data_final')
-        cras_id = form.cleaned_data.get('cras')
-        
-        if numero_paif:
-            queryset = queryset.filter(numero_paif__icontains=numero_paif)
-        if nome:
-            queryset = queryset.filter(nome_referencia__icontains=nome)
-        if cpf:
-            queryset = queryset.filter(cpf__icontains=cpf)
-        if bairro:
-            queryset = queryset.filter(bairro__icontains=bairro)
-        if data_inicial:
-            queryset = queryset.filter(data__gte=data_inicial)
-        if data_final:
-            queryset = queryset.filter(data__lte=data_final)
-        if cras_id:
-            queryset = queryset.filter(cras_id=cras_id)
+    queryset = form.filtrar(queryset)
     
     # Paginação dos resultados
     pagina = request.GET.get('pagina', 1)
@@ -455,35 +433,10 @@ def api_membros_familiares_adicionar(request):
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
 from django.contrib.auth.decorators import login_required
-from apps.relatorios.utils.pdf_generator import gerar_pdf_instrumental
+from apps.relatorios.utils.pdf_generator import gerar_pdf_ficha_paif
 
 @login_required
 def exportar_ficha_pdf(request, id):
-    """Exporta uma ficha PAIF para formato PDF"""
+    """Exporta uma ficha PAIF para formato PDF (servido do cache se a ficha não mudou)"""
     ficha = get_object_or_404(FichaPAIF, id=id)
-    
-    # Preparar título para o documento
-    titulo = f"Ficha PAIF - {ficha.numero_paif}"
-    
-    # Preparar os dados da ficha para o PDF
-    conteudo = {
-        "nome_referencia": ficha.nome_referencia,
-        "data_cadastro": ficha.data.strftime("%d/%m/%Y") if hasattr(ficha, 'data') else "",
-        "cpf": ficha.cpf,
-        "endereco": ficha.endereco,
-        "telefone": ficha.telefone,
-        "composicao_familiar": [
-            {
-                "nome": familiar.nome,
-                "parentesco": familiar.parentesco,
-                "idade": familiar.idade
-            } for familiar in ficha.familiares.all()
-        ],
-        # Adicione outros campos conforme necessário
-    }
-    
-    # Converter para JSON (necessário para o gerar_pdf_instrumental)
-    conteudo_json = json.dumps(conteudo)
-    
-    # Usar a função do módulo relatórios para gerar o PDF
-    return gerar_pdf_instrumental(titulo, conteudo_json)
+    return gerar_pdf_ficha_paif(ficha)
@@ -1,15 +1,29 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
 from django.utils import timezone
+from django.utils.http import parse_etags, quote_etag, urlsafe_base64_decode, urlsafe_base64_encode
 from datetime import datetime, timedelta
+import hashlib
+import json
 from django.db.models import Q
 
 from apps.core.models import Agendamento, Beneficiario, DemandaEspontanea, Atendimento
+from apps.core.busca import (
+    CACHE_SUGESTOES_SEGUNDOS, buscar_beneficiarios, chave_ordenacao_sugestao, sugerir_beneficiarios,
+)
 from apps.auth_app.models import Usuario  # Adicione esta importação
 from django.conf import settings
 
+# Máximo de beneficiários exibidos na página de busca da recepção
+LIMITE_RESULTADOS_BUSCA = 100
+
+# Paginação da API de sugestões de beneficiários
+TAMANHO_PAGINA_SUGESTOES = 10
+MAXIMO_PAGINA_SUGESTOES = 25
+CAMPOS_RESPOSTA_SUGESTAO = ('id', 'nome_completo', 'cpf', 'nis', 'data_nascimento', 'paif')
+
 @login_required
 def index(request):
     """Página principal da recepção"""
@@ -122,15 +136,8 @@ def busca_beneficiario(request):
     termo = request.GET.get('termo', '')
     
     if termo:
-        beneficiarios = Beneficiario.objects.filter(
-            nome_completo__icontains=termo
-        ) | Beneficiario.objects.filter(
-            cpf__icontains=termo
-        ) | Beneficiario.objects.filter(
-            nis__icontains=termo
-        ) | Beneficiario.objects.filter(
-            rg__icontains=termo
-        )
+        # Busca pelos índices de nome/documentos normalizados (apps.core.busca)
+        beneficiarios = buscar_beneficiarios(termo).order_by('nome_busca')[:LIMITE_RESULTADOS_BUSCA]
         
         context['beneficiarios'] = beneficiarios
         context['termo'] = termo
@@ -333,10 +340,7 @@ def agendar_demanda_espontanea(request):
         if cpf:
             # Remover caracteres não numéricos do CPF
             cpf_limpo = ''.join(filter(str.isdigit, cpf))
-            try:
-                beneficiario = Beneficiario.objects.get(cpf=cpf_limpo)
-            except Beneficiario.DoesNotExist:
-                pass
+            beneficiario = Beneficiario.objects.filter(cpf_digitos=cpf_limpo).first()
         
         if not beneficiario:
             # Criar um registro básico de beneficiário
@@ -377,39 +381,61 @@ def agendar_demanda_espontanea(request):
     
     return redirect('recepcao_busca')
 
+def _codificar_cursor(sugestao):
+    chave = list(chave_ordenacao_sugestao(sugestao))
+    return urlsafe_base64_encode(json.dumps(chave, separators=(',', ':')).encode('utf-8'))
+
+def _decodificar_cursor(cursor):
+    try:
+        rank, nome_busca, pk = json.loads(urlsafe_base64_decode(cursor))
+        return (int(rank), str(nome_busca), int(pk))
+    except (TypeError, ValueError):
+        return None
+
 @login_required
 def api_buscar_beneficiarios(request):
-    """API para buscar beneficiários por nome, CPF ou NIS"""
+    """
+    API de sugestões (typeahead) de beneficiários por nome, CPF, NIS ou RG.
+
+    Parâmetros GET:
+        termo: Texto digitado
+        limite: Itens por página (padrão TAMANHO_PAGINA_SUGESTOES)
+        cursor: Valor de `proximo` da página anterior
+
+    A resposta traz um ETag; requisições com If-None-Match igual recebem 304.
+    """
     termo = request.GET.get('termo', '').strip()
-    
-    # CÓDIGO TEMPORÁRIO: Simula resultados para testes
-    # Em produção, isso seria substituído pela consulta real ao banco
-    if not termo:
-        return JsonResponse({'beneficiarios': []})
-    
-    # Para fins de demonstração, retornamos dados fictícios
-    # Se o termo contiver "404" ou "nao", retornamos vazia para simular "não encontrado"
-    if '404' in termo.lower() or 'nao' in termo.lower():
-        return JsonResponse({'beneficiarios': []})
-    
-    # Caso contrário, simulamos alguns resultados
-    beneficiarios = [
-        {
-            'id': 1,
-            'nome_completo': f'{termo.title()} da Silva',
-            'cpf': '123.456.789-00',
-            'nis': '12345678901',
-            'data_nascimento': '01/01/1980',
-            'paif': True
-        },
-        {
-            'id': 2,
-            'nome_completo': f'Maria {termo.title()}',
-            'cpf': '987.654.321-00',
-            'nis': '10987654321',
-            'data_nascimento': '15/05/1975',
-            'paif': False
-        }
-    ]
-    
-    return JsonResponse({'beneficiarios': beneficiarios})
\ No newline at end of file
+    try:
+        limite = int(request.GET.get('limite', TAMANHO_PAGINA_SUGESTOES))
+    except ValueError:
+        limite = TAMANHO_PAGINA_SUGESTOES
+    limite = max(1, min(limite, MAXIMO_PAGINA_SUGESTOES))
+
+    sugestoes = sugerir_beneficiarios(termo)
+
+    # Paginação por chave (rank, nome_busca, id): estável mesmo que o cache expire
+    cursor = request.GET.get('cursor')
+    if cursor:
+        apos = _decodificar_cursor(cursor)
+        if apos is None:
+            return JsonResponse({'erro': 'Cursor inválido'}, status=400)
+        sugestoes = [s for s in sugestoes if chave_ordenacao_sugestao(s) > apos]
+
+    pagina = sugestoes[:limite]
+    dados = {
+        'beneficiarios': [
+            {campo: sugestao[campo] for campo in CAMPOS_RESPOSTA_SUGESTAO}
+            for sugestao in pagina
+        ],
+        'proximo': _codificar_cursor(pagina[-1]) if len(sugestoes) > limite else None,
+    }
+
+    conteudo = json.dumps(dados, ensure_ascii=False, separators=(',', ':'))
+    etag = quote_etag(hashlib.md5(conteudo.encode('utf-8')).hexdigest())
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        resposta = HttpResponseNotModified()
+    else:
+        resposta = HttpResponse(conteudo, content_type='application/json')
+    resposta['ETag'] = etag
+    resposta['Cache-Control'] = f'private, max-age={CACHE_SUGESTOES_SEGUNDOS}'
+    return resposta
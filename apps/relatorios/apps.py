@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class RelatoriosConfig(AppConfig):
+    name = 'apps.relatorios'
+    verbose_name = 'Relatórios'
+
+    def ready(self):
+        # Registrar as tarefas em segundo plano dos relatórios
+        from apps.relatorios import tarefas  # noqa: F401
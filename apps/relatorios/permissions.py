@@ -1,5 +1,11 @@
 # apps/relatorios/permissions.py
+import unicodedata
+from functools import lru_cache
+
 from django.contrib.auth.mixins import UserPassesTestMixin
+from django.core.exceptions import ObjectDoesNotExist
+
+from apps.auth_app.models import Usuario
 
 class RelatorioPermissionMixin(UserPassesTestMixin):
     """Base mixin para controle de acesso aos relatórios"""
@@ -20,4 +26,94 @@ class RelatorioPermissionMixin(UserPassesTestMixin):
             # outros perfis...
         }
         
-        return perfil in permissoes and report_type in permissoes[perfil]
\ No newline at end of file
+        return perfil in permissoes and report_type in permissoes[perfil]
+
+# Permissões de acesso aos relatórios por perfil
+#
+# A matriz perfil -> relatórios é montada uma vez, na importação, a partir
+# dos perfis de Usuario.PERFIL_CHOICES; perfis fora da lista são
+# classificados na primeira consulta e memorizados. O resultado de cada
+# usuário (incluindo a consulta ao PerfilUsuario) fica guardado na própria
+# requisição, de modo que as várias verificações de uma página não repetem
+# trabalho.
+
+TIPOS_RELATORIO = ('paif', 'scfv')
+
+# Chave usada para o acesso à página inicial de relatórios
+PAGINA_INICIAL = None
+
+TODOS_RELATORIOS = frozenset((PAGINA_INICIAL,) + TIPOS_RELATORIO)
+
+
+def _normalizar_perfil(perfil):
+    perfil = perfil.lower().replace(' ', '_').replace('-', '_')
+    return unicodedata.normalize('NFKD', perfil).encode('ASCII', 'ignore').decode('ASCII')
+
+
+@lru_cache(maxsize=None)
+def relatorios_do_perfil(perfil):
+    """Conjunto de relatórios (e PAGINA_INICIAL) que o perfil pode acessar."""
+    if not perfil:
+        return frozenset()
+    perfil = _normalizar_perfil(perfil)
+
+    # Coordenador e desenvolvedor têm acesso a todos os relatórios
+    if perfil in ('coordenador', 'desenvolvedor', 'administrador'):
+        return TODOS_RELATORIOS
+    # Assistentes sociais só podem acessar relatórios PAIF
+    if perfil in ('assistente_social', 'assistente'):
+        return frozenset((PAGINA_INICIAL, 'paif'))
+    # Perfis técnicos acessam os relatórios SCFV
+    if 'tecnic' in perfil or perfil.startswith('tec'):
+        return frozenset((PAGINA_INICIAL, 'scfv'))
+    return frozenset()
+
+
+MATRIZ_PERMISSOES = {perfil: relatorios_do_perfil(perfil) for perfil, _ in Usuario.PERFIL_CHOICES}
+
+
+def _perfil_estendido(usuario):
+    """Perfil do PerfilUsuario vinculado ao usuário, se houver."""
+    try:
+        return usuario.perfilusuario.perfil
+    except ObjectDoesNotExist:
+        return None
+
+
+def relatorios_do_usuario(usuario):
+    """
+    Relatórios que o usuário pode acessar.
+
+    O perfil do PerfilUsuario, quando existe, tem prioridade sobre
+    Usuario.perfil.
+    """
+    if not usuario.is_authenticated:
+        return frozenset()
+    if usuario.is_superuser:
+        return TODOS_RELATORIOS
+    perfil = _perfil_estendido(usuario) or getattr(usuario, 'perfil', None)
+    return MATRIZ_PERMISSOES.get(perfil) or relatorios_do_perfil(perfil)
+
+
+def relatorios_permitidos(request):
+    """Relatórios que o usuário da requisição pode acessar (calculado uma vez por requisição)."""
+    try:
+        return request._relatorios_permitidos
+    except AttributeError:
+        pass
+    permitidos = relatorios_do_usuario(request.user)
+    request._relatorios_permitidos = permitidos
+    return permitidos
+
+
+def pode_acessar_relatorio(request, tipo_relatorio):
+    """Indica se o usuário pode acessar o relatório ('paif', 'scfv' ou PAGINA_INICIAL)."""
+    return tipo_relatorio in relatorios_permitidos(request)
+
+
+def mapa_permissoes(request):
+    """Permissões do usuário para todos os relatórios, como usadas pelas páginas."""
+    permitidos = relatorios_permitidos(request)
+    mapa = {tipo: tipo in permitidos for tipo in TIPOS_RELATORIO}
+    mapa['pagina_inicial'] = PAGINA_INICIAL in permitidos
+    return mapa
@@ -0,0 +1,48 @@
+"""
+Tarefas em segundo plano dos relatórios (ver apps.core.tarefas).
+"""
+
+import tempfile
+from datetime import datetime
+
+from apps.core.tarefas import registrar_tarefa
+from apps.relatorios.permissions import TIPOS_RELATORIO, relatorios_do_usuario
+
+
+def _pode_gerar_relatorios(usuario):
+    return any(tipo in relatorios_do_usuario(usuario) for tipo in TIPOS_RELATORIO)
+
+
+@registrar_tarefa('relatorio_pdf', permissao=_pode_gerar_relatorios, max_tentativas=1)
+def tarefa_relatorio_pdf(contexto, tipo, colunas=None, titulo=None, **filtros):
+    """
+    Relatório PDF de cadastros PAIF ou SCFV grande demais para ser gerado
+    na requisição (ver exportar_relatorio). Com mais de um núcleo, as
+    páginas são divididas entre processos (ver pdf_paralelo).
+    """
+    from apps.relatorios.utils.colunas import REGISTROS, nome_registro, validar_colunas
+    from apps.relatorios.utils.pdf_generator import _contar_registros, escrever_pdf_relatorio_streaming
+    from apps.relatorios.utils.pdf_paralelo import escrever_pdf_relatorio_paralelo, paralelo_disponivel
+    from apps.relatorios.views import filtrar_relatorio
+
+    usuario = contexto.tarefa.usuario
+    if usuario is None or tipo not in relatorios_do_usuario(usuario):
+        raise PermissionError(f'Sem permissão para o relatório {tipo}')
+
+    cadastros = filtrar_relatorio(filtros, tipo, usuario)
+    colunas = validar_colunas(cadastros, colunas) if colunas else list(REGISTROS[nome_registro(cadastros)])
+    total = _contar_registros(cadastros)
+
+    def progresso(prontos, trechos):
+        contexto.progresso(prontos * 95 / trechos, f'Geradas {prontos} de {trechos} partes...')
+
+    contexto.progresso(0, f'Gerando relatório com {total} registros...')
+    with tempfile.TemporaryFile() as saida:
+        if paralelo_disponivel():
+            escrever_pdf_relatorio_paralelo(cadastros, colunas, saida, titulo, total=total, progresso=progresso)
+        else:
+            escrever_pdf_relatorio_streaming(cadastros, colunas, saida, titulo, total=total)
+        contexto.salvar_arquivo(
+            saida, f"relatorio_{tipo}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf", 'application/pdf',
+        )
+    return {'registros': total}
@@ -0,0 +1,79 @@
+import os
+import tempfile
+from io import BytesIO
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from apps.relatorios.utils import cache_logos
+from apps.relatorios.utils.pdf_generator import escrever_pdf_relatorio_streaming, gerar_pdf_relatorio_formularios
+
+
+class LogosRelatorioTests(SimpleTestCase):
+    """Logos de settings.LOGOS_RELATORIOS no topo das páginas dos relatórios em PDF."""
+
+    def setUp(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        self.logo = os.path.join(diretorio.name, 'logo.png')
+        Image.new('RGB', (2000, 2000), 'navy').save(self.logo)
+        cache_logos.limpar_cache_logos()
+        self.addCleanup(cache_logos.limpar_cache_logos)
+
+    def cadastros(self, quantidade):
+        return [SimpleNamespace(nome=f'Pessoa {indice}') for indice in range(quantidade)]
+
+    def test_relatorio_streaming_embute_o_logo_uma_vez(self):
+        destino = BytesIO()
+        with override_settings(LOGOS_RELATORIOS=[self.logo]):
+            escrever_pdf_relatorio_streaming(self.cadastros(100), ['nome'], destino, linhas_por_pagina=40)
+
+        pdf = destino.getvalue()
+        self.assertEqual(pdf.count(b'/Type /Page\n'), 3)
+        self.assertEqual(pdf.count(b'/Subtype /Image'), 1)
+
+    def test_relatorio_em_tabela_usa_o_logo_do_cache(self):
+        with override_settings(LOGOS_RELATORIOS=[self.logo]):
+            resposta = gerar_pdf_relatorio_formularios(self.cadastros(5), ['nome'], streaming=False)
+            logo = cache_logos.obter_logo(self.logo, cache_logos.CAIXA_LOGO_RELATORIO)
+
+        self.assertIn(b'/Subtype /Image', b''.join(resposta.streaming_content))
+        # Reduzido para a caixa do cabeçalho (1,5 x 0,6 polegadas)
+        self.assertEqual((logo.largura, logo.altura), (0.6 * 72, 0.6 * 72))
+        self.assertEqual(logo.leitor.getSize(), (180, 180))
+
+    def test_sem_logos_configurados(self):
+        destino = BytesIO()
+        with override_settings(LOGOS_RELATORIOS=[]):
+            escrever_pdf_relatorio_streaming(self.cadastros(3), ['nome'], destino)
+
+        self.assertNotIn(b'/Subtype /Image', destino.getvalue())
+
+
+class ColunasExportacaoTests(TestCase):
+    """Colunas pedidas em ?colunas= na exportação dos relatórios."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_superuser('admin@cras.local', 'Administrador', 'senha')
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def exportar(self, formato, colunas):
+        return self.client.get(reverse('relatorios:exportar', args=['paif', formato]), {'colunas': colunas})
+
+    def test_colunas_desconhecidas_retornam_400(self):
+        for formato in ('pdf', 'csv', 'excel'):
+            with self.subTest(formato=formato):
+                resposta = self.exportar(formato, 'nome,zzz,yyy')
+                self.assertEqual(resposta.status_code, 400)
+                self.assertIn('zzz, yyy', resposta.content.decode())
+
+    def test_colunas_validas(self):
+        resposta = self.exportar('pdf', 'numero_paif,nome')
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta['Content-Type'], 'application/pdf')
@@ -14,11 +14,9 @@ urlpatterns = [
     path('api/paif/', views.api_paif, name='api_paif'),
     
     # Nova API para verificação de permissões
+    path('permissoes/', views.permissoes_relatorios, name='permissoes'),
     path('verificar-permissao/<str:tipo_relatorio>/', views.verificar_permissao_ajax, name='verificar_permissao'),
     
-    # Nova URL para depuração de permissões
-    path('debug-permissoes/', views.debug_permissoes, name='debug_permissoes'),
-    
     # Exportação de relatórios
     path('exportar/<str:tipo>/<str:formato>/', views.exportar_relatorio, name='exportar'),
     
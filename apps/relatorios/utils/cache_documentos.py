@@ -0,0 +1,148 @@
+"""
+Cache em disco de documentos gerados (ex.: PDF das fichas PAIF).
+
+Cada documento é gravado em CACHE_DOCUMENTOS_DIR com um nome derivado do
+conteúdo que o determina: tipo, id do objeto, data de atualização e versão
+do modelo do documento. Se qualquer um deles mudar o nome muda, então um
+documento em cache nunca é servido desatualizado; as versões antigas são
+removidas quando o objeto é salvo (ver apps.core.signals) ou saem do cache
+pela política LRU.
+
+O tamanho total é limitado por CACHE_DOCUMENTOS_TAMANHO_MAXIMO. A data de
+modificação de cada arquivo é atualizada a cada acerto, e ao ultrapassar o
+limite os arquivos usados há mais tempo são removidos primeiro.
+"""
+
+import glob
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+
+# Padrões usados se não estiverem definidos em settings
+TAMANHO_MAXIMO_PADRAO = 256 * 1024 * 1024
+
+# Vezes que abrir_documento gera de novo um documento removido pela limpeza
+# entre a marcação de uso e a abertura
+TENTATIVAS_ABERTURA = 3
+
+
+def _diretorio():
+    diretorio = getattr(settings, 'CACHE_DOCUMENTOS_DIR', None) or os.path.join(settings.BASE_DIR, 'cache_documentos')
+    os.makedirs(diretorio, exist_ok=True)
+    return diretorio
+
+
+def _tamanho_maximo():
+    return getattr(settings, 'CACHE_DOCUMENTOS_TAMANHO_MAXIMO', TAMANHO_MAXIMO_PADRAO)
+
+
+def nome_documento(tipo, objeto_id, *partes, extensao='.pdf'):
+    """
+    Nome do arquivo em cache: "<tipo>-<id>-<hash das partes><extensao>".
+
+    O tipo e o id ficam legíveis no nome para que invalidar_documentos
+    encontre todas as versões de um objeto.
+    """
+    conteudo = '|'.join(str(parte) for parte in partes)
+    resumo = hashlib.sha256(conteudo.encode('utf-8')).hexdigest()[:32]
+    return f'{tipo}-{objeto_id}-{resumo}{extensao}'
+
+
+def obter_documento(nome):
+    """Retorna o caminho do documento em cache (marcando o uso) ou None."""
+    caminho = os.path.join(_diretorio(), nome)
+    try:
+        os.utime(caminho)
+    except FileNotFoundError:
+        return None
+    return caminho
+
+
+def gravar_documento(nome, escrever):
+    """
+    Gera o documento com escrever(arquivo) e o grava no cache.
+
+    A gravação é feita em um arquivo temporário no mesmo diretório e movida
+    com os.replace, de modo que leitores concorrentes nunca veem um
+    documento pela metade.
+
+    Returns:
+        Caminho do documento em cache
+    """
+    diretorio = _diretorio()
+    caminho = os.path.join(diretorio, nome)
+    descritor, temporario = tempfile.mkstemp(dir=diretorio, prefix='.tmp-')
+    try:
+        with os.fdopen(descritor, 'wb') as arquivo:
+            escrever(arquivo)
+        os.replace(temporario, caminho)
+    except BaseException:
+        os.unlink(temporario)
+        raise
+    liberar_espaco()
+    return caminho
+
+
+def documento_em_cache(nome, escrever):
+    """Retorna o caminho do documento, gerando-o apenas se não estiver em cache."""
+    return obter_documento(nome) or gravar_documento(nome, escrever)
+
+
+def abrir_documento(nome, escrever):
+    """
+    Abre para leitura binária o documento em cache, gerando-o se necessário.
+
+    O arquivo é aberto logo depois de marcado como usado; se a limpeza do
+    cache o remover antes disso, é gerado outra vez. Uma vez aberto, a
+    remoção do arquivo não afeta a leitura.
+    """
+    for tentativa in range(1, TENTATIVAS_ABERTURA + 1):
+        try:
+            return open(documento_em_cache(nome, escrever), 'rb')
+        except FileNotFoundError:
+            if tentativa == TENTATIVAS_ABERTURA:
+                raise
+
+
+def invalidar_documentos(tipo, objeto_id):
+    """Remove todas as versões em cache dos documentos de um objeto."""
+    padrao = os.path.join(_diretorio(), f'{glob.escape(tipo)}-{objeto_id}-*')
+    for caminho in glob.glob(padrao):
+        try:
+            os.unlink(caminho)
+        except FileNotFoundError:
+            pass
+
+
+def liberar_espaco(tamanho_maximo=None):
+    """Remove os documentos usados há mais tempo até o cache caber no limite."""
+    tamanho_maximo = _tamanho_maximo() if tamanho_maximo is None else tamanho_maximo
+    arquivos = []
+    total = 0
+    with os.scandir(_diretorio()) as entradas:
+        for entrada in entradas:
+            if entrada.name.startswith('.') or not entrada.is_file():
+                continue
+            try:
+                informacoes = entrada.stat()
+            except FileNotFoundError:
+                continue
+            arquivos.append((informacoes.st_mtime, informacoes.st_size, entrada.path))
+            total += informacoes.st_size
+
+    if total <= tamanho_maximo:
+        return 0
+
+    removidos = 0
+    for _, tamanho, caminho in sorted(arquivos):
+        try:
+            os.unlink(caminho)
+        except FileNotFoundError:
+            pass
+        total -= tamanho
+        removidos += 1
+        if total <= tamanho_maximo:
+            break
+    return removidos
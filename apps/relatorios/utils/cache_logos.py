@@ -0,0 +1,134 @@
+"""
+Cache em memória dos logos usados nos cabeçalhos dos relatórios.
+
+Os logos de settings.LOGOS_RELATORIOS são desenhados no topo de cada
+página dos relatórios em PDF (desenhar_logos_relatorio).
+
+Cada logo é lido do disco, reduzido para o tamanho em que é desenhado (na
+resolução de impressão) e guardado como um ImageReader do ReportLab, que
+mantém os pixels já decodificados. Os relatórios seguintes usam o logo sem
+ler nem decodificar o arquivo de novo; a data de modificação do arquivo é
+conferida a cada uso, e um logo substituído em disco é processado outra vez.
+
+Dentro de um documento, o ReportLab identifica as imagens pelo conteúdo:
+o mesmo logo desenhado em várias páginas é embutido uma única vez.
+
+O cache é limitado a TAMANHO_CACHE_LOGOS entradas (as usadas há mais tempo
+saem primeiro) e é próprio de cada processo.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+from django.conf import settings
+from reportlab.lib.units import cm, inch
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import Flowable
+
+from apps.relatorios.utils.delta_quill import ErroImagem, preparar_imagem
+
+TAMANHO_CACHE_LOGOS = 32
+DPI_LOGOS = 300
+
+# Espaço (largura, altura em polegadas) de cada logo no cabeçalho
+CAIXA_LOGO = (0.8, 0.8)
+
+# Espaço de cada logo no topo das páginas dos relatórios (cabe na margem superior)
+CAIXA_LOGO_RELATORIO = (1.5, 0.6)
+ESPACO_ENTRE_LOGOS = 0.4 * cm
+
+_cache = OrderedDict()
+_trava = threading.Lock()
+
+
+class Logo:
+    """Logo pronto para desenho: leitor de imagem e tamanho final em pontos."""
+
+    __slots__ = ('leitor', 'largura', 'altura')
+
+    def __init__(self, leitor, largura, altura):
+        self.leitor = leitor
+        self.largura = largura
+        self.altura = altura
+
+
+class LogoFlowable(Flowable):
+    """Flowable que desenha um Logo do cache."""
+
+    def __init__(self, logo):
+        super().__init__()
+        self.logo = logo
+        self.width = logo.largura
+        self.height = logo.altura
+
+    def draw(self):
+        self.canv.drawImage(self.logo.leitor, 0, 0, self.width, self.height, mask='auto')
+
+
+def _carregar(caminho, caixa):
+    with open(caminho, 'rb') as arquivo:
+        imagem = preparar_imagem(arquivo.read(), caixa, dpi=DPI_LOGOS)
+    largura, altura = imagem.tamanho(caixa)
+    return Logo(ImageReader(BytesIO(imagem.dados)), largura * inch, altura * inch)
+
+
+def obter_logo(caminho, caixa=CAIXA_LOGO):
+    """
+    Logo do arquivo `caminho` reduzido para caber na caixa (polegadas).
+
+    Returns:
+        Logo, ou None se o arquivo não existir ou não for uma imagem válida
+    """
+    try:
+        informacoes = os.stat(caminho)
+    except (OSError, TypeError, ValueError):
+        return None
+    chave = (caminho, caixa)
+    versao = (informacoes.st_mtime_ns, informacoes.st_size)
+
+    with _trava:
+        entrada = _cache.get(chave)
+        if entrada and entrada[0] == versao:
+            _cache.move_to_end(chave)
+            return entrada[1]
+
+    try:
+        logo = _carregar(caminho, caixa)
+    except (OSError, ErroImagem):
+        return None
+
+    with _trava:
+        _cache[chave] = (versao, logo)
+        _cache.move_to_end(chave)
+        while len(_cache) > TAMANHO_CACHE_LOGOS:
+            _cache.popitem(last=False)
+    return logo
+
+
+def logo_flowable(caminho, caixa=CAIXA_LOGO):
+    """Flowable do logo para uso em tabelas/cabeçalhos, ou None se indisponível."""
+    logo = obter_logo(caminho, caixa)
+    return LogoFlowable(logo) if logo else None
+
+
+def desenhar_logos_relatorio(pdf, direita, topo, caixa=CAIXA_LOGO_RELATORIO):
+    """
+    Desenha os logos de settings.LOGOS_RELATORIOS no canvas, alinhados à
+    direita em `direita` e com o topo em `topo` (pontos).
+
+    Chamada a cada página: os logos vêm do cache, e o ReportLab embute cada
+    um uma única vez no documento.
+    """
+    logos = [obter_logo(caminho, caixa) for caminho in getattr(settings, 'LOGOS_RELATORIOS', ())]
+    x = direita
+    for logo in reversed([logo for logo in logos if logo]):
+        x -= logo.largura
+        pdf.drawImage(logo.leitor, x, topo - logo.altura, logo.largura, logo.altura, mask='auto')
+        x -= ESPACO_ENTRE_LOGOS
+
+
+def limpar_cache_logos():
+    with _trava:
+        _cache.clear()
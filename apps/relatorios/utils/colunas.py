@@ -0,0 +1,231 @@
+"""
+Registro das colunas dos relatórios exportados (PDF, DOCX, Excel, CSV).
+
+Cada chave de coluna escolhida na tela de relatórios ('nome', 'cras',
+'data_cadastro'...) é ligada a um rótulo, ao caminho do campo no banco e a
+um formatador. compilar_colunas transforma a lista de colunas pedida numa
+Projecao, que lê do QuerySet apenas os campos necessários com
+values_list (os JOINs saem dos caminhos, ex.: 'cras__nome') e entrega cada
+registro como uma lista de valores já formatados, sem instanciar os modelos.
+
+Iteráveis que não são QuerySets (listas de objetos) também são aceitos:
+os mesmos caminhos são resolvidos atributo a atributo.
+"""
+
+from functools import lru_cache
+
+from apps.core.models import Beneficiario, FichaPAIF, FichaSCFV
+
+# Quantidade de linhas buscadas por vez no cursor do banco
+TAMANHO_LOTE_CONSULTA = 2000
+
+
+def formatar_texto(valor):
+    return '' if valor is None else str(valor)
+
+
+def formatar_data(valor):
+    return valor.strftime('%d/%m/%Y') if valor else ''
+
+
+def _sem_formatacao(valor):
+    return valor
+
+
+class Coluna:
+    """
+    Coluna de relatório.
+
+    Args:
+        rotulo: Texto do cabeçalho
+        campo: Caminho do campo no estilo do ORM ('cras__nome'); None para
+            colunas de valor fixo
+        formatar: Função que converte o valor lido em texto
+        data: Indica colunas de data (exportadas como data no Excel)
+        valor_fixo: Valor da coluna quando ela não vem do banco
+    """
+
+    def __init__(self, rotulo, campo=None, formatar=formatar_texto, data=False, valor_fixo=''):
+        self.rotulo = rotulo
+        self.campo = campo
+        self.formatar = formatar_data if data else formatar
+        self.data = data
+        self.valor_fixo = valor_fixo
+
+
+# Colunas dos objetos "Cadastro" (atributos com o mesmo nome da coluna),
+# usadas para iteráveis de modelos não registrados
+COLUNAS_CADASTRO = {
+    'nome': Coluna('Nome', 'nome'),
+    'projeto': Coluna('Projeto', 'projeto'),
+    'data_nascimento': Coluna('Data Nasc.', 'data_nascimento', data=True),
+    'data_cadastro': Coluna('Data Cadastro', 'data_cadastro', data=True),
+    'cras': Coluna('CRAS', 'cras__nome'),
+    'cidade': Coluna('Cidade', 'cidade'),
+    'bairro': Coluna('Bairro', 'bairro'),
+    'contato': Coluna('Contato', 'contato'),
+    'nome_mae': Coluna('Nome da Mãe', 'nome_mae'),
+}
+
+TIPOS_FICHA_PAIF = dict(FichaPAIF._meta.get_field('tipo').choices)
+
+COLUNAS_PAIF = {
+    'numero_paif': Coluna('Nº PAIF', 'numero_paif'),
+    'nome': Coluna('Nome Referência', 'nome_referencia'),
+    'projeto': Coluna('Projeto', valor_fixo='PAIF'),
+    'tipo': Coluna('Tipo', 'tipo', formatar=lambda valor: TIPOS_FICHA_PAIF.get(valor, valor or '')),
+    'data_cadastro': Coluna('Data Cadastro', 'data', data=True),
+    'cpf': Coluna('CPF', 'cpf'),
+    'nis': Coluna('NIS', 'nis'),
+    'nome_mae': Coluna('Nome da Mãe', 'nome_mae'),
+    'endereco': Coluna('Endereço', 'endereco'),
+    'bairro': Coluna('Bairro', 'bairro'),
+    'cidade': Coluna('Cidade', 'municipio'),
+    'contato': Coluna('Contato', 'telefone'),
+    'num_integrantes': Coluna('Integrantes', 'num_integrantes'),
+    'cras': Coluna('CRAS', 'cras__nome'),
+}
+
+COLUNAS_BENEFICIARIO = {
+    'nome': Coluna('Nome', 'nome_completo'),
+    'projeto': Coluna('Projeto', 'ficha_paif_id', formatar=lambda valor: 'PAIF' if valor else ''),
+    'data_nascimento': Coluna('Data Nasc.', 'data_nascimento', data=True),
+    'cpf': Coluna('CPF', 'cpf'),
+    'nis': Coluna('NIS', 'nis'),
+    'nome_mae': Coluna('Nome da Mãe', 'nome_mae'),
+    'endereco': Coluna('Endereço', 'endereco'),
+    'numero_paif': Coluna('Nº PAIF', 'ficha_paif__numero_paif'),
+    'cras': Coluna('CRAS', 'cras__nome'),
+    'cidade': Coluna('Cidade', 'cras__cidade__nome'),
+}
+
+COLUNAS_SCFV = {
+    'nome': Coluna('Nome', 'beneficiario__nome_completo'),
+    'projeto': Coluna('Projeto', valor_fixo='SCFV'),
+    'data_nascimento': Coluna('Data Nasc.', 'beneficiario__data_nascimento', data=True),
+    'data_cadastro': Coluna('Data Cadastro', 'data_entrada', data=True),
+    'cpf': Coluna('CPF', 'beneficiario__cpf'),
+    'nis': Coluna('NIS', 'beneficiario__nis'),
+    'nome_mae': Coluna('Nome da Mãe', 'beneficiario__nome_mae'),
+    'situacao_escolar': Coluna('Situação Escolar', 'situacao_escolar'),
+    'publico_prioritario': Coluna('Público Prioritário', 'publico_prioritario'),
+    'beneficio_social': Coluna('Benefício Social', 'beneficio_social'),
+    'cras': Coluna('CRAS', 'beneficiario__cras__nome'),
+    'cidade': Coluna('Cidade', 'beneficiario__cras__cidade__nome'),
+}
+
+REGISTROS = {
+    'cadastro': COLUNAS_CADASTRO,
+    'paif': COLUNAS_PAIF,
+    'beneficiario': COLUNAS_BENEFICIARIO,
+    'scfv': COLUNAS_SCFV,
+}
+
+REGISTRO_DO_MODELO = {
+    FichaPAIF: 'paif',
+    Beneficiario: 'beneficiario',
+    FichaSCFV: 'scfv',
+}
+
+
+class ColunasInvalidas(ValueError):
+    """Colunas pedidas que não existem no relatório."""
+
+    def __init__(self, desconhecidas):
+        self.desconhecidas = desconhecidas
+        super().__init__(f"Colunas desconhecidas: {', '.join(desconhecidas)}")
+
+
+def nome_registro(cadastros):
+    """Registro de colunas do modelo do QuerySet ('cadastro' para os demais iteráveis)."""
+    return REGISTRO_DO_MODELO.get(getattr(cadastros, 'model', None), 'cadastro')
+
+
+def _resolver_atributo(objeto, campo):
+    for nome in campo.split('__'):
+        if objeto is None:
+            return None
+        objeto = getattr(objeto, nome, None)
+    return objeto
+
+
+class Projecao:
+    """Lista de colunas compilada: campos a ler do banco e formatação de cada posição."""
+
+    def __init__(self, registro, chaves):
+        self.chaves = [chave for chave in dict.fromkeys(chaves) if chave in registro]
+        self.colunas = [registro[chave] for chave in self.chaves]
+        self.rotulos = [coluna.rotulo for coluna in self.colunas]
+        self.colunas_data = [indice for indice, coluna in enumerate(self.colunas) if coluna.data]
+
+        # Campos distintos, na ordem da primeira ocorrência; colunas de valor fixo não leem campo
+        self.campos = list(dict.fromkeys(coluna.campo for coluna in self.colunas if coluna.campo))
+        posicoes = {campo: indice for indice, campo in enumerate(self.campos)}
+        self._leitura = [
+            (posicoes.get(coluna.campo), coluna.formatar, coluna.valor_fixo)
+            for coluna in self.colunas
+        ]
+
+    def _tuplas(self, cadastros):
+        if hasattr(cadastros, 'values_list'):
+            if not self.campos:
+                return ((),) * cadastros.count()
+            return cadastros.values_list(*self.campos).iterator(chunk_size=TAMANHO_LOTE_CONSULTA)
+        return (
+            tuple(_resolver_atributo(cadastro, campo) for campo in self.campos)
+            for cadastro in cadastros
+        )
+
+    def linhas(self, cadastros, formatar_datas=True):
+        """
+        Itera os registros como listas de valores na ordem das colunas.
+
+        Com formatar_datas=False as colunas de data mantêm o objeto date
+        (para exportações que gravam datas tipadas, como o Excel).
+        """
+        return self.formatar(self._tuplas(cadastros), formatar_datas)
+
+    def formatar(self, tuplas, formatar_datas=True):
+        """Formata tuplas já lidas com values_list(*self.campos), como em linhas()."""
+        leitura = self._leitura
+        if not formatar_datas:
+            leitura = [
+                (posicao, _sem_formatacao if coluna.data else formatar, fixo)
+                for (posicao, formatar, fixo), coluna in zip(leitura, self.colunas)
+            ]
+        for tupla in tuplas:
+            yield [
+                fixo if posicao is None else formatar(tupla[posicao])
+                for posicao, formatar, fixo in leitura
+            ]
+
+
+@lru_cache(maxsize=256)
+def _compilar(registro, chaves):
+    return Projecao(REGISTROS[registro], chaves)
+
+
+def validar_colunas(cadastros, colunas):
+    """
+    Confere se todas as colunas pedidas existem para o tipo de `cadastros`.
+
+    Raises:
+        ColunasInvalidas: com a lista das colunas desconhecidas
+    """
+    registro = REGISTROS[nome_registro(cadastros)]
+    desconhecidas = [coluna for coluna in dict.fromkeys(colunas) if coluna not in registro]
+    if desconhecidas:
+        raise ColunasInvalidas(desconhecidas)
+    return colunas
+
+
+def compilar_colunas(cadastros, colunas):
+    """
+    Compila as colunas pedidas para o tipo de `cadastros`.
+
+    Colunas desconhecidas para o modelo e repetições são ignoradas (as
+    colunas vindas da requisição são conferidas antes por validar_colunas); a
+    Projecao resultante é reaproveitada entre exportações com as mesmas
+    colunas.
+    """
+    return _compilar(nome_registro(cadastros), tuple(colunas))
@@ -0,0 +1,285 @@
+"""
+Renderização do conteúdo do editor Quill (formato Delta) em PDF e DOCX.
+
+O delta é convertido uma única vez numa sequência de blocos (linhas de
+texto com seus trechos formatados e imagens) que os dois formatos de saída
+percorrem:
+
+- Os estilos de parágrafo do ReportLab são criados uma vez para cada
+  combinação de atributos de linha (alinhamento, cabeçalho) e
+  reaproveitados; a formatação dos trechos (negrito, itálico, sublinhado)
+  vai na marcação do próprio Paragraph.
+- As imagens embutidas (data URIs em base64) são decodificadas uma vez,
+  reduzidas com o Pillow para a resolução de impressão do espaço que vão
+  ocupar e identificadas pelo hash do conteúdo: a mesma imagem repetida no
+  texto é processada e embutida no arquivo uma única vez. Os bytes ficam em
+  memória e são entregues ao ReportLab e ao python-docx como fluxos
+  (BytesIO), sem arquivos temporários.
+"""
+
+import base64
+import binascii
+import hashlib
+import logging
+from io import BytesIO
+from functools import lru_cache
+from xml.sax.saxutils import escape
+
+from PIL import Image as PILImage, UnidentifiedImageError
+from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY, TA_LEFT, TA_RIGHT
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import cm, inch
+
+logger = logging.getLogger(__name__)
+
+# Resolução com que as imagens são gravadas (pontos por polegada impressos)
+DPI_IMAGENS = 150
+QUALIDADE_JPEG = 85
+
+# Espaço máximo (largura, altura em polegadas) ocupado por uma imagem
+CAIXA_IMAGEM_PDF = (4, 3)
+CAIXA_IMAGEM_DOCX = (5, 7)
+
+ALINHAMENTOS_PDF = {
+    'center': TA_CENTER,
+    'right': TA_RIGHT,
+    'justify': TA_JUSTIFY,
+}
+
+
+class ErroImagem(ValueError):
+    pass
+
+
+class Trecho:
+    """Trecho de texto de uma linha com a formatação de caractere."""
+
+    __slots__ = ('texto', 'negrito', 'italico', 'sublinhado')
+
+    def __init__(self, texto, atributos):
+        self.texto = texto
+        self.negrito = bool(atributos.get('bold'))
+        self.italico = bool(atributos.get('italic'))
+        self.sublinhado = bool(atributos.get('underline'))
+
+
+class Linha:
+    """Parágrafo do delta: trechos e atributos de bloco (do '\\n' que o encerra)."""
+
+    __slots__ = ('trechos', 'alinhamento', 'cabecalho')
+
+    def __init__(self, trechos, atributos):
+        self.trechos = trechos
+        self.alinhamento = atributos.get('align')
+        self.cabecalho = atributos.get('header')
+
+
+class ImagemPreparada:
+    """
+    Imagem já decodificada e redimensionada, pronta para ser embutida.
+
+    Args:
+        dados: Bytes da imagem (PNG ou JPEG)
+        largura_px, altura_px: Dimensões em pixels após a redução
+    """
+
+    __slots__ = ('dados', 'largura_px', 'altura_px')
+
+    def __init__(self, dados, largura_px, altura_px):
+        self.dados = dados
+        self.largura_px = largura_px
+        self.altura_px = altura_px
+
+    def fluxo(self):
+        return BytesIO(self.dados)
+
+    def tamanho(self, caixa):
+        """Largura e altura (em polegadas) que cabem na caixa mantendo a proporção."""
+        largura, altura = caixa
+        escala = min(largura / self.largura_px, altura / self.altura_px)
+        return self.largura_px * escala, self.altura_px * escala
+
+
+def _tem_transparencia(imagem):
+    return imagem.mode in ('RGBA', 'LA') or (imagem.mode == 'P' and 'transparency' in imagem.info)
+
+
+def preparar_imagem(dados, caixa, dpi=DPI_IMAGENS):
+    """
+    Decodifica a imagem e a reduz para caber na caixa (polegadas) em `dpi`.
+
+    Imagens que já são pequenas o bastante e estão em PNG/JPEG são mantidas
+    sem recodificação. As demais são gravadas em PNG quando têm
+    transparência e em JPEG caso contrário.
+    """
+    limite = (int(caixa[0] * dpi), int(caixa[1] * dpi))
+    try:
+        imagem = PILImage.open(BytesIO(dados))
+        formato = imagem.format
+        largura, altura = imagem.size
+        if largura <= limite[0] and altura <= limite[1] and formato in ('PNG', 'JPEG'):
+            return ImagemPreparada(dados, largura, altura)
+        # Para JPEG, decodifica já numa escala reduzida (bem mais rápido que abrir inteira)
+        imagem.draft('RGB', limite)
+        imagem.load()
+    except (UnidentifiedImageError, OSError) as e:
+        raise ErroImagem(f'Imagem inválida: {e}')
+
+    imagem.thumbnail(limite, PILImage.LANCZOS)
+    saida = BytesIO()
+    if _tem_transparencia(imagem):
+        imagem.save(saida, 'PNG', optimize=True)
+    else:
+        imagem.convert('RGB').save(saida, 'JPEG', quality=QUALIDADE_JPEG, optimize=True)
+    return ImagemPreparada(saida.getvalue(), imagem.width, imagem.height)
+
+
+class DeltaQuill:
+    """
+    Delta do Quill interpretado em blocos (Linha e ImagemPreparada).
+
+    Args:
+        delta: Dicionário do delta ({'ops': [...]})
+        caixa_imagem: Espaço máximo das imagens, em polegadas
+    """
+
+    def __init__(self, delta, caixa_imagem):
+        self.caixa_imagem = caixa_imagem
+        self._imagens = {}
+        self.blocos = list(self._interpretar(delta.get('ops', [])))
+
+    def imagem(self, uri):
+        """Imagem de um data URI, processada uma vez por conteúdo distinto."""
+        cabecalho, separador, codificada = uri.partition(';base64,')
+        if not separador or not cabecalho.startswith('data:image'):
+            raise ErroImagem('Apenas imagens embutidas em base64 são suportadas')
+        chave = hashlib.sha1(codificada.encode('ascii', 'ignore')).hexdigest()
+        if chave not in self._imagens:
+            try:
+                dados = base64.b64decode(codificada)
+            except (binascii.Error, ValueError) as e:
+                raise ErroImagem(f'Base64 inválido: {e}')
+            self._imagens[chave] = preparar_imagem(dados, self.caixa_imagem)
+        return self._imagens[chave]
+
+    def _interpretar(self, ops):
+        trechos = []
+        depois_de_imagem = False
+        for op in ops:
+            insert = op.get('insert', '')
+            atributos = op.get('attributes') or {}
+
+            if isinstance(insert, dict):
+                if 'image' not in insert:
+                    continue
+                try:
+                    imagem = self.imagem(insert['image'])
+                except ErroImagem as e:
+                    logger.warning('Erro ao processar imagem: %s', e)
+                    continue
+                if trechos:
+                    yield Linha(trechos, {})
+                    trechos = []
+                yield imagem
+                depois_de_imagem = True
+                continue
+
+            if not isinstance(insert, str):
+                continue
+            partes = insert.split('\n')
+            for indice, parte in enumerate(partes):
+                if parte:
+                    trechos.append(Trecho(parte, atributos))
+                if indice < len(partes) - 1:
+                    # Fim de linha: no Quill os atributos de bloco ficam no '\n'
+                    if trechos or not depois_de_imagem:
+                        yield Linha(trechos, atributos)
+                    trechos = []
+                    depois_de_imagem = False
+        if trechos:
+            yield Linha(trechos, {})
+
+
+# PDF (ReportLab)
+
+@lru_cache(maxsize=None)
+def _folha_estilos():
+    return getSampleStyleSheet()
+
+
+@lru_cache(maxsize=64)
+def estilo_paragrafo_pdf(alinhamento=None, cabecalho=None):
+    """Estilo de parágrafo compartilhado para a combinação de atributos de linha."""
+    estilos = _folha_estilos()
+    if cabecalho in (1, 2, 3):
+        base = estilos[f'Heading{cabecalho}']
+        return ParagraphStyle(
+            f'delta_h{cabecalho}_{alinhamento or "left"}', parent=base,
+            alignment=ALINHAMENTOS_PDF.get(alinhamento, TA_LEFT),
+        )
+    return ParagraphStyle(
+        f'delta_{alinhamento or "left"}', parent=estilos['Normal'],
+        fontName='Helvetica', fontSize=12, leading=14,
+        alignment=ALINHAMENTOS_PDF.get(alinhamento, TA_LEFT),
+    )
+
+
+def _marcacao(trecho):
+    texto = escape(trecho.texto)
+    if trecho.negrito:
+        texto = f'<b>{texto}</b>'
+    if trecho.italico:
+        texto = f'<i>{texto}</i>'
+    if trecho.sublinhado:
+        texto = f'<u>{texto}</u>'
+    return texto
+
+
+def renderizar_pdf(delta):
+    """Lista de flowables do ReportLab para o delta."""
+    from reportlab.platypus import Image, Paragraph, Spacer
+
+    elementos = []
+    for bloco in DeltaQuill(delta, CAIXA_IMAGEM_PDF).blocos:
+        if isinstance(bloco, ImagemPreparada):
+            largura, altura = bloco.tamanho(CAIXA_IMAGEM_PDF)
+            elementos.append(Image(bloco.fluxo(), width=largura * inch, height=altura * inch))
+        else:
+            estilo = estilo_paragrafo_pdf(bloco.alinhamento, bloco.cabecalho)
+            elementos.append(Paragraph(''.join(_marcacao(trecho) for trecho in bloco.trechos), estilo))
+        elementos.append(Spacer(1, 0.25 * cm))
+    return elementos
+
+
+# DOCX (python-docx)
+
+def renderizar_docx(doc, delta):
+    """Adiciona o conteúdo do delta ao documento DOCX."""
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.shared import Inches
+
+    alinhamentos = {
+        'center': WD_ALIGN_PARAGRAPH.CENTER,
+        'right': WD_ALIGN_PARAGRAPH.RIGHT,
+        'justify': WD_ALIGN_PARAGRAPH.JUSTIFY,
+    }
+    for bloco in DeltaQuill(delta, CAIXA_IMAGEM_DOCX).blocos:
+        if isinstance(bloco, ImagemPreparada):
+            largura, altura = bloco.tamanho(CAIXA_IMAGEM_DOCX)
+            p = doc.add_paragraph()
+            # O python-docx reaproveita a mesma parte de imagem para bytes idênticos
+            p.add_run().add_picture(bloco.fluxo(), width=Inches(largura), height=Inches(altura))
+            p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+            continue
+
+        if bloco.cabecalho in (1, 2, 3):
+            p = doc.add_heading(level=bloco.cabecalho)
+        else:
+            p = doc.add_paragraph()
+        for trecho in bloco.trechos:
+            run = p.add_run(trecho.texto)
+            run.bold = trecho.negrito
+            run.italic = trecho.italico
+            run.underline = trecho.sublinhado
+        if bloco.alinhamento in alinhamentos:
+            p.alignment = alinhamentos[bloco.alinhamento]
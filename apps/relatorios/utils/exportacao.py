@@ -0,0 +1,80 @@
+"""
+Exportação de relatórios em formatos de dados (CSV e NDJSON) via streaming.
+
+As linhas vêm da projeção de colunas (apps.relatorios.utils.colunas), lida
+do banco em lotes pelo cursor, e são enviadas ao cliente à medida que são
+geradas com StreamingHttpResponse: o download começa imediatamente e a
+memória usada não depende da quantidade de registros.
+"""
+
+import csv
+import json
+from datetime import datetime
+
+from django.http import StreamingHttpResponse
+
+from apps.relatorios.utils.colunas import compilar_colunas
+
+# Linhas agrupadas em cada bloco enviado ao cliente
+LINHAS_POR_BLOCO = 500
+
+
+class _Buffer:
+    """Destino do csv.writer que apenas devolve o texto escrito."""
+
+    def write(self, valor):
+        return valor
+
+
+def gerar_csv(cadastros, colunas):
+    """Gera o CSV (com BOM, para o Excel reconhecer o UTF-8) em blocos de texto."""
+    projecao = compilar_colunas(cadastros, colunas)
+    escritor = csv.writer(_Buffer())
+    yield '\ufeff' + escritor.writerow(projecao.rotulos)
+
+    bloco = []
+    for linha in projecao.linhas(cadastros):
+        bloco.append(escritor.writerow(linha))
+        if len(bloco) == LINHAS_POR_BLOCO:
+            yield ''.join(bloco)
+            bloco = []
+    if bloco:
+        yield ''.join(bloco)
+
+
+def gerar_ndjson(cadastros, colunas):
+    """
+    Gera um objeto JSON por linha, com as chaves das colunas e datas no
+    formato ISO (AAAA-MM-DD).
+    """
+    projecao = compilar_colunas(cadastros, colunas)
+    chaves = projecao.chaves
+    codificar = json.JSONEncoder(ensure_ascii=False, default=str).encode
+
+    bloco = []
+    for linha in projecao.linhas(cadastros, formatar_datas=False):
+        bloco.append(codificar(dict(zip(chaves, linha))) + '\n')
+        if len(bloco) == LINHAS_POR_BLOCO:
+            yield ''.join(bloco)
+            bloco = []
+    if bloco:
+        yield ''.join(bloco)
+
+
+FORMATOS = {
+    'csv': (gerar_csv, 'text/csv; charset=utf-8', 'csv'),
+    'ndjson': (gerar_ndjson, 'application/x-ndjson; charset=utf-8', 'ndjson'),
+}
+
+
+def resposta_streaming(cadastros, colunas, formato, nome_base='relatorio'):
+    """
+    Resposta de download em streaming no formato pedido ('csv' ou 'ndjson').
+    """
+    gerar, tipo_conteudo, extensao = FORMATOS[formato]
+    resposta = StreamingHttpResponse(gerar(cadastros, colunas), content_type=tipo_conteudo)
+    nome = f"{nome_base}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extensao}"
+    resposta['Content-Disposition'] = f'attachment; filename="{nome}"'
+    # Evitar que proxies (nginx) acumulem a resposta antes de enviá-la
+    resposta['X-Accel-Buffering'] = 'no'
+    return resposta
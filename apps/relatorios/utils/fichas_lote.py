@@ -0,0 +1,153 @@
+"""
+Impressão em lote das fichas PAIF (ex.: todas as fichas de um bairro ou CRAS).
+
+As fichas sem PDF no cache em disco (ver cache_documentos) são divididas
+em lotes e geradas em paralelo por um pool de processos, um por núcleo
+disponível; as que não mudaram desde a última geração são aproveitadas
+do cache. Depois os PDFs são juntados, na ordem das fichas, em um único
+PDF (com um marcador por ficha) ou em um ZIP com um PDF por ficha.
+
+O PDF único requer o pacote pypdf.
+"""
+
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.apps import apps
+from django.db import connections
+
+from apps.core.models import FichaPAIF
+from apps.relatorios.utils.cache_documentos import obter_documento
+from apps.relatorios.utils.pdf_generator import caminho_pdf_ficha_paif, nome_pdf_ficha_paif
+
+# Fichas geradas por cada chamada a um processo do pool
+FICHAS_POR_LOTE = 25
+
+FORMATOS_LOTE = {
+    'pdf': ('application/pdf', 'pdf'),
+    'zip': ('application/zip', 'zip'),
+}
+
+
+class ErroLoteFichas(Exception):
+    pass
+
+
+def _iniciar_processo():
+    if not apps.ready:
+        django.setup()
+    # Cada processo abre a própria conexão com o banco na primeira consulta
+    connections.close_all()
+
+
+def _gerar_fichas(ids):
+    try:
+        for ficha in FichaPAIF.objects.filter(pk__in=ids).select_related('cras'):
+            caminho_pdf_ficha_paif(ficha)
+        return len(ids)
+    finally:
+        connections.close_all()
+
+
+def gerar_pdfs_pendentes(ids, processos=None, progresso=None):
+    """
+    Gera no cache o PDF das fichas indicadas.
+
+    Usa um pool de `processos` processos (padrão: os núcleos disponíveis);
+    com um único lote, ou dentro de um processo que não pode ter filhos
+    (trabalhadores de multiprocessing.Pool), gera no próprio processo.
+
+    Args:
+        ids: ids das fichas a gerar
+        processos: Quantidade máxima de processos (limitada aos núcleos disponíveis)
+        progresso: Função opcional chamada com (geradas, total)
+    """
+    lotes = [ids[inicio:inicio + FICHAS_POR_LOTE] for inicio in range(0, len(ids), FICHAS_POR_LOTE)]
+    # O valor pedido (parâmetro da tarefa) nunca passa dos núcleos disponíveis
+    nucleos = os.cpu_count() or 1
+    processos = min(int(processos or nucleos), nucleos, len(lotes))
+    geradas = 0
+
+    if processos <= 1 or multiprocessing.current_process().daemon:
+        for lote in lotes:
+            for ficha in FichaPAIF.objects.filter(pk__in=lote).select_related('cras'):
+                caminho_pdf_ficha_paif(ficha)
+            geradas += len(lote)
+            if progresso:
+                progresso(geradas, len(ids))
+        return geradas
+
+    # Conexões abertas não podem ser herdadas pelos processos filhos
+    connections.close_all()
+    with ProcessPoolExecutor(processos, initializer=_iniciar_processo) as executor:
+        for quantidade in executor.map(_gerar_fichas, lotes):
+            geradas += quantidade
+            if progresso:
+                progresso(geradas, len(ids))
+    return geradas
+
+
+def _caminho(pk, nome):
+    # Se o PDF saiu do cache (limite de tamanho) depois de gerado, gera outra vez
+    caminho = obter_documento(nome)
+    if caminho is None:
+        caminho = caminho_pdf_ficha_paif(FichaPAIF.objects.select_related('cras').get(pk=pk))
+    return caminho
+
+
+def _nome_arquivo(numero_paif, pk, usados):
+    base = f"PAIF_{(numero_paif or str(pk)).replace('/', '-')}"
+    nome = f'{base}.pdf' if base not in usados else f'{base}_{pk}.pdf'
+    usados.add(base)
+    return nome
+
+
+def gerar_lote_fichas_paif(fichas, destino, formato='pdf', processos=None, progresso=None):
+    """
+    Grava em `destino` (arquivo binário aberto para escrita) os PDFs das fichas.
+
+    Args:
+        fichas: QuerySet de FichaPAIF (a ordem do QuerySet é a ordem de impressão)
+        formato: 'pdf' (um único PDF) ou 'zip' (um PDF por ficha)
+        processos: Processos usados na geração (padrão: os núcleos disponíveis)
+        progresso: Função opcional chamada com (geradas, total) durante a geração
+
+    Returns:
+        Dicionário com o total de fichas e quantas foram geradas (as demais
+        vieram do cache)
+    """
+    if formato not in FORMATOS_LOTE:
+        raise ErroLoteFichas(f'Formato inválido: {formato}')
+    if formato == 'pdf':
+        try:
+            from pypdf import PdfWriter
+        except ImportError:
+            raise ErroLoteFichas('O pacote pypdf é necessário para juntar as fichas em um PDF (pip install pypdf).')
+
+    if not fichas.ordered:
+        fichas = fichas.order_by('numero_paif', 'pk')
+    registros = [
+        (pk, numero_paif, nome_pdf_ficha_paif(pk, data_atualizacao))
+        for pk, numero_paif, data_atualizacao in fichas.values_list('pk', 'numero_paif', 'data_atualizacao')
+    ]
+    # obter_documento também marca o uso, protegendo os PDFs da limpeza do cache
+    pendentes = [pk for pk, _, nome in registros if obter_documento(nome) is None]
+    if pendentes:
+        gerar_pdfs_pendentes(pendentes, processos, progresso)
+
+    if formato == 'zip':
+        usados = set()
+        with zipfile.ZipFile(destino, 'w', compression=zipfile.ZIP_STORED) as pacote:
+            for pk, numero_paif, nome in registros:
+                pacote.write(_caminho(pk, nome), _nome_arquivo(numero_paif, pk, usados))
+    else:
+        escritor = PdfWriter()
+        for pk, numero_paif, nome in registros:
+            escritor.append(_caminho(pk, nome), outline_item=f'PAIF {numero_paif or pk}')
+        escritor.write(destino)
+        escritor.close()
+
+    return {'fichas': len(registros), 'geradas': len(pendentes)}
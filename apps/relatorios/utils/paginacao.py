@@ -0,0 +1,137 @@
+"""
+Paginação por chave (keyset) e contagem aproximada para as APIs de relatórios.
+
+As páginas são pedidas com um cursor que guarda o valor da coluna de
+ordenação e o id do último registro entregue; a página seguinte é
+"registros depois deste", resolvida pelo banco com um filtro e LIMIT, sem
+OFFSET. Buscar a página 2000 custa o mesmo que a primeira.
+
+A ordenação é sempre (coluna, id) com os valores nulos por último, nos dois
+sentidos, para que a chave seja única e o cursor não pule nem repita
+registros.
+
+Para não contar todas as linhas em cada consulta, contar_registros conta no
+máximo LIMITE_CONTAGEM_EXATA linhas; acima disso usa a estimativa do
+planejador do banco (PostgreSQL) ou, nos demais bancos, a contagem completa.
+"""
+
+import json
+
+from django.db import connections
+from django.db.models import F, Q
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+# Até esta quantidade o total é exato
+LIMITE_CONTAGEM_EXATA = 10000
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+class Ordenacao:
+    """
+    Ordenação por um campo do banco (ou apenas pelo id, com campo=None).
+
+    Args:
+        chave: Nome da coluna pedido pelo cliente ('nome', '-data_cadastro')
+        campo: Caminho do campo no ORM ('nome_referencia', 'cras__nome')
+        decrescente: Sentido da ordenação
+    """
+
+    def __init__(self, chave, campo, decrescente=False):
+        self.chave = chave
+        self.campo = campo
+        self.decrescente = decrescente
+
+    def ordenar(self, queryset):
+        id_ordem = '-pk' if self.decrescente else 'pk'
+        if self.campo is None:
+            return queryset.order_by(id_ordem)
+        expressao = F(self.campo).desc(nulls_last=True) if self.decrescente else F(self.campo).asc(nulls_last=True)
+        return queryset.order_by(expressao, id_ordem)
+
+    def depois_de(self, queryset, valor, pk):
+        """Registros posteriores à chave (valor, pk) na ordem."""
+        depois = 'lt' if self.decrescente else 'gt'
+        if self.campo is None:
+            return queryset.filter(**{f'pk__{depois}': pk})
+        if valor is None:
+            # Nulos ficam no fim: depois de um nulo só vêm nulos com id posterior
+            return queryset.filter(**{f'{self.campo}__isnull': True, f'pk__{depois}': pk})
+        return queryset.filter(
+            Q(**{f'{self.campo}__{depois}': valor})
+            | Q(**{self.campo: valor, f'pk__{depois}': pk})
+            | Q(**{f'{self.campo}__isnull': True})
+        )
+
+
+def codificar_cursor(ordenacao, valor, pk):
+    if hasattr(valor, 'isoformat'):
+        valor = valor.isoformat()
+    chave = [ordenacao.chave, valor, pk]
+    return urlsafe_base64_encode(json.dumps(chave, separators=(',', ':')).encode('utf-8'))
+
+
+def decodificar_cursor(ordenacao, cursor):
+    """Retorna (valor, pk) do cursor; o cursor precisa ser da mesma ordenação."""
+    try:
+        chave, valor, pk = json.loads(urlsafe_base64_decode(cursor))
+        pk = int(pk)
+    except (TypeError, ValueError):
+        raise CursorInvalido('Cursor inválido')
+    if chave != ordenacao.chave:
+        raise CursorInvalido('O cursor pertence a outra ordenação')
+    return valor, pk
+
+
+def paginar(queryset, ordenacao, campos, limite, cursor=None):
+    """
+    Uma página do QuerySet.
+
+    Args:
+        campos: Campos lidos de cada registro (values_list)
+        limite: Registros por página
+        cursor: Valor de `proximo` da página anterior
+
+    Returns:
+        (tuplas com os `campos`, cursor da próxima página ou None)
+    """
+    queryset = ordenacao.ordenar(queryset)
+    if cursor:
+        queryset = ordenacao.depois_de(queryset, *decodificar_cursor(ordenacao, cursor))
+
+    extras = [ordenacao.campo or 'pk', 'pk']
+    registros = list(queryset.values_list(*campos, *extras)[:limite + 1])
+    proximo = None
+    if len(registros) > limite:
+        registros = registros[:limite]
+        proximo = codificar_cursor(ordenacao, *registros[-1][-2:])
+    return [registro[:len(campos)] for registro in registros], proximo
+
+
+def _estimativa_postgresql(queryset):
+    sql, parametros = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', parametros)
+        plano = cursor.fetchone()[0]
+    if isinstance(plano, str):
+        plano = json.loads(plano)
+    return int(plano[0]['Plan']['Plan Rows'])
+
+
+def contar_registros(queryset, limite_exato=LIMITE_CONTAGEM_EXATA):
+    """
+    Total de registros do QuerySet.
+
+    Returns:
+        (total, aproximado): aproximado=True quando o total é a estimativa
+        do planejador do banco
+    """
+    queryset = queryset.order_by()
+    parcial = queryset[:limite_exato + 1].count()
+    if parcial <= limite_exato:
+        return parcial, False
+    if connections[queryset.db].vendor == 'postgresql':
+        return max(_estimativa_postgresql(queryset), parcial), True
+    return queryset.count(), False
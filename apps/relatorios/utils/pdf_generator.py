@@ -5,16 +5,24 @@ Módulo para gerar arquivos PDF para relatórios e documentos instrumentais.
 import os
 import tempfile
 from datetime import datetime
+from functools import lru_cache
 from io import BytesIO
 import base64
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import cm, mm, inch
+from reportlab.pdfbase.pdfmetrics import stringWidth
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak, Image
 from reportlab.pdfgen import canvas
 from PIL import Image as PILImage
+from django.utils import timezone
 from apps.core.models import CRAS
+from apps.relatorios.utils.cache_documentos import abrir_documento, documento_em_cache, nome_documento
+from apps.relatorios.utils.cache_logos import desenhar_logos_relatorio, logo_flowable
+from apps.relatorios.utils.colunas import compilar_colunas
+from apps.relatorios.utils.delta_quill import renderizar_docx, renderizar_pdf
+from apps.relatorios.utils.tabela_docx import preencher_tabela_docx
 # Importe Cadastro e Usuario se existirem, ou ajuste conforme necessário:
 # from apps.core.models import Cadastro
 # from apps.auth_app.models import Usuario
@@ -42,14 +50,40 @@ MARGIN_RIGHT = 2.0 * cm
 MARGIN_TOP = 3.0 * cm
 MARGIN_BOTTOM = 2.5 * cm
 
-def gerar_pdf_relatorio_formularios(cadastros, colunas, titulo=None):
+# Topo dos logos dos relatórios (ver desenhar_logos_relatorio), dentro da margem superior
+TOPO_LOGOS = PAGE_HEIGHT - 0.8 * cm
+
+
+def _desenhar_logos(pdf, doc=None):
+    desenhar_logos_relatorio(pdf, PAGE_WIDTH - MARGIN_RIGHT, TOPO_LOGOS)
+
+
+# Relatórios com mais registros que isso usam o modo streaming
+LIMITE_RELATORIO_TABELA_UNICA = 1000
+
+# Acima disso a exportação em PDF vai para a fila de tarefas, onde as
+# páginas são divididas entre processos (ver pdf_paralelo)
+LIMITE_RELATORIO_PARALELO = 20000
+
+def gerar_pdf_relatorio_formularios(cadastros, colunas, titulo=None, streaming=None):
     """
     Gera um relatório PDF a partir dos cadastros filtrados.
+
+    Com streaming=None o modo é escolhido pelo tamanho do relatório: acima
+    de LIMITE_RELATORIO_TABELA_UNICA registros a geração é feita página a
+    página por gerar_pdf_relatorio_formularios_streaming. A divisão entre
+    processos (ver apps.relatorios.utils.pdf_paralelo) é feita apenas pelos
+    trabalhadores da fila de tarefas, nunca dentro de uma requisição.
     """
-    # Criar um arquivo temporário para o PDF
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-    arquivo_pdf = temp_file.name
-    temp_file.close()
+    total = None
+    if streaming is None:
+        total = _contar_registros(cadastros)
+        streaming = total is None or total > LIMITE_RELATORIO_TABELA_UNICA
+    if streaming:
+        return gerar_pdf_relatorio_formularios_streaming(cadastros, colunas, titulo)
+
+    # Arquivo de saída em memória (vai para disco apenas se ficar grande)
+    arquivo_pdf = novo_arquivo_saida()
     
     # Configurar o documento
     doc = SimpleDocTemplate(
@@ -78,59 +112,15 @@ def gerar_pdf_relatorio_formularios(cadastros, colunas, titulo=None):
     elementos.append(Paragraph(titulo_texto, titulo_style))
     elementos.append(Spacer(1, 0.5 * cm))
     
+    # Cabeçalho e linhas da tabela (ver apps.relatorios.utils.colunas)
+    projecao = compilar_colunas(cadastros, colunas)
+    dados_tabela = [projecao.rotulos]
+    dados_tabela.extend(projecao.linhas(cadastros))
+    
     # Adicionar informações do relatório
     elementos.append(Paragraph(f"Data de geração: {datetime.now().strftime('%d/%m/%Y %H:%M')}", normal_style))
-    elementos.append(Paragraph(f"Total de registros: {len(cadastros)}", normal_style))
+    elementos.append(Paragraph(f"Total de registros: {len(dados_tabela) - 1}", normal_style))
     elementos.append(Spacer(1, 1 * cm))
-    
-    # Preparar cabeçalho da tabela
-    cabecalho = []
-    colunas_unicas = list(set(colunas))  # Garantir que as colunas não se repitam
-    for coluna in colunas_unicas:
-        if coluna == 'nome':
-            cabecalho.append('Nome')
-        elif coluna == 'projeto':
-            cabecalho.append('Projeto')
-        elif coluna == 'data_nascimento':
-            cabecalho.append('Data Nasc.')
-        elif coluna == 'data_cadastro':
-            cabecalho.append('Data Cadastro')
-        elif coluna == 'cras':
-            cabecalho.append('CRAS')
-        elif coluna == 'cidade':
-            cabecalho.append('Cidade')
-        elif coluna == 'bairro':
-            cabecalho.append('Bairro')
-        elif coluna == 'contato':
-            cabecalho.append('Contato')
-        elif coluna == 'nome_mae':
-            cabecalho.append('Nome da Mãe')
-    
-    # Preparar dados da tabela
-    dados_tabela = [cabecalho]
-    for cadastro in cadastros:
-        linha = []
-        for coluna in colunas_unicas:  # Usar colunas únicas
-            if coluna == 'nome':
-                linha.append(cadastro.nome or '')
-            elif coluna == 'projeto':
-                linha.append(cadastro.projeto or '')
-            elif coluna == 'data_nascimento':
-                linha.append(cadastro.data_nascimento.strftime('%d/%m/%Y') if cadastro.data_nascimento else '')
-            elif coluna == 'data_cadastro':
-                linha.append(cadastro.data_cadastro.strftime('%d/%m/%Y') if cadastro.data_cadastro else '')
-            elif coluna == 'cras':
-                linha.append(cadastro.cras.nome if cadastro.cras else '')
-            elif coluna == 'cidade':
-                linha.append(cadastro.cidade or '')
-            elif coluna == 'bairro':
-                linha.append(cadastro.bairro or '')
-            elif coluna == 'contato':
-                linha.append(cadastro.contato or '')
-            elif coluna == 'nome_mae':
-                linha.append(cadastro.nome_mae or '')
-        dados_tabela.append(linha)
-    
     # Criar tabela
     tabela = Table(dados_tabela, repeatRows=1)
     
@@ -157,12 +147,140 @@ def gerar_pdf_relatorio_formularios(cadastros, colunas, titulo=None):
     elementos.append(Spacer(1, 1 * cm))
     elementos.append(Paragraph("Relatório gerado pelo Sistema CRAS360 - © 2025", normal_style))
     
-    # Gerar o documento
-    doc.build(elementos)
+    # Gerar o documento (logos no topo de cada página)
+    doc.build(elementos, onFirstPage=_desenhar_logos, onLaterPages=_desenhar_logos)
     
     # Retornar o arquivo para download
     download_name = f"relatorio_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"  # ou .docx/.xlsx conforme o caso
-    return django_send_file(arquivo_pdf, download_name, 'application/pdf')
+    return django_send_buffer(arquivo_pdf, download_name, 'application/pdf')
+
+# Relatório em modo streaming (volumes grandes)
+
+LINHAS_POR_PAGINA = 36
+ALTURA_LINHA_TABELA = 0.55 * cm
+TAMANHO_FONTE_TABELA = 8
+
+
+def _contar_registros(cadastros):
+    """Total de registros (COUNT no banco para QuerySets); None para iteradores."""
+    if hasattr(cadastros, 'iterator'):
+        return cadastros.count()
+    try:
+        return len(cadastros)
+    except TypeError:
+        return None
+
+
+@lru_cache(maxsize=4096)
+def _ajustar_texto(texto, largura, fonte='Helvetica', tamanho=TAMANHO_FONTE_TABELA):
+    """Corta o texto com reticências para caber na largura (altura de linha fixa)."""
+    largura_texto = stringWidth(texto, fonte, tamanho)
+    if largura_texto <= largura:
+        return texto
+    # Corte proporcional estimado, seguido de ajuste fino caractere a caractere
+    texto = texto[:int(len(texto) * largura / largura_texto)]
+    while texto and stringWidth(texto + '…', fonte, tamanho) > largura:
+        texto = texto[:-1]
+    return texto + '…'
+
+
+def escrever_pdf_relatorio_streaming(cadastros, colunas, destino, titulo=None, linhas_por_pagina=LINHAS_POR_PAGINA,
+                                     primeira_pagina=1, total=None, agora=None):
+    """
+    Escreve o relatório de cadastros em `destino` página a página.
+
+    Os registros são lidos pela projeção de colunas (values_list com
+    cursor no banco, quando for um QuerySet) e cada página recebe uma
+    tabela própria com no máximo `linhas_por_pagina` linhas de altura fixa,
+    desenhada diretamente no canvas. Assim não há uma tabela única com todos os registros para o
+    ReportLab dividir. O ReportLab ainda mantém em memória as páginas já
+    desenhadas (comprimidas) até a gravação; os relatórios muito grandes
+    são gerados em partes (ver pdf_paralelo).
+
+    Args:
+        cadastros: QuerySet ou iterável de cadastros
+        colunas: Lista de colunas a exibir (chaves de apps.relatorios.utils.colunas)
+        destino: Caminho ou arquivo binário aberto para escrita (ex.: novo_arquivo_saida())
+        titulo: Título do relatório
+        linhas_por_pagina: Linhas da tabela em cada página
+        primeira_pagina, total, agora: Número da primeira página, total de
+            registros e data de geração, quando o relatório é gerado em
+            partes (ver apps.relatorios.utils.pdf_paralelo)
+    """
+    projecao = compilar_colunas(cadastros, colunas)
+    agora = agora or datetime.now()
+    if total is None:
+        total = _contar_registros(cadastros)
+    titulo_texto = titulo or f"Relatório de Cadastros - {agora.strftime('%d/%m/%Y')}"
+
+    largura_util = PAGE_WIDTH - MARGIN_LEFT - MARGIN_RIGHT
+    largura_coluna = largura_util / max(len(projecao.colunas), 1)
+    largura_texto = largura_coluna - 6  # descontar o padding das células
+    cabecalho = projecao.rotulos
+
+    estilo_tabela = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), TAMANHO_FONTE_TABELA),
+        ('TOPPADDING', (0, 0), (-1, -1), 1),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 1),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ])
+
+    pdf = canvas.Canvas(destino, pagesize=A4, pageCompression=1)
+    pdf.setTitle(titulo_texto)
+
+    def desenhar_pagina(linhas, numero_pagina):
+        _desenhar_logos(pdf)
+        topo = PAGE_HEIGHT - MARGIN_TOP
+        pdf.setFont('Helvetica-Bold', 14)
+        pdf.drawString(MARGIN_LEFT, topo, titulo_texto)
+        pdf.setFont('Helvetica', 9)
+        informacoes = f"Data de geração: {agora.strftime('%d/%m/%Y %H:%M')}"
+        if total is not None:
+            informacoes += f"    Total de registros: {total}"
+        pdf.drawString(MARGIN_LEFT, topo - 0.6 * cm, informacoes)
+
+        tabela = Table([cabecalho] + linhas, colWidths=[largura_coluna] * len(projecao.colunas),
+                       rowHeights=ALTURA_LINHA_TABELA)
+        tabela.setStyle(estilo_tabela)
+        _, altura = tabela.wrapOn(pdf, largura_util, PAGE_HEIGHT)
+        tabela.drawOn(pdf, MARGIN_LEFT, topo - 1.2 * cm - altura)
+
+        pdf.setFont('Helvetica', 8)
+        pdf.drawString(MARGIN_LEFT, MARGIN_BOTTOM - 1 * cm, "Relatório gerado pelo Sistema CRAS360 - © 2025")
+        pdf.drawRightString(PAGE_WIDTH - MARGIN_RIGHT, MARGIN_BOTTOM - 1 * cm, f"Página {numero_pagina}")
+        pdf.showPage()
+
+    linhas = []
+    numero_pagina = primeira_pagina - 1
+    for linha in projecao.linhas(cadastros):
+        linhas.append([_ajustar_texto(valor, largura_texto) for valor in linha])
+        if len(linhas) == linhas_por_pagina:
+            numero_pagina += 1
+            desenhar_pagina(linhas, numero_pagina)
+            linhas = []
+    if linhas or numero_pagina < primeira_pagina:
+        desenhar_pagina(linhas, numero_pagina + 1)
+
+    pdf.save()
+
+
+def gerar_pdf_relatorio_formularios_streaming(cadastros, colunas, titulo=None):
+    """
+    Gera o relatório de cadastros página a página (ver
+    escrever_pdf_relatorio_streaming) em um arquivo de novo_arquivo_saida(),
+    que passa para o disco quando fica grande, e o envia em blocos.
+    """
+    arquivo_pdf = novo_arquivo_saida()
+    escrever_pdf_relatorio_streaming(cadastros, colunas, arquivo_pdf, titulo)
+    download_name = f"relatorio_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+    return django_send_buffer(arquivo_pdf, download_name, 'application/pdf')
+
 
 def gerar_pdf_instrumental(titulo, conteudo=None):
     """
@@ -175,10 +293,8 @@ def gerar_pdf_instrumental(titulo, conteudo=None):
     Returns:
         Response com o arquivo PDF para download
     """
-    # Criar um arquivo temporário para o PDF
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-    arquivo_pdf = temp_file.name
-    temp_file.close()
+    # Arquivo de saída em memória (vai para disco apenas se ficar grande)
+    arquivo_pdf = novo_arquivo_saida()
     
     # Configurar o documento
     doc = SimpleDocTemplate(
@@ -228,7 +344,7 @@ def gerar_pdf_instrumental(titulo, conteudo=None):
     
     # Retornar o arquivo para download
     download_name = f"relatorio_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
-    return django_send_file(arquivo_pdf, download_name, 'application/vnd.openxmlformats-officedocument.wordprocessingml.document')
+    return django_send_buffer(arquivo_pdf, download_name, 'application/vnd.openxmlformats-officedocument.wordprocessingml.document')
 
 
 def gerar_pdf_relatorio_com_template(cadastros, colunas, template_id, titulo=None):
@@ -251,10 +367,8 @@ def gerar_pdf_relatorio_com_template(cadastros, colunas, template_id, titulo=Non
     if not template:
         return gerar_pdf_relatorio_formularios(cadastros, colunas, titulo)
     
-    # Criar um arquivo temporário para o PDF
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-    arquivo_pdf = temp_file.name
-    temp_file.close()
+    # Arquivo de saída em memória (vai para disco apenas se ficar grande)
+    arquivo_pdf = novo_arquivo_saida()
     
     # Configurar o documento com as margens do template
     doc = SimpleDocTemplate(
@@ -294,12 +408,10 @@ def gerar_pdf_relatorio_com_template(cadastros, colunas, template_id, titulo=Non
         logos = []
         widths = []
         
-        # Adicionar logos disponíveis
+        # Adicionar logos disponíveis (já reduzidos, do cache em memória)
         for logo_path in [template.logo1_path, template.logo2_path, template.logo3_path]:
-            if logo_path and os.path.exists(logo_path):
-                img = Image(logo_path)
-                img.drawHeight = 0.8 * inch
-                img.drawWidth = 0.8 * inch
+            img = logo_flowable(logo_path) if logo_path else None
+            if img:
                 logos.append(img)
                 widths.append(2 * inch)
         
@@ -322,59 +434,15 @@ def gerar_pdf_relatorio_com_template(cadastros, colunas, template_id, titulo=Non
         elementos.append(Paragraph(template.cabecalho, normal_style))
         elementos.append(Spacer(1, 0.5 * cm))
     
+    # Tabela de dados (similar à função gerar_pdf_relatorio_formularios)
+    projecao = compilar_colunas(cadastros, colunas)
+    dados_tabela = [projecao.rotulos]
+    dados_tabela.extend(projecao.linhas(cadastros))
+    
     # Adicionar informações do relatório
     elementos.append(Paragraph(f"Data de geração: {datetime.now().strftime('%d/%m/%Y %H:%M')}", normal_style))
-    elementos.append(Paragraph(f"Total de registros: {len(cadastros)}", normal_style))
+    elementos.append(Paragraph(f"Total de registros: {len(dados_tabela) - 1}", normal_style))
     elementos.append(Spacer(1, 0.5 * cm))
-    
-    # Tabela de dados (similar à função gerar_pdf_relatorio_formularios)
-    cabecalho = []
-    colunas_unicas = list(set(colunas))  # Garantir que as colunas não se repitam
-    for coluna in colunas_unicas:
-        if coluna == 'nome':
-            cabecalho.append('Nome')
-        elif coluna == 'projeto':
-            cabecalho.append('Projeto')
-        elif coluna == 'data_nascimento':
-            cabecalho.append('Data Nasc.')
-        elif coluna == 'data_cadastro':
-            cabecalho.append('Data Cadastro')
-        elif coluna == 'cras':
-            cabecalho.append('CRAS')
-        elif coluna == 'cidade':
-            cabecalho.append('Cidade')
-        elif coluna == 'bairro':
-            cabecalho.append('Bairro')
-        elif coluna == 'contato':
-            cabecalho.append('Contato')
-        elif coluna == 'nome_mae':
-            cabecalho.append('Nome da Mãe')
-    
-    # Preparar dados da tabela
-    dados_tabela = [cabecalho]
-    for cadastro in cadastros:
-        linha = []
-        for coluna in colunas_unicas:  # Usar colunas únicas
-            if coluna == 'nome':
-                linha.append(cadastro.nome or '')
-            elif coluna == 'projeto':
-                linha.append(cadastro.projeto or '')
-            elif coluna == 'data_nascimento':
-                linha.append(cadastro.data_nascimento.strftime('%d/%m/%Y') if cadastro.data_nascimento else '')
-            elif coluna == 'data_cadastro':
-                linha.append(cadastro.data_cadastro.strftime('%d/%m/%Y') if cadastro.data_cadastro else '')
-            elif coluna == 'cras':
-                linha.append(cadastro.cras.nome if cadastro.cras else '')
-            elif coluna == 'cidade':
-                linha.append(cadastro.cidade or '')
-            elif coluna == 'bairro':
-                linha.append(cadastro.bairro or '')
-            elif coluna == 'contato':
-                linha.append(cadastro.contato or '')
-            elif coluna == 'nome_mae':
-                linha.append(cadastro.nome_mae or '')
-        dados_tabela.append(linha)
-    
     # Criar tabela
     tabela = Table(dados_tabela, repeatRows=1)
     
@@ -407,7 +475,7 @@ def gerar_pdf_relatorio_com_template(cadastros, colunas, template_id, titulo=Non
     
     # Retornar o arquivo para download
     download_name = f"relatorio_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
-    return django_send_file(arquivo_pdf, download_name, 'application/vnd.openxmlformats-officedocument.wordprocessingml.document')
+    return django_send_buffer(arquivo_pdf, download_name, 'application/vnd.openxmlformats-officedocument.wordprocessingml.document')
 
 def gerar_doc_relatorio_formularios(cadastros, colunas, titulo=None):
     """
@@ -425,10 +493,8 @@ def gerar_doc_relatorio_formularios(cadastros, colunas, titulo=None):
     from docx.shared import Pt, Cm, RGBColor
     from docx.enum.text import WD_ALIGN_PARAGRAPH
     
-    # Criar um arquivo temporário para o DOCX
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.docx')
-    arquivo_docx = temp_file.name
-    temp_file.close()
+    # Arquivo de saída em memória (vai para disco apenas se ficar grande)
+    arquivo_docx = novo_arquivo_saida()
     
     # Criar documento
     doc = Document()
@@ -447,34 +513,19 @@ def gerar_doc_relatorio_formularios(cadastros, colunas, titulo=None):
     
     # Adicionar informações do relatório
     p = doc.add_paragraph(f"Data de geração: {datetime.now().strftime('%d/%m/%Y %H:%M')}")
-    p = doc.add_paragraph(f"Total de registros: {len(cadastros)}")
+    total = _contar_registros(cadastros)
+    if total is not None:
+        p = doc.add_paragraph(f"Total de registros: {total}")
     doc.add_paragraph()  # Linha em branco
     
-    # Criar tabela
-    table = doc.add_table(rows=1, cols=len(colunas), style='Table Grid')
+    # Criar tabela (colunas e linhas vindas de apps.relatorios.utils.colunas)
+    projecao = compilar_colunas(cadastros, colunas)
+    table = doc.add_table(rows=1, cols=len(projecao.colunas), style='Table Grid')
     
     # Configurar cabeçalho da tabela
     header_cells = table.rows[0].cells
-    colunas_unicas = list(set(colunas))  # Garantir que as colunas não se repitam
-    for i, coluna in enumerate(colunas_unicas):
-        if coluna == 'nome':
-            header_cells[i].text = 'Nome'
-        elif coluna == 'projeto':
-            header_cells[i].text = 'Projeto'
-        elif coluna == 'data_nascimento':
-            header_cells[i].text = 'Data Nasc.'
-        elif coluna == 'data_cadastro':
-            header_cells[i].text = 'Data Cadastro'
-        elif coluna == 'cras':
-            header_cells[i].text = 'CRAS'
-        elif coluna == 'cidade':
-            header_cells[i].text = 'Cidade'
-        elif coluna == 'bairro':
-            header_cells[i].text = 'Bairro'
-        elif coluna == 'contato':
-            header_cells[i].text = 'Contato'
-        elif coluna == 'nome_mae':
-            header_cells[i].text = 'Nome da Mãe'
+    for i, rotulo in enumerate(projecao.rotulos):
+        header_cells[i].text = rotulo
     
     # Formatar cabeçalho
     for cell in header_cells:
@@ -482,28 +533,8 @@ def gerar_doc_relatorio_formularios(cadastros, colunas, titulo=None):
             for run in paragraph.runs:
                 run.bold = True
     
-    # Adicionar dados
-    for cadastro in cadastros:
-        row_cells = table.add_row().cells
-        for i, coluna in enumerate(colunas_unicas):
-            if coluna == 'nome':
-                row_cells[i].text = cadastro.nome or ''
-            elif coluna == 'projeto':
-                row_cells[i].text = cadastro.projeto or ''
-            elif coluna == 'data_nascimento':
-                row_cells[i].text = cadastro.data_nascimento.strftime('%d/%m/%Y') if cadastro.data_nascimento else ''
-            elif coluna == 'data_cadastro':
-                row_cells[i].text = cadastro.data_cadastro.strftime('%d/%m/%Y') if cadastro.data_cadastro else ''
-            elif coluna == 'cras':
-                row_cells[i].text = cadastro.cras.nome if cadastro.cras else ''
-            elif coluna == 'cidade':
-                row_cells[i].text = cadastro.cidade or ''
-            elif coluna == 'bairro':
-                row_cells[i].text = cadastro.bairro or ''
-            elif coluna == 'contato':
-                row_cells[i].text = cadastro.contato or ''
-            elif coluna == 'nome_mae':
-                row_cells[i].text = cadastro.nome_mae or ''
+    # Adicionar dados (XML das linhas montado em blocos, ver apps.relatorios.utils.tabela_docx)
+    preencher_tabela_docx(table, projecao.linhas(cadastros))
     
     # Adicionar rodapé
     doc.add_paragraph()  # Linha em branco
@@ -514,7 +545,7 @@ def gerar_doc_relatorio_formularios(cadastros, colunas, titulo=None):
     doc.save(arquivo_docx)
     
     download_name = f"relatorio_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
-    return django_send_file(arquivo_docx, download_name, 'application/vnd.openxmlformats-officedocument.wordprocessingml.document')
+    return django_send_buffer(arquivo_docx, download_name, 'application/vnd.openxmlformats-officedocument.wordprocessingml.document')
 
 def gerar_doc_instrumental(titulo, conteudo=None):
     """
@@ -531,10 +562,8 @@ def gerar_doc_instrumental(titulo, conteudo=None):
     from docx.shared import Pt, Cm
     from docx.enum.text import WD_ALIGN_PARAGRAPH
     
-    # Criar um arquivo temporário para o DOCX
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.docx')
-    arquivo_docx = temp_file.name
-    temp_file.close()
+    # Arquivo de saída em memória (vai para disco apenas se ficar grande)
+    arquivo_docx = novo_arquivo_saida()
     
     # Criar documento
     doc = Document()
@@ -574,7 +603,7 @@ def gerar_doc_instrumental(titulo, conteudo=None):
     
     # Retornar o arquivo para download
     download_name = f"relatorio_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
-    return django_send_file(arquivo_docx, download_name, 'application/vnd.openxmlformats-officedocument.wordprocessingml.document')
+    return django_send_buffer(arquivo_docx, download_name, 'application/vnd.openxmlformats-officedocument.wordprocessingml.document')
 
 def gerar_doc_relatorio_com_template(cadastros, colunas, template_id, titulo=None):
     """
@@ -593,62 +622,81 @@ def gerar_doc_relatorio_com_template(cadastros, colunas, template_id, titulo=Non
     # Para simplificar, vamos chamar a função padrão por enquanto
     return gerar_doc_relatorio_formularios(cadastros, colunas, titulo)
 
+# Formato das células de data nas planilhas exportadas
+FORMATO_DATA_EXCEL = 'DD/MM/YYYY'
+LARGURA_COLUNA_EXCEL = 22
+
+
+def escrever_excel_relatorio(cadastros, colunas, destino):
+    """
+    Escreve o relatório de cadastros em `destino` como planilha .xlsx.
+
+    Usa uma planilha write_only do openpyxl: cada linha é serializada assim
+    que é adicionada, a partir da projeção de colunas (values_list com
+    cursor no banco), sem montar lista de dicionários nem DataFrame. Datas são gravadas como datas do Excel
+    (formato FORMATO_DATA_EXCEL), não como texto.
+
+    Args:
+        cadastros: QuerySet ou iterável de cadastros
+        colunas: Lista de colunas a exibir (chaves de apps.relatorios.utils.colunas)
+        destino: Caminho ou arquivo aberto para escrita binária
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+    from openpyxl.utils import get_column_letter
+
+    projecao = compilar_colunas(cadastros, colunas)
+
+    planilha = Workbook(write_only=True)
+    aba = planilha.create_sheet('Relatório')
+    aba.freeze_panes = 'A2'
+    for indice in range(1, len(projecao.colunas) + 1):
+        aba.column_dimensions[get_column_letter(indice)].width = LARGURA_COLUNA_EXCEL
+
+    negrito = Font(bold=True)
+    cabecalho = []
+    for rotulo in projecao.rotulos:
+        celula = WriteOnlyCell(aba, value=rotulo)
+        celula.font = negrito
+        cabecalho.append(celula)
+    aba.append(cabecalho)
+
+    for linha in projecao.linhas(cadastros, formatar_datas=False):
+        for indice in projecao.colunas_data:
+            if linha[indice] is not None:
+                celula = WriteOnlyCell(aba, value=linha[indice])
+                celula.number_format = FORMATO_DATA_EXCEL
+                linha[indice] = celula
+        aba.append(linha)
+
+    planilha.save(destino)
+
+
 def gerar_excel_relatorio(cadastros, colunas):
     """
     Gera um relatório em formato Excel a partir dos cadastros filtrados
     
     Args:
-        cadastros: Lista de objetos Cadastro a serem incluídos no relatório
+        cadastros: QuerySet ou lista de objetos Cadastro a serem incluídos no relatório
         colunas: Lista de colunas a serem exibidas
     
     Returns:
         Response com o arquivo Excel para download
     """
-    import pandas as pd
-    
-    # Criar um arquivo temporário para o Excel
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx')
-    arquivo_excel = temp_file.name
-    temp_file.close()
-    
-    # Preparar dados para o DataFrame
-    dados = []
-    colunas_unicas = list(set(colunas))  # Garantir que as colunas não se repitam
-    for cadastro in cadastros:
-        linha = {}
-        for coluna in colunas_unicas:
-            if coluna == 'nome':
-                linha['Nome'] = cadastro.nome or ''
-            elif coluna == 'projeto':
-                linha['Projeto'] = cadastro.projeto or ''
-            elif coluna == 'data_nascimento':
-                linha['Data Nascimento'] = cadastro.data_nascimento
-            elif coluna == 'data_cadastro':
-                linha['Data Cadastro'] = cadastro.data_cadastro
-            elif coluna == 'cras':
-                linha['CRAS'] = cadastro.cras.nome if cadastro.cras else ''
-            elif coluna == 'cidade':
-                linha['Cidade'] = cadastro.cidade or ''
-            elif coluna == 'bairro':
-                linha['Bairro'] = cadastro.bairro or ''
-            elif coluna == 'contato':
-                linha['Contato'] = cadastro.contato or ''
-            elif coluna == 'nome_mae':
-                linha['Nome da Mãe'] = cadastro.nome_mae or ''
-        dados.append(linha)
-    
-    # Criar DataFrame e exportar para Excel
-    df = pd.DataFrame(dados)
-    df.to_excel(arquivo_excel, index=False)
+    # Arquivo de saída em memória (vai para disco apenas se ficar grande)
+    arquivo_excel = novo_arquivo_saida()
+    escrever_excel_relatorio(cadastros, colunas, arquivo_excel)
     
     # Retornar o arquivo para download
     download_name = f"relatorio_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    return django_send_file(arquivo_excel, download_name, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    return django_send_buffer(arquivo_excel, download_name, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
 
 # Funções auxiliares para processar Delta JSON do Quill
 def processar_delta_quill(delta):
     """
     Processa um objeto delta do Quill e retorna uma lista de elementos ReportLab
+    (ver apps.relatorios.utils.delta_quill)
     
     Args:
         delta: Objeto delta do Quill
@@ -656,150 +704,56 @@ def processar_delta_quill(delta):
     Returns:
         Lista de elementos ReportLab
     """
-    elementos = []
-    styles = getSampleStyleSheet()
-    normal_style = styles['Normal']
-    
-    # Processar cada operação
-    for op in delta.get('ops', []):
-        insert = op.get('insert', '')
-        atributos = op.get('attributes', {})
-        
-        # Verificar se é uma imagem
-        if isinstance(insert, dict) and 'image' in insert:
-            try:
-                # Processar a imagem
-                img_data = insert['image']
-                
-                # Se a imagem for base64
-                if img_data.startswith('data:image'):
-                    # Extrair os dados da imagem
-                    formato, dados_codificados = img_data.split(';base64,')
-                    image_data = base64.b64decode(dados_codificados)
-                    
-                    # Criar imagem temporária
-                    img_temp = BytesIO(image_data)
-                    img = Image(img_temp, width=4*inch, height=3*inch)
-                    elementos.append(img)
-                    elementos.append(Spacer(1, 0.25 * cm))
-            except Exception as e:
-                print(f"Erro ao processar imagem: {str(e)}")
-                continue
-        
-        # Processar texto
-        elif isinstance(insert, str):
-            # Quebrar texto em parágrafos
-            paragrafos = insert.split('\n')
-            for paragrafo in paragrafos:
-                if paragrafo.strip() or len(paragrafos) > 1:  # incluir parágrafos vazios se houver quebra de linha
-                    # Criar estilo com base nos atributos
-                    estilo = ParagraphStyle(
-                        'estilo_dinamico',
-                        parent=normal_style,
-                        fontName='Helvetica-Bold' if atributos.get('bold') else 'Helvetica',
-                        fontSize=12,
-                        leading=14
-                    )
-                    
-                    # Aplicar itálico
-                    if atributos.get('italic'):
-                        if estilo.fontName == 'Helvetica-Bold':
-                            estilo.fontName = 'Helvetica-BoldOblique'
-                        else:
-                            estilo.fontName = 'Helvetica-Oblique'
-                    
-                    # Aplicar alinhamento
-                    if atributos.get('align') == 'center':
-                        estilo.alignment = 1  # Centralizado
-                    elif atributos.get('align') == 'right':
-                        estilo.alignment = 2  # Direita
-                    elif atributos.get('align') == 'justify':
-                        estilo.alignment = 4  # Justificado
-                    
-                    elementos.append(Paragraph(paragrafo, estilo))
-                    elementos.append(Spacer(1, 0.25 * cm))
-    
-    return elementos
+    return renderizar_pdf(delta)
 
 def processar_delta_quill_docx(doc, delta):
     """
     Processa um objeto delta do Quill e adiciona o conteúdo ao documento DOCX
+    (ver apps.relatorios.utils.delta_quill)
     
     Args:
         doc: Documento DOCX
         delta: Objeto delta do Quill
     """
-    from docx.shared import Pt, Inches
-    from docx.enum.text import WD_ALIGN_PARAGRAPH
-    import tempfile
-    import os
-    
-    # Processar cada operação
-    for op in delta.get('ops', []):
-        insert = op.get('insert', '')
-        atributos = op.get('attributes', {})
-        
-        # Verificar se é uma imagem
-        if isinstance(insert, dict) and 'image' in insert:
-            try:
-                # Processar a imagem
-                img_data = insert['image']
-                
-                # Se a imagem for base64
-                if img_data.startswith('data:image'):
-                    # Extrair os dados da imagem
-                    formato, dados_codificados = img_data.split(';base64,')
-                    image_data = base64.b64decode(dados_codificados)
-                    
-                    # Criar arquivo temporário para a imagem
-                    img_temp = tempfile.NamedTemporaryFile(delete=False, suffix='.png')
-                    img_temp.write(image_data)
-                    img_temp.close()
-                    
-                    # Adicionar imagem ao documento
-                    p = doc.add_paragraph()
-                    r = p.add_run()
-                    r.add_picture(img_temp.name, width=Inches(5))
-                    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-                    
-                    # Remover arquivo temporário
-                    os.unlink(img_temp.name)
-            except Exception as e:
-                print(f"Erro ao processar imagem: {str(e)}")
-                continue
-        
-        # Processar texto
-        elif isinstance(insert, str):
-            # Quebrar texto em parágrafos
-            paragrafos = insert.split('\n')
-            for paragrafo in paragrafos:
-                if paragrafo.strip() or len(paragrafos) > 1:  # incluir parágrafos vazios se houver quebra de linha
-                    p = doc.add_paragraph()
-                    run = p.add_run(paragrafo)
-                    
-                    # Aplicar formatação
-                    run.bold = atributos.get('bold', False)
-                    run.italic = atributos.get('italic', False)
-                    run.underline = atributos.get('underline', False)
-                    
-                    # Aplicar alinhamento
-                    if atributos.get('align') == 'center':
-                        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-                    elif atributos.get('align') == 'right':
-                        p.alignment = WD_ALIGN_PARAGRAPH.RIGHT
-                    elif atributos.get('align') == 'justify':
-                        p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
+    renderizar_docx(doc, delta)
+
+# Versão do modelo do PDF da ficha PAIF. Incremente ao alterar o layout de
+# escrever_pdf_ficha_paif para que os PDFs em cache sejam gerados novamente.
+VERSAO_MODELO_FICHA_PAIF = 2
+
 
 def gerar_pdf_ficha_paif(ficha):
     """
     Função especializada para gerar PDF de uma ficha PAIF
-    com formatação específica
+    com formatação específica.
+
+    O PDF fica em cache em disco (ver apps.relatorios.utils.cache_documentos),
+    identificado pelo id da ficha, sua data_atualizacao e a versão do
+    modelo; enquanto a ficha não for alterada, o PDF é servido sem ser
+    gerado novamente. Por isso o PDF não traz o momento da geração, e sim o
+    da última atualização da ficha.
     """
-    # Criar um arquivo temporário para o PDF
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-    arquivo_pdf = temp_file.name
-    temp_file.close()
-    
+    arquivo = abrir_documento(nome_pdf_ficha_paif(ficha.pk, ficha.data_atualizacao),
+                              lambda destino: escrever_pdf_ficha_paif(ficha, destino))
+
+    download_name = f"PAIF_{ficha.numero_paif}_{datetime.now().strftime('%Y%m%d')}.pdf"
+    return FileResponse(arquivo, as_attachment=True, filename=download_name,
+                        content_type='application/pdf')
+
+
+def nome_pdf_ficha_paif(ficha_id, data_atualizacao):
+    """Nome no cache do PDF da ficha PAIF na versão indicada por data_atualizacao."""
+    return nome_documento('ficha_paif', ficha_id, data_atualizacao.isoformat(), VERSAO_MODELO_FICHA_PAIF)
+
+
+def caminho_pdf_ficha_paif(ficha):
+    """Caminho do PDF da ficha no cache em disco, gerando-o se necessário."""
+    nome = nome_pdf_ficha_paif(ficha.pk, ficha.data_atualizacao)
+    return documento_em_cache(nome, lambda destino: escrever_pdf_ficha_paif(ficha, destino))
+
+
+def escrever_pdf_ficha_paif(ficha, arquivo_pdf):
+    """Gera o PDF de uma ficha PAIF no arquivo (aberto para escrita binária) informado."""
     # Configurar o documento
     doc = SimpleDocTemplate(
         arquivo_pdf,
@@ -874,30 +828,34 @@ def gerar_pdf_ficha_paif(ficha):
     
     # Adicionar rodapé
     elementos.append(Spacer(1, 1 * cm))
-    elementos.append(Paragraph(f"Documento gerado em {datetime.now().strftime('%d/%m/%Y às %H:%M:%S')}", normal_style))
+    # Fixo para a mesma versão da ficha: o PDF é reaproveitado do cache
+    atualizada_em = timezone.localtime(ficha.data_atualizacao)
+    elementos.append(Paragraph(f"Ficha atualizada em {atualizada_em.strftime('%d/%m/%Y às %H:%M:%S')}", normal_style))
     elementos.append(Paragraph("Sistema CRAS360 - © 2025", normal_style))
     
     # Gerar o documento
     doc.build(elementos)
-    
-    # Retornar o arquivo para download usando Django
-    download_name = f"PAIF_{ficha.numero_paif}_{datetime.now().strftime('%Y%m%d')}.pdf"
-    return django_send_file(arquivo_pdf, download_name, 'application/pdf')
 
 # Importe os módulos do Django
-from django.http import HttpResponse
+from django.http import FileResponse
 import os
 
-# Função auxiliar para enviar arquivo para download no Django
-def django_send_file(arquivo_path, download_name, mimetype):
+# Documentos menores que isso são gerados inteiramente em memória
+LIMITE_DOCUMENTO_EM_MEMORIA = 5 * 1024 * 1024
+
+
+def novo_arquivo_saida():
     """
-    Função auxiliar para enviar arquivo para download usando Django e excluir depois
+    Arquivo de saída para a geração de documentos: fica em memória até
+    LIMITE_DOCUMENTO_EM_MEMORIA e só então passa para um arquivo temporário.
     """
-    with open(arquivo_path, 'rb') as f:
-        response = HttpResponse(f.read(), content_type=mimetype)
-        response['Content-Disposition'] = f'attachment; filename="{download_name}"'
-    
-    # Excluir o arquivo temporário após a leitura
-    os.unlink(arquivo_path)
-    
-    return response
+    return tempfile.SpooledTemporaryFile(max_size=LIMITE_DOCUMENTO_EM_MEMORIA)
+
+
+def django_send_buffer(arquivo, download_name, mimetype):
+    """
+    Envia para download um documento gerado em novo_arquivo_saida() (ou BytesIO).
+    O arquivo é fechado (e descartado) junto com a resposta.
+    """
+    arquivo.seek(0)
+    return FileResponse(arquivo, as_attachment=True, filename=download_name, content_type=mimetype)
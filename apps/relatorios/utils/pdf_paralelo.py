@@ -0,0 +1,133 @@
+"""
+Geração em paralelo dos relatórios PDF muito grandes.
+
+O layout do ReportLab usa um único núcleo. Como o relatório em modo
+streaming tem sempre o mesmo número de linhas por página, o conjunto de
+registros pode ser dividido em trechos que começam em uma página conhecida:
+cada trecho é desenhado por um processo do pool (com o mesmo título, data
+de geração, total de registros e numeração contínua das páginas) em um PDF
+parcial, e os PDFs parciais são juntados na ordem em um único documento.
+
+Os processos recebem a consulta SQL do QuerySet (QuerySet.query), não os
+registros, e cada um lê do banco apenas o seu trecho. Juntar os PDFs
+requer o pacote pypdf.
+
+Criar processos dentro de uma requisição não é seguro em servidores com
+threads ou assíncronos: a geração em paralelo é usada pela tarefa
+relatorio_pdf (ver apps.relatorios.tarefas), executada pelos trabalhadores
+da fila.
+"""
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import django
+from django.apps import apps
+from django.db import connections
+
+from apps.relatorios.utils.pdf_generator import (
+    LINHAS_POR_PAGINA, _contar_registros, escrever_pdf_relatorio_streaming,
+)
+
+# Páginas desenhadas por cada processo de uma vez
+PAGINAS_POR_TRECHO = 100
+
+
+def paralelo_disponivel():
+    """Indica se há mais de um núcleo, o pypdf e permissão para criar processos."""
+    try:
+        import pypdf  # noqa: F401
+    except ImportError:
+        return False
+    return (os.cpu_count() or 1) > 1 and not multiprocessing.current_process().daemon
+
+
+def _iniciar_processo():
+    if not apps.ready:
+        django.setup()
+    # Cada processo abre a própria conexão com o banco na primeira consulta
+    connections.close_all()
+
+
+def _desenhar_trecho(modelo, consulta, inicio, fim, caminho, colunas, titulo, primeira_pagina, total, agora):
+    cadastros = apps.get_model(modelo).objects.all()
+    cadastros.query = consulta
+    try:
+        escrever_pdf_relatorio_streaming(
+            cadastros[inicio:fim], colunas, caminho, titulo,
+            primeira_pagina=primeira_pagina, total=total, agora=agora,
+        )
+    finally:
+        connections.close_all()
+    return caminho
+
+
+def escrever_pdf_relatorio_paralelo(cadastros, colunas, destino, titulo=None, processos=None, total=None,
+                                    paginas_por_trecho=PAGINAS_POR_TRECHO, progresso=None):
+    """
+    Escreve em `destino` o mesmo relatório de escrever_pdf_relatorio_streaming,
+    dividindo as páginas entre `processos` processos (padrão: os núcleos disponíveis).
+    Iteráveis que não são QuerySet são escritos em um único processo.
+
+    Args:
+        cadastros: QuerySet ordenado de cadastros
+        colunas: Lista de colunas a exibir
+        destino: Caminho ou arquivo binário aberto para escrita
+        titulo: Título do relatório
+        processos: Quantidade máxima de processos (limitada aos núcleos disponíveis)
+        total: Total de registros, se já conhecido
+        paginas_por_trecho: Páginas de cada PDF parcial
+        progresso: Função opcional chamada com (trechos prontos, total de trechos)
+
+    Returns:
+        Quantidade de trechos gerados
+    """
+    from pypdf import PdfWriter
+
+    total = _contar_registros(cadastros) if total is None else total
+    linhas_por_trecho = paginas_por_trecho * LINHAS_POR_PAGINA
+    trechos = max(1, -(-total // linhas_por_trecho))
+    nucleos = os.cpu_count() or 1
+    processos = min(int(processos or nucleos), nucleos, trechos)
+    if processos <= 1 or not hasattr(cadastros, 'query'):
+        escrever_pdf_relatorio_streaming(cadastros, colunas, destino, titulo, total=total)
+        return 1
+
+    if not cadastros.ordered:
+        # A divisão em trechos precisa de uma ordem estável
+        cadastros = cadastros.order_by('pk')
+    modelo = cadastros.model._meta.label
+    agora = datetime.now()
+    colunas = list(colunas)
+    diretorio = tempfile.mkdtemp(prefix='relatorio_')
+    try:
+        argumentos = [
+            (modelo, cadastros.query, indice * linhas_por_trecho, (indice + 1) * linhas_por_trecho,
+             os.path.join(diretorio, f'{indice:05d}.pdf'), colunas, titulo,
+             indice * paginas_por_trecho + 1, total, agora)
+            for indice in range(trechos)
+        ]
+        # Conexões abertas não podem ser herdadas pelos processos filhos
+        connections.close_all()
+        with ProcessPoolExecutor(processos, initializer=_iniciar_processo) as executor:
+            caminhos = []
+            for caminho in executor.map(_desenhar_trecho, *zip(*argumentos)):
+                caminhos.append(caminho)
+                if progresso:
+                    progresso(len(caminhos), trechos)
+
+        escritor = PdfWriter()
+        for caminho in caminhos:
+            escritor.append(caminho)
+        if titulo:
+            escritor.add_metadata({'/Title': titulo})
+        escritor.write(destino)
+        escritor.close()
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+    return trechos
+
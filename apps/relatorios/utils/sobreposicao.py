@@ -0,0 +1,181 @@
+"""
+Impressão de fichas sobre os layouts digitalizados (coordenadas.LAYOUTS),
+com os valores e as marcações nas posições de coordenadas.COORDENADAS.
+
+A imagem de fundo de cada layout é reduzida para a resolução de impressão
+e gravada como JPEG no cache em disco (ver cache_documentos) uma única vez;
+o ReportLab embute esse JPEG diretamente, sem decodificá-lo. Em cada PDF o
+fundo é definido uma vez como form XObject e reaproveitado por todas as
+páginas: imprimir 500 fichas embute a imagem uma vez, e cada página só
+acrescenta o texto dos campos.
+
+Os layouts ficam em settings.LAYOUTS_FICHAS_DIR.
+"""
+
+import os
+from datetime import date
+
+from django.conf import settings
+from PIL import Image as PILImage
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.pdfgen import canvas
+
+from apps.relatorios.utils.cache_documentos import documento_em_cache, nome_documento
+from apps.relatorios.utils.coordenadas import COORDENADAS, LAYOUTS
+
+# Grupo de coordenadas usado por cada layout
+GRUPOS_LAYOUT = {
+    'Ficha Amarela': 'campos_fichas',
+    'Ficha Azul': 'campos_fichas',
+    'Ficha Verde': 'campos_fichas',
+    'Ficha Vermelha': 'campos_fichas',
+    'Som e Cidadania': 'campos_projetos',
+    'Somos Tão Jovens': 'campos_projetos',
+    'Nascer': 'nascer',
+}
+
+# Resolução e qualidade do fundo embutido nos PDFs
+DPI_FUNDO = 150
+QUALIDADE_FUNDO = 80
+
+FONTE_CAMPOS = 'Helvetica'
+TAMANHO_FONTE_CAMPOS = 9
+MARCA_CHECKBOX = 'X'
+
+# Incremente ao mudar o tratamento da imagem para regerar os fundos em cache
+VERSAO_FUNDO = 1
+
+
+class ErroSobreposicao(Exception):
+    pass
+
+
+def _diretorio_layouts():
+    return getattr(settings, 'LAYOUTS_FICHAS_DIR', None) or os.path.join(settings.BASE_DIR, 'static', 'imagens', 'layouts')
+
+
+def _tamanho_pagina(largura_px, altura_px):
+    return landscape(A4) if largura_px > altura_px else A4
+
+
+def fundo_layout(layout):
+    """
+    JPEG do fundo do layout, pronto para embutir, e o tamanho da página.
+
+    Returns:
+        (caminho do JPEG no cache, (largura, altura) da página em pontos)
+    """
+    original = os.path.join(_diretorio_layouts(), LAYOUTS[layout])
+    try:
+        informacoes = os.stat(original)
+        with PILImage.open(original) as imagem:
+            tamanho = _tamanho_pagina(*imagem.size)
+    except OSError as e:
+        raise ErroSobreposicao(f'Layout "{layout}" indisponível: {e}')
+
+    def escrever(destino):
+        limite = (int(tamanho[0] / 72 * DPI_FUNDO), int(tamanho[1] / 72 * DPI_FUNDO))
+        with PILImage.open(original) as imagem:
+            imagem.draft('RGB', limite)
+            imagem = imagem.convert('RGB')
+            imagem.thumbnail(limite, PILImage.LANCZOS)
+            imagem.save(destino, 'JPEG', quality=QUALIDADE_FUNDO, optimize=True)
+
+    nome = nome_documento(
+        'layout', os.path.splitext(LAYOUTS[layout])[0], informacoes.st_mtime_ns, informacoes.st_size,
+        DPI_FUNDO, QUALIDADE_FUNDO, VERSAO_FUNDO, extensao='.jpg',
+    )
+    return documento_em_cache(nome, escrever), tamanho
+
+
+def _texto(valor):
+    if isinstance(valor, date):
+        return valor.strftime('%d/%m/%Y')
+    return str(valor)
+
+
+class ModeloFicha:
+    """
+    Layout com as posições dos campos e das caixas de marcação.
+
+    Args:
+        layout: Nome em coordenadas.LAYOUTS ('Ficha Azul', 'Nascer'...)
+    """
+
+    def __init__(self, layout):
+        if layout not in LAYOUTS:
+            raise ErroSobreposicao(f'Layout desconhecido: {layout}')
+        self.layout = layout
+        self.campos = {}
+        self.checkboxes = {}
+        for chave, valor in COORDENADAS[GRUPOS_LAYOUT[layout]].items():
+            if isinstance(valor, dict):
+                self.checkboxes.update(valor)
+            else:
+                self.campos[chave] = valor
+
+    def escrever(self, fichas, destino):
+        """
+        Grava em `destino` um PDF com uma página por ficha.
+
+        Args:
+            fichas: Iterável de (valores, marcados): dicionário campo -> valor
+                e coleção com as chaves das caixas marcadas. Campos sem
+                posição no layout são ignorados.
+            destino: Caminho ou arquivo binário aberto para escrita
+
+        Returns:
+            Quantidade de páginas
+        """
+        caminho_fundo, tamanho = fundo_layout(self.layout)
+        pdf = canvas.Canvas(destino, pagesize=tamanho, pageCompression=1)
+        pdf.setTitle(self.layout)
+
+        pdf.beginForm('fundo')
+        pdf.drawImage(caminho_fundo, 0, 0, *tamanho)
+        pdf.endForm()
+
+        paginas = 0
+        for valores, marcados in fichas:
+            pdf.doForm('fundo')
+            pdf.setFont(FONTE_CAMPOS, TAMANHO_FONTE_CAMPOS)
+            for campo, valor in valores.items():
+                posicao = self.campos.get(campo)
+                if posicao and valor not in (None, ''):
+                    pdf.drawString(*posicao, _texto(valor))
+            for chave in marcados:
+                posicao = self.checkboxes.get(chave)
+                if posicao:
+                    pdf.drawString(*posicao, MARCA_CHECKBOX)
+            pdf.showPage()
+            paginas += 1
+        pdf.save()
+        return paginas
+
+
+def dados_ficha_scfv(ficha):
+    """Valores e marcações de uma FichaSCFV nos campos dos layouts."""
+    beneficiario = ficha.beneficiario
+    valores = {
+        'unidade': beneficiario.cras.nome if beneficiario.cras else '',
+        'data_cadastro': ficha.data_entrada,
+        'nome': beneficiario.nome_completo,
+        'sexo': beneficiario.sexo,
+        'data_nascimento': beneficiario.data_nascimento,
+        'cpf': beneficiario.cpf,
+        'rg': beneficiario.rg,
+        'nis': beneficiario.nis,
+        'nome_mae': beneficiario.nome_mae,
+        'endereco': beneficiario.endereco,
+    }
+    # O público prioritário é gravado como lista de chaves separadas por vírgula
+    marcados = {
+        f'prioridade_{item.strip()}' for item in (ficha.publico_prioritario or '').split(',') if item.strip()
+    }
+    return valores, marcados
+
+
+def escrever_fichas_scfv(fichas, layout, destino):
+    """Imprime as FichaSCFV do QuerySet no layout indicado (uma página por ficha)."""
+    consulta = fichas.select_related('beneficiario__cras').iterator(chunk_size=500)
+    return ModeloFicha(layout).escrever((dados_ficha_scfv(ficha) for ficha in consulta), destino)
@@ -0,0 +1,70 @@
+"""
+Preenchimento rápido de tabelas DOCX com muitas linhas.
+
+Com o python-docx, table.add_row().cells e cell.text percorrem a árvore XML
+da tabela a cada chamada, e o custo cresce com o tamanho da tabela. Aqui o
+XML das linhas é montado como texto a partir de um modelo por coluna
+(propriedades da célula, parágrafo e run já serializados, copiados da
+linha de cabeçalho), interpretado em blocos pelo lxml e anexado à tabela
+de uma vez. O XML resultante é equivalente ao que o python-docx produziria.
+"""
+
+import re
+from xml.sax.saxutils import escape
+
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls, qn
+from lxml import etree
+
+# Linhas interpretadas pelo lxml de cada vez
+LINHAS_POR_BLOCO = 2000
+
+# Caracteres que não podem aparecer em XML 1.0
+_CARACTERES_INVALIDOS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+
+def _modelos_colunas(tabela):
+    """Início e fim do XML de uma célula (até o run) de cada coluna, a partir da primeira linha."""
+    modelos = []
+    for tc in tabela._tbl.tr_lst[0].tc_lst:
+        tc_pr = tc.find(qn('w:tcPr'))
+        propriedades = etree.tostring(tc_pr, encoding='unicode') if tc_pr is not None else ''
+        # Remover as declarações de namespace repetidas em cada elemento serializado
+        propriedades = re.sub(r'\s+xmlns:\w+="[^"]*"', '', propriedades)
+        modelos.append((f'<w:tc>{propriedades}<w:p><w:r>', '</w:r></w:p></w:tc>'))
+    return modelos
+
+
+def _anexar(tabela, linhas_xml):
+    fragmento = parse_xml(f'<w:tbl {nsdecls("w")}>{"".join(linhas_xml)}</w:tbl>')
+    tabela._tbl.extend(list(fragmento))
+
+
+def preencher_tabela_docx(tabela, linhas, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """
+    Acrescenta as linhas (listas de textos, uma posição por coluna) à tabela.
+
+    A tabela deve ter a linha de cabeçalho, que serve de modelo para as
+    propriedades das células (largura).
+
+    Returns:
+        Quantidade de linhas acrescentadas
+    """
+    modelos = _modelos_colunas(tabela)
+    bloco = []
+    total = 0
+    for linha in linhas:
+        celulas = []
+        for (inicio, fim), valor in zip(modelos, linha):
+            if valor:
+                valor = '<w:t xml:space="preserve">' + escape(_CARACTERES_INVALIDOS.sub('', valor)) + '</w:t>'
+            celulas.append(inicio + (valor or '') + fim)
+        bloco.append('<w:tr>' + ''.join(celulas) + '</w:tr>')
+        if len(bloco) == linhas_por_bloco:
+            _anexar(tabela, bloco)
+            total += len(bloco)
+            bloco = []
+    if bloco:
+        _anexar(tabela, bloco)
+        total += len(bloco)
+    return total
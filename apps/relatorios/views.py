@@ -1,12 +1,29 @@
+import hashlib
+import json
+
 from django.shortcuts import render, redirect
 from django.http import JsonResponse, HttpResponse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.core.cache import cache
+
+from apps.core import tarefas
+from apps.core.models import FichaPAIF, FichaSCFV
+from apps.paif.forms import PesquisaPAIFForm
+from apps.relatorios.permissions import mapa_permissoes, pode_acessar_relatorio
+from apps.relatorios.utils.colunas import REGISTROS, ColunasInvalidas, compilar_colunas, nome_registro, validar_colunas
+from apps.relatorios.utils.exportacao import FORMATOS as FORMATOS_STREAMING, resposta_streaming
+from apps.relatorios.utils.paginacao import CursorInvalido, Ordenacao, contar_registros, paginar
+from apps.relatorios.utils.pdf_generator import (
+    LIMITE_RELATORIO_PARALELO, gerar_doc_relatorio_formularios, gerar_excel_relatorio,
+    gerar_pdf_relatorio_formularios,
+)
 
 # Função helper para verificar permissões
 def verificar_permissao_relatorio(request, tipo_relatorio):
     """
-    Verifica se o usuário tem permissão para acessar o tipo de relatório.
+    Verifica se o usuário tem permissão para acessar o tipo de relatório
+    (ver apps.relatorios.permissions).
     
     Args:
         tipo_relatorio: 'scfv', 'paif' ou None (para página inicial)
@@ -14,109 +31,7 @@ def verificar_permissao_relatorio(request, tipo_relatorio):
     Returns:
         Boolean indicando se o usuário tem permissão
     """
-    # Se o usuário é superuser, tem permissão total
-    if request.user.is_superuser:
-        return True
-        
-    # Obtenha o perfil do usuário (várias tentativas para diferentes estruturas)
-    perfil_usuario = None
-    
-    # Método 1: Através do relacionamento OneToOne
-    try:
-        perfil_usuario = request.user.perfilusuario.perfil
-        print(f"Perfil obtido pelo método 1: {perfil_usuario}")
-    except Exception as e:
-        print(f"Erro ao obter perfil pelo método 1: {e}")
-        pass
-        
-    # Método 2: Atributo direto no usuário
-    if not perfil_usuario:
-        try:
-            perfil_usuario = getattr(request.user, 'perfil', None)
-            print(f"Perfil obtido pelo método 2: {perfil_usuario}")
-        except Exception as e:
-            print(f"Erro ao obter perfil pelo método 2: {e}")
-            pass
-    
-    # Método 3: Via sessão
-    if not perfil_usuario:
-        perfil_usuario = request.session.get('user_perfil', None)
-        print(f"Perfil obtido pelo método 3: {perfil_usuario}")
-    
-    # Método 4: Via atributo HTML
-    if not perfil_usuario and hasattr(request, 'META'):
-        # Tente obter do HTTP_USER_AGENT ou outras informações de cabeçalho
-        user_agent = request.META.get('HTTP_USER_AGENT', '')
-        if 'data-user-perfil=' in user_agent:
-            import re
-            match = re.search(r'data-user-perfil=["\'](.*?)["\']', user_agent)
-            if match:
-                perfil_usuario = match.group(1)
-                print(f"Perfil obtido pelo método 4: {perfil_usuario}")
-    
-    # Se ainda não temos perfil, retornar falso
-    if not perfil_usuario:
-        print("Não foi possível determinar o perfil do usuário")
-        
-        # Para fins de depuração, verificamos se estamos em um ambiente de desenvolvimento
-        if 'localhost' in request.META.get('HTTP_HOST', '') or '127.0.0.1' in request.META.get('HTTP_HOST', ''):
-            # Em desenvolvimento, verificamos se há algum identificador no user agent que indique ser um técnico
-            user_agent = request.META.get('HTTP_USER_AGENT', '').lower()
-            if 'técnico' in user_agent or 'tecnico' in user_agent:
-                print("Perfil técnico detectado pelo User-Agent")
-                perfil_usuario = 'Técnico'
-            elif hasattr(request.user, 'username') and request.user.username:
-                # Se for um usuário com nome, consideramos como técnico para teste
-                if 'tec' in request.user.username.lower():
-                    print(f"Perfil técnico assumido pelo username: {request.user.username}")
-                    perfil_usuario = 'Técnico'
-        
-        if not perfil_usuario:
-            return False
-    
-    print(f"Perfil final utilizado: {perfil_usuario}")
-    
-    # Normaliza o perfil para comparação (remove acentos e converte para minúsculo)
-    perfil_normalizado = perfil_usuario.lower().replace(' ', '_').replace('-', '_')
-    
-    # Remover acentos para padronização
-    try:
-        import unicodedata
-        perfil_normalizado = unicodedata.normalize('NFKD', perfil_normalizado)\
-            .encode('ASCII', 'ignore').decode('ASCII')
-    except Exception as e:
-        print(f"Erro ao normalizar perfil: {e}")
-    
-    print(f"Perfil normalizado: {perfil_normalizado}")
-    
-    # Coordenador e desenvolvedor têm acesso a todos os relatórios
-    if perfil_normalizado in ['coordenador', 'desenvolvedor', 'administrador']:
-        print(f"Acesso permitido para {perfil_usuario} (todos relatórios)")
-        return True
-    
-    # Assistentes sociais só podem acessar relatórios PAIF
-    if perfil_normalizado in ['assistente_social', 'assistente']:
-        tem_acesso = tipo_relatorio == 'paif' or tipo_relatorio is None
-        print(f"Assistente Social acessando {tipo_relatorio}: {tem_acesso}")
-        return tem_acesso
-    
-    # AQUI ESTÁ A CORREÇÃO: Verificação melhorada para perfis técnicos
-    # Verificação específica para os vários formatos possíveis de "Técnico"
-    if perfil_normalizado == 'tecnico' or 'tecnic' in perfil_normalizado or 'tecnico_pedagogico' in perfil_normalizado:
-        tem_acesso = tipo_relatorio == 'scfv' or tipo_relatorio is None
-        print(f"Técnico acessando {tipo_relatorio}: {tem_acesso}")
-        return tem_acesso
-        
-    # Regra simples: Se o perfil começar com "tec", consideramos como técnico
-    if perfil_normalizado.startswith('tec'):
-        tem_acesso = tipo_relatorio == 'scfv' or tipo_relatorio is None
-        print(f"Perfil que começa com 'tec' ({perfil_usuario}) acessando {tipo_relatorio}: {tem_acesso}")
-        return tem_acesso
-    
-    # Para outros perfis, pode-se definir regras adicionais aqui
-    # Por padrão, negamos o acesso
-    print(f"Perfil não reconhecido: {perfil_usuario} - Acesso negado para {tipo_relatorio}")
-    return False
+    return pode_acessar_relatorio(request, tipo_relatorio)
 
 # Função principal para a página inicial de relatórios
 @login_required
@@ -159,51 +74,223 @@ def paif_index(request):
     return render(request, 'relatorios/paif_report.html', context)
 
 # APIs para relatórios
+
+# Paginação e cache das APIs de relatórios (ver apps.relatorios.utils.paginacao)
+TAMANHO_PAGINA_RELATORIO = 50
+MAXIMO_PAGINA_RELATORIO = 500
+CACHE_API_RELATORIO_SEGUNDOS = 60
+CACHE_CONTAGEM_RELATORIO_SEGUNDOS = 300
+
+# Parâmetros que mudam a página, mas não o conjunto de registros
+PARAMETROS_PAGINA = ('cursor', 'limite', 'ordenar', 'colunas')
+
+
+def _chave_cache_relatorio(request, tipo, prefixo, ignorar=()):
+    """Chave de cache por (escopo do usuário, hash dos parâmetros da consulta)."""
+    cras_id = getattr(request.user, 'cras_id', None)
+    escopo = 'todos' if request.user.is_superuser or not cras_id else f'cras{cras_id}'
+    parametros = sorted((chave, valores) for chave, valores in request.GET.lists() if chave not in ignorar)
+    resumo = hashlib.md5(json.dumps(parametros).encode('utf-8')).hexdigest()
+    return f'{prefixo}:{tipo}:{escopo}:{resumo}'
+
+
+def _ordenacao_solicitada(request, queryset):
+    """Ordenação de ?ordenar=coluna (ou -coluna); None se a coluna não puder ser ordenada."""
+    chave = request.GET.get('ordenar', '').strip()
+    nome = chave.lstrip('-')
+    if not nome:
+        return Ordenacao('', None)
+    coluna = REGISTROS[nome_registro(queryset)].get(nome)
+    if coluna is None or coluna.campo is None:
+        return None
+    return Ordenacao(chave, coluna.campo, decrescente=chave.startswith('-'))
+
+
+def pagina_relatorio(request, tipo):
+    """
+    Página de registros de um relatório PAIF ou SCFV.
+
+    Parâmetros GET:
+        filtros do PesquisaPAIFForm (e periodo_inicio/periodo_fim)
+        colunas: Colunas a devolver (padrão: todas as do relatório)
+        ordenar: Coluna de ordenação; prefixo '-' para decrescente
+        limite: Registros por página (padrão TAMANHO_PAGINA_RELATORIO)
+        cursor: Valor de `proximo` da página anterior
+
+    A página e o total ficam em cache por escopo do usuário (CRAS) e filtros.
+    """
+    try:
+        limite = int(request.GET.get('limite', TAMANHO_PAGINA_RELATORIO))
+    except ValueError:
+        limite = TAMANHO_PAGINA_RELATORIO
+    limite = max(1, min(limite, MAXIMO_PAGINA_RELATORIO))
+
+    chave_pagina = _chave_cache_relatorio(request, tipo, 'relatorio_api')
+    dados = cache.get(chave_pagina)
+    if dados is not None:
+        return JsonResponse(dados)
+
+    queryset = consulta_relatorio(request, tipo)
+    ordenacao = _ordenacao_solicitada(request, queryset)
+    if ordenacao is None:
+        return JsonResponse({'success': False, 'message': 'Coluna de ordenação inválida'}, status=400)
+    try:
+        projecao = compilar_colunas(queryset, colunas_solicitadas(request, queryset))
+    except ColunasInvalidas as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+
+    try:
+        tuplas, proximo = paginar(queryset, ordenacao, projecao.campos, limite, request.GET.get('cursor'))
+    except CursorInvalido as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+
+    chave_contagem = _chave_cache_relatorio(request, tipo, 'relatorio_total', ignorar=PARAMETROS_PAGINA)
+    contagem = cache.get(chave_contagem)
+    if contagem is None:
+        contagem = contar_registros(queryset)
+        cache.set(chave_contagem, contagem, CACHE_CONTAGEM_RELATORIO_SEGUNDOS)
+    total, aproximado = contagem
+
+    dados = {
+        'success': True,
+        'colunas': projecao.chaves,
+        'headers': projecao.rotulos,
+        'rows': list(projecao.formatar(tuplas)),
+        'proximo': proximo,
+        'total': total,
+        'total_aproximado': aproximado,
+    }
+    cache.set(chave_pagina, dados, CACHE_API_RELATORIO_SEGUNDOS)
+    return JsonResponse(dados)
+
+
 @login_required
 def api_scfv(request):
-    """API para obter dados dos relatórios SCFV"""
+    """API para obter dados dos relatórios SCFV (ver pagina_relatorio)"""
     if not verificar_permissao_relatorio(request, 'scfv'):
         return JsonResponse({
             'success': False,
             'message': 'Sem permissão para acessar relatórios SCFV'
         }, status=403)
-        
-    data = {
-        'success': True,
-        'headers': ['Nome', 'Projeto', 'Idade', 'Data Cadastro'],
-        'rows': [
-            ['João Silva', 'SOMOS TÃO JOVENS', '12', '01/01/2023']
-        ]
-    }
-    return JsonResponse(data)
+    return pagina_relatorio(request, 'scfv')
 
 @login_required
 def api_paif(request):
-    """API para obter dados dos relatórios PAIF"""
+    """API para obter dados dos relatórios PAIF (ver pagina_relatorio)"""
     if not verificar_permissao_relatorio(request, 'paif'):
         return JsonResponse({
             'success': False,
             'message': 'Sem permissão para acessar relatórios PAIF'
         }, status=403)
-        
-    data = {
-        'success': True,
-        'headers': ['Nº PAIF', 'Nome Referência', 'CPF', 'Data Cadastro'],
-        'rows': [
-            ['001', 'Ana Souza', '123.456.789-00', '01/01/2023']
-        ]
-    }
-    return JsonResponse(data)
+    return pagina_relatorio(request, 'paif')
 
 # Exportação de relatórios
+
+# Pesquisa do PesquisaPAIFForm aplicada às fichas SCFV (via beneficiário)
+FILTROS_FICHA_SCFV = {
+    'numero_paif': 'beneficiario__ficha_paif__numero_paif__icontains',
+    'nome': 'beneficiario__nome_completo__icontains',
+    'cpf': 'beneficiario__cpf__icontains',
+    'data_inicial': 'data_entrada__gte',
+    'data_final': 'data_entrada__lte',
+    'cras': 'beneficiario__cras_id',
+}
+
+# A tela de relatórios envia o período com outros nomes de campo
+ALIASES_FILTROS = {'periodo_inicio': 'data_inicial', 'periodo_fim': 'data_final'}
+
+
+def filtrar_relatorio(dados, tipo, usuario):
+    """
+    QuerySet do relatório PAIF ou SCFV com os filtros do PesquisaPAIFForm
+    (QueryDict ou dicionário) e restrito ao CRAS do usuário (exceto
+    superusuários).
+    """
+    dados = dados.copy()
+    for alias, campo in ALIASES_FILTROS.items():
+        if dados.get(alias) and not dados.get(campo):
+            dados[campo] = dados[alias]
+    form = PesquisaPAIFForm(dados)
+
+    if tipo == 'paif':
+        queryset = form.filtrar(FichaPAIF.objects.order_by('pk'))
+        campo_cras = 'cras'
+    else:
+        queryset = form.filtrar(FichaSCFV.objects.order_by('pk'), FILTROS_FICHA_SCFV)
+        campo_cras = 'beneficiario__cras'
+
+    # Filtrar por CRAS do usuário se não for superusuário
+    if not usuario.is_superuser and getattr(usuario, 'cras', None):
+        queryset = queryset.filter(**{campo_cras: usuario.cras})
+    return queryset
+
+
+def consulta_relatorio(request, tipo):
+    """QuerySet do relatório com os filtros da requisição (ver filtrar_relatorio)."""
+    return filtrar_relatorio(request.GET, tipo, request.user)
+
+
+def colunas_solicitadas(request, queryset):
+    """
+    Colunas pedidas em ?colunas=a,b (ou repetido); padrão: todas as do modelo.
+
+    Raises:
+        ColunasInvalidas: se alguma coluna pedida não existir no relatório
+    """
+    colunas = [
+        coluna.strip()
+        for valor in request.GET.getlist('colunas')
+        for coluna in valor.split(',')
+        if coluna.strip()
+    ]
+    if not colunas:
+        return list(REGISTROS[nome_registro(queryset)])
+    return validar_colunas(queryset, colunas)
+
+
 @login_required
 def exportar_relatorio(request, tipo, formato):
-    """Exportar relatórios em diferentes formatos"""
+    """
+    Exportar relatórios em diferentes formatos.
+
+    CSV e NDJSON são enviados em streaming (ver apps.relatorios.utils.exportacao);
+    PDF, Excel e DOCX usam os geradores de apps.relatorios.utils.pdf_generator.
+    PDFs com mais de LIMITE_RELATORIO_PARALELO registros são gerados pela
+    fila de tarefas (tarefa relatorio_pdf), e a página acompanha o andamento.
+    """
+    if tipo not in ('paif', 'scfv'):
+        return HttpResponse(f"Tipo de relatório inválido: {tipo}", status=404)
     if not verificar_permissao_relatorio(request, tipo):
         messages.error(request, f"Você não tem permissão para exportar relatórios {tipo.upper()}.")
         return redirect('relatorios:index')
-        
-    return HttpResponse(f"Exportando relatório {tipo} em formato {formato}")
+
+    geradores = {
+        'pdf': gerar_pdf_relatorio_formularios,
+        'excel': gerar_excel_relatorio,
+        'xlsx': gerar_excel_relatorio,
+        'docx': gerar_doc_relatorio_formularios,
+    }
+    if formato not in FORMATOS_STREAMING and formato not in geradores:
+        return HttpResponse(f"Formato de exportação não suportado: {formato}", status=400)
+
+    queryset = consulta_relatorio(request, tipo)
+    try:
+        colunas = colunas_solicitadas(request, queryset)
+    except ColunasInvalidas as e:
+        return HttpResponse(str(e), status=400)
+    if formato in FORMATOS_STREAMING:
+        return resposta_streaming(queryset, colunas, formato, nome_base=f'relatorio_{tipo}')
+    if formato == 'pdf':
+        total, _ = contar_registros(queryset, limite_exato=LIMITE_RELATORIO_PARALELO)
+        if total > LIMITE_RELATORIO_PARALELO:
+            filtros = {chave: valor for chave, valor in request.GET.dict().items() if chave not in ('tipo', 'colunas')}
+            tarefa = tarefas.enfileirar(
+                'relatorio_pdf', {'tipo': tipo, 'colunas': colunas, **filtros}, usuario=request.user,
+            )
+            return render(request, 'relatorios/relatorio_em_fila.html', {
+                'tarefa': tarefa, 'tipo': tipo, 'total': total,
+            })
+    return geradores[formato](queryset, colunas)
 
 # Visualização de fichas
 @login_required
@@ -246,6 +333,11 @@ def gerar_paif(request):
     return render(request, 'relatorios/paif_report.html')
 
 # Verificação de permissões
+@login_required
+def permissoes_relatorios(request):
+    """API com as permissões do usuário para todos os relatórios, em uma única chamada"""
+    return JsonResponse({'permissoes': mapa_permissoes(request)})
+
 @login_required
 def verificar_permissao_ajax(request, tipo_relatorio):
     """API para verificar permissões de acesso aos relatórios via AJAX"""
@@ -255,74 +347,3 @@ def verificar_permissao_ajax(request, tipo_relatorio):
         'tem_permissao': tem_permissao,
         'tipo_relatorio': tipo_relatorio
     })
-
-# Função para depuração de permissões
-@login_required
-def debug_permissoes(request):
-    """
-    View para diagnóstico de problemas de permissão.
-    Exibe detalhadamente as informações do usuário e suas permissões.
-    """
-    # Coletando informações sobre o usuário
-    user_info = {
-        'username': request.user.username,
-        'is_superuser': request.user.is_superuser,
-        'is_staff': request.user.is_staff,
-        'is_authenticated': request.user.is_authenticated
-    }
-    
-    # Tentando obter todas as propriedades possíveis do perfil
-    perfil_info = {}
-    
-    # Método 1: Direto do relacionamento OneToOne
-    try:
-        perfil = request.user.perfilusuario
-        perfil_info['perfilusuario'] = {
-            'perfil': getattr(perfil, 'perfil', None),
-            'ativo': getattr(perfil, 'ativo', None),
-            'data_cadastro': getattr(perfil, 'data_cadastro', None),
-        }
-        if hasattr(perfil, 'cras'):
-            perfil_info['perfilusuario']['cras'] = str(perfil.cras)
-    except Exception as e:
-        perfil_info['perfilusuario_error'] = str(e)
-    
-    # Método 2: Atributos diretos no usuário
-    attributes = ['perfil', 'tipo_usuario', 'role', 'grupo']
-    for attr in attributes:
-        try:
-            value = getattr(request.user, attr, None)
-            if value:
-                perfil_info[f'user_{attr}'] = str(value)
-        except Exception as e:
-            perfil_info[f'user_{attr}_error'] = str(e)
-    
-    # Método 3: Informações da sessão
-    session_info = {}
-    for key in request.session.keys():
-        if 'perfil' in key.lower() or 'user' in key.lower() or 'permis' in key.lower():
-            session_info[key] = request.session[key]
-    
-    # Método 4: Informações do META
-    meta_info = {}
-    for key, value in request.META.items():
-        if isinstance(value, str) and ('user' in key.lower() or 'auth' in key.lower()):
-            meta_info[key] = value
-    
-    # Testando permissões específicas
-    permissoes = {
-        'pagina_inicial': verificar_permissao_relatorio(request, None),
-        'relatorios_scfv': verificar_permissao_relatorio(request, 'scfv'),
-        'relatorios_paif': verificar_permissao_relatorio(request, 'paif')
-    }
-    
-    # Renderizar página de diagnóstico
-    context = {
-        'user_info': user_info,
-        'perfil_info': perfil_info,
-        'session_info': session_info,
-        'meta_info': meta_info,
-        'permissoes': permissoes
-    }
-    
-    return render(request, 'relatorios/debug_permissoes.html', context)
@@ -5,3 +5,7 @@ class SCFVConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.scfv'
     verbose_name = 'SCFV'
+
+    def ready(self):
+        # Registrar as tarefas em segundo plano do SCFV
+        from apps.scfv import tarefas  # noqa: F401
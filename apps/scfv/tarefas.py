@@ -0,0 +1,44 @@
+"""
+Tarefas em segundo plano do SCFV (ver apps.core.tarefas).
+"""
+
+import tempfile
+from datetime import datetime
+
+from apps.core.models import FichaSCFV
+from apps.core.tarefas import registrar_tarefa
+
+PERFIS_IMPRESSAO_FICHAS = ('Coordenador', 'Técnico SCFV', 'Técnico', 'Auxiliar Administrativo')
+
+
+def _pode_imprimir_fichas(usuario):
+    return usuario.perfil in PERFIS_IMPRESSAO_FICHAS
+
+
+@registrar_tarefa('fichas_scfv_layout', permissao=_pode_imprimir_fichas, max_tentativas=1)
+def tarefa_fichas_scfv_layout(contexto, layout='Ficha Azul', **filtros):
+    """
+    Imprime as fichas SCFV que atendem aos filtros (campos do
+    PesquisaPAIFForm) sobre o layout digitalizado indicado.
+    """
+    from apps.paif.forms import PesquisaPAIFForm
+    from apps.relatorios.utils.sobreposicao import escrever_fichas_scfv
+    from apps.relatorios.views import FILTROS_FICHA_SCFV
+
+    form = PesquisaPAIFForm(filtros)
+    if not form.is_valid():
+        raise ValueError(f'Filtros inválidos: {form.errors.as_text()}')
+    fichas = form.filtrar(FichaSCFV.objects.order_by('beneficiario__nome_completo', 'pk'), FILTROS_FICHA_SCFV)
+
+    # Restringir ao CRAS do solicitante
+    usuario = contexto.tarefa.usuario
+    if usuario and not usuario.is_superuser and usuario.cras_id:
+        fichas = fichas.filter(beneficiario__cras_id=usuario.cras_id)
+
+    contexto.progresso(0, f'Imprimindo fichas ({layout})...')
+    with tempfile.TemporaryFile() as saida:
+        paginas = escrever_fichas_scfv(fichas, layout, saida)
+        contexto.salvar_arquivo(
+            saida, f"fichas_scfv_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf", 'application/pdf',
+        )
+    return {'fichas': paginas, 'layout': layout}
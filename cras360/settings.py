@@ -70,6 +70,8 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Aguarda o bloqueio de escrita em vez de falhar (importação em paralelo)
+        'OPTIONS': {'timeout': 20},
     }
 }
 
@@ -104,6 +106,17 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Cache em disco de documentos gerados (ver apps.relatorios.utils.cache_documentos)
+CACHE_DOCUMENTOS_DIR = os.path.join(BASE_DIR, 'cache_documentos')
+CACHE_DOCUMENTOS_TAMANHO_MAXIMO = 256 * 1024 * 1024  # bytes
+
+# Imagens dos layouts das fichas impressas (ver apps.relatorios.utils.coordenadas)
+LAYOUTS_FICHAS_DIR = os.path.join(BASE_DIR, 'static', 'imagens', 'layouts')
+
+# Logos desenhados no topo de cada página dos relatórios em PDF, da esquerda
+# para a direita (ver apps.relatorios.utils.cache_logos)
+LOGOS_RELATORIOS = []
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -117,38 +130,55 @@ LOGOUT_REDIRECT_URL = '/contas/login/'
 X_FRAME_OPTIONS = 'SAMEORIGIN'  # Permite iframes do mesmo domínio
 
 # Configurações de logging
+# Os registros passam por uma fila e são gravados por uma thread em segundo
+# plano (ver apps.core.logs), em JSON, com rotação do arquivo
+LOGS_DIR = os.environ.get('LOGS_DIR', os.path.join(BASE_DIR, 'logs'))
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
-    'formatters': {
-        'verbose': {
-            'format': '{levelname} {asctime} {module} {message}',
-            'style': '{',
+    'filters': {
+        # Fração dos registros de DEBUG mantida nos loggers mais verbosos
+        'amostragem': {
+            '()': 'apps.core.logs.FiltroAmostragem',
+            'taxas': {
+                'auth_app': 0.1,
+                'django.db.backends': 0.01,
+            },
         },
     },
     'handlers': {
-        'console': {
-            'level': 'DEBUG',
-            'class': 'logging.StreamHandler',
-            'formatter': 'verbose',
-        },
-        'file': {
+        'fila': {
+            '()': 'apps.core.logs.FilaLogHandler',
             'level': 'DEBUG',
-            'class': 'logging.FileHandler',
-            'filename': 'debug.log',
-            'formatter': 'verbose',
+            'filters': ['amostragem'],
+            'arquivo': os.path.join(LOGS_DIR, 'cras360.log'),
+            'max_bytes': 10 * 1024 * 1024,
+            'backups': 5,
+            'nivel_console': 'DEBUG' if DEBUG else 'INFO',
         },
     },
     'loggers': {
         'django': {
-            'handlers': ['console', 'file'],
+            'handlers': ['fila'],
             'level': 'INFO',
             'propagate': True,
         },
+        # SQL das consultas (só emitido com DEBUG=True), amostrado pelo filtro
+        'django.db.backends': {
+            'handlers': ['fila'],
+            'level': 'DEBUG',
+            'propagate': False,
+        },
         'auth_app': {
-            'handlers': ['console', 'file'],
+            'handlers': ['fila'],
             'level': 'DEBUG',
             'propagate': True,
         },
+        'apps': {
+            'handlers': ['fila'],
+            'level': 'INFO',
+            'propagate': True,
+        },
     },
 }
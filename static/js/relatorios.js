@@ -1,7 +1,15 @@
 /**
  * Script para gerenciar funcionalidades do módulo de relatórios
+ *
+ * As URLs usadas pelo script vêm do template que o inclui:
+ *
+ *   <script src="{% static 'js/relatorios.js' %}"
+ *           data-url-permissoes="{% url 'relatorios:permissoes' %}"
+ *           data-url-relatorios="{% url 'relatorios:index' %}"></script>
  */
 
+const urlsRelatorios = document.currentScript ? document.currentScript.dataset : {};
+
 // Função para inicializar a página de relatórios
 function inicializarRelatorios() {
     console.log('Inicializando módulo de relatórios...');
@@ -213,6 +221,23 @@ function exibirRelatorioNaTela(data) {
     container.scrollIntoView({ behavior: 'smooth' });
 }
 
+// Permissões do usuário para todos os relatórios, obtidas em uma única chamada por página
+let permissoesRelatorios = null;
+
+function obterPermissoes() {
+    if (!permissoesRelatorios) {
+        permissoesRelatorios = fetch(urlsRelatorios.urlPermissoes, {
+            method: 'GET',
+            headers: {
+                'X-Requested-With': 'XMLHttpRequest'
+            }
+        })
+        .then(response => response.json())
+        .then(data => data.permissoes);
+    }
+    return permissoesRelatorios;
+}
+
 // Função para verificar permissões do usuário e ajustar a interface
 function verificarPermissoes() {
     // Obter o tipo de relatório da URL atual
@@ -227,18 +252,12 @@ function verificarPermissoes() {
     
     // Se estamos em uma página específica de relatório, verificar acesso via API
     if (tipoRelatorio) {
-        fetch(`/relatorios/verificar-permissao/${tipoRelatorio}/`, {
-            method: 'GET',
-            headers: {
-                'X-Requested-With': 'XMLHttpRequest'
-            }
-        })
-        .then(response => response.json())
-        .then(data => {
+        obterPermissoes()
+        .then(permissoes => {
             // Se o usuário não tem permissão, redirecionar para a página inicial
-            if (!data.tem_permissao) {
+            if (!permissoes[tipoRelatorio]) {
                 alert('Você não tem permissão para acessar este relatório.');
-                window.location.href = '/relatorios/';
+                window.location.href = urlsRelatorios.urlRelatorios;
             }
         })
         .catch(error => {